@@ -0,0 +1,227 @@
+"""
+Background removal of deleted accounts.
+
+``delete_account`` only deactivates the user and queues an
+``AccountDeletionJob``. The worker (``manage.py process_account_deletions``)
+then clears the user's rows in bounded chunks with plain batched
+DELETE/UPDATE statements instead of the ORM collector, removes their media
+in parallel and finally deletes the now nearly empty User row. Every step is
+idempotent, so a failed job can simply be set back to pending.
+"""
+import logging
+import traceback
+
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from messaging.archive import scrub_sender
+from messaging.models import Message, MessageFlag, Thread, ThreadRead
+
+from . import freshness, rollups
+from .blobs import release
+from .bulk import raw_delete
+from .media import DEFAULT_WORKERS, delete_files
+from .models import (
+    AccountDeletionJob,
+    ArchivedPost,
+    ArchivedPostImage,
+    Audience,
+    Post,
+    PostDailyStats,
+    PostFlag,
+    PostImages,
+    PostLSHBucket,
+    PostSignature,
+    Profile,
+    SavedSearchMatch,
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class AccountDeleter:
+    def __init__(self, job, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, report=None):
+        self.job = job
+        self.user_id = job.user_id
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.report = report
+
+    def _progress(self, step: str, count: int) -> None:
+        self.job.step = step
+        self.job.progress[step] = count
+        self.job.save(update_fields=["step", "progress"])
+        logger.info("Account deletion %s (user %s): %s=%s", self.job.pk, self.user_id, step, count)
+        if self.report:
+            self.report(self.job, step, count)
+
+    def _chunks(self, queryset):
+        while True:
+            ids = list(queryset.values_list("pk", flat=True)[: self.chunk_size])
+            if not ids:
+                return
+            yield ids
+
+    def delete_rows(self, step: str, queryset) -> int:
+        total = 0
+        self._progress(step, total)
+        for ids in self._chunks(queryset):
+            with transaction.atomic():
+                raw_delete(queryset.model, ids)
+            total += len(ids)
+            self._progress(step, total)
+        return total
+
+    def delete_flags(self, step: str, queryset) -> int:
+        """``delete_rows`` for flags, taking the open ones off the admin counter."""
+        open_flags = queryset.filter(resolved=False).count()
+        total = self.delete_rows(step, queryset)
+        rollups.add(rollups.OPEN_FLAGS, -open_flags)
+        return total
+
+    def update_rows(self, step: str, queryset, **values) -> int:
+        total = 0
+        self._progress(step, total)
+        for ids in self._chunks(queryset):
+            queryset.model.objects.filter(pk__in=ids).update(**values)
+            total += len(ids)
+            self._progress(step, total)
+        return total
+
+    def delete_posts(self) -> int:
+        """
+        Each chunk of posts goes together with its images, flags, duplicate
+        index, daily stats, saved-search matches and hidden audiences;
+        image files are removed once the rows are.
+        """
+        hidden = Post.hidden_audiences.through
+        total = 0
+        failed = 0
+        self._progress("posts", total)
+        for ids in self._chunks(Post.objects.filter(user_id=self.user_id)):
+            images = list(PostImages.objects.filter(post_id__in=ids).values_list("pk", "image", "blob_id"))
+            with transaction.atomic():
+                raw_delete(PostImages, [pk for pk, _, _ in images])
+                flags = list(PostFlag.objects.filter(post_id__in=ids).values_list("pk", "resolved"))
+                raw_delete(PostFlag, [pk for pk, _ in flags])
+                raw_delete(PostLSHBucket, list(PostLSHBucket.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+                raw_delete(PostSignature, ids)
+                raw_delete(PostDailyStats, list(PostDailyStats.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+                raw_delete(SavedSearchMatch, list(SavedSearchMatch.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+                raw_delete(hidden, list(hidden.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+                raw_delete(Post, ids)
+                rollups.add(rollups.POSTS, -len(ids))
+                rollups.add(rollups.OPEN_FLAGS, -sum(not resolved for _, resolved in flags))
+            # Shared blobs lose a reference; only unshared legacy files go now.
+            release([blob_id for _, _, blob_id in images if blob_id])
+            failed += delete_files([name for _, name, blob_id in images if not blob_id], workers=self.workers)
+            total += len(ids)
+            self._progress("posts", total)
+        if failed:
+            self._progress("media_failed", failed)
+        return total
+
+    def delete_archived_posts(self) -> int:
+        """Same as ``delete_posts`` for listings already moved to the archive."""
+        hidden = ArchivedPost.hidden_audiences.through
+        total = 0
+        failed = 0
+        self._progress("archived_posts", total)
+        for ids in self._chunks(ArchivedPost.objects.filter(user_id=self.user_id)):
+            images = list(ArchivedPostImage.objects.filter(post_id__in=ids).values_list("pk", "image", "blob_id"))
+            with transaction.atomic():
+                raw_delete(ArchivedPostImage, [pk for pk, _, _ in images])
+                raw_delete(hidden, list(hidden.objects.filter(archivedpost_id__in=ids).values_list("pk", flat=True)))
+                raw_delete(ArchivedPost, ids)
+                rollups.add(rollups.ARCHIVED_POSTS, -len(ids))
+            release([blob_id for _, _, blob_id in images if blob_id])
+            failed += delete_files([name for _, name, blob_id in images if not blob_id], workers=self.workers)
+            total += len(ids)
+            self._progress("archived_posts", total)
+        if failed:
+            self._progress("archived_media_failed", failed)
+        return total
+
+    def delete_audiences(self) -> None:
+        """
+        The user's own audiences, after their posts. Members' cached
+        excluded sets may keep ids of the deleted posts, which match nothing.
+        """
+        owned = {"audience__owner_id": self.user_id}
+        self.delete_rows("audience_members", Audience.members.through.objects.filter(**owned))
+        self.delete_rows("audience_posts", Post.hidden_audiences.through.objects.filter(**owned))
+        self.delete_rows("audience_archived_posts", ArchivedPost.hidden_audiences.through.objects.filter(**owned))
+        self.delete_rows("audiences", Audience.objects.filter(owner_id=self.user_id))
+
+    def run(self) -> None:
+        uid = self.user_id
+        participants = Thread.participants.through
+        thread_ids = list(participants.objects.filter(user_id=uid).values_list("thread_id", flat=True))
+
+        self.update_rows(
+            "messages", Message.objects.filter(sender_id=uid),
+            sender=None, updated_at=timezone.now(),
+        )
+        self._progress("archived_messages", scrub_sender(uid, thread_ids))
+        self.update_rows("threads_created", Thread.objects.filter(created_by_id=uid), created_by=None)
+        self.delete_flags("message_flags", MessageFlag.objects.filter(flagged_by_id=uid))
+        self.delete_rows("thread_reads", ThreadRead.objects.filter(user_id=uid))
+        self.delete_rows("thread_memberships", participants.objects.filter(user_id=uid))
+        self.delete_flags("post_flags", PostFlag.objects.filter(flagged_by_id=uid))
+        self.delete_rows("audience_memberships", Audience.members.through.objects.filter(user_id=uid))
+        self.delete_posts()
+        self.delete_archived_posts()
+        self.delete_audiences()
+
+        avatar = Profile.objects.filter(user_id=uid).values_list("avatar", flat=True).first()
+        delete_files([avatar], workers=self.workers)
+
+        # Small tables with their own cascades (social tokens, confirmations):
+        # the collector is cheap here and keeps allauth's invariants.
+        EmailAddress.objects.filter(user_id=uid).delete()
+        SocialAccount.objects.filter(user_id=uid).delete()
+        User.objects.filter(pk=uid).delete()
+        self._progress("user", 1)
+
+        freshness.invalidate_posts(uid)
+        freshness.invalidate_profiles()
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to running. Safe with several
+    workers: only the one whose UPDATE matches gets the job.
+    """
+    pending = AccountDeletionJob.objects.filter(status=AccountDeletionJob.PENDING).order_by("created_at")
+    for job in pending[:10]:
+        claimed = AccountDeletionJob.objects.filter(
+            pk=job.pk, status=AccountDeletionJob.PENDING,
+        ).update(status=AccountDeletionJob.RUNNING, started_at=timezone.now())
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def process_job(job, **options) -> bool:
+    try:
+        AccountDeleter(job, **options).run()
+    except Exception:
+        logger.exception("Account deletion %s (user %s) failed", job.pk, job.user_id)
+        job.status = AccountDeletionJob.FAILED
+        job.error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        return False
+    job.status = AccountDeletionJob.DONE
+    job.error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    return True
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from .models import Profile
 from messaging.models import Message
-from .models import Post, PostImages
+from .models import ArchivedPost, Post, PostImages
 # Register your models here.
 admin.site.register(Profile)
 admin.site.register(Message)
 admin.site.register(Post)
-admin.site.register(PostImages)
\ No newline at end of file
+admin.site.register(PostImages)
+admin.site.register(ArchivedPost)
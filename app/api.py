@@ -0,0 +1,359 @@
+"""
+Read-only JSON API (``/api/v1/``) for mobile and single-page clients.
+
+Every endpoint returns a batch: ``?ids=1,2,3`` fetches those objects in one
+query, otherwise a list comes back newest first, ``limit`` at a time, with a
+``next`` cursor to pass as ``before``. ``?fields=`` trims each object to the
+named fields, and only the related data those fields need is loaded.
+Related objects are loaded per batch by the ``load_*`` functions below (one
+query each, however many items reference them); the users a response
+mentions are side-loaded once under ``profiles`` unless ``?include=`` is
+empty. Visibility matches the HTML pages: posts hidden from the viewer's
+audiences are left out, threads and messages only reach participants.
+Responses are compact JSON with an ETag where the pages have one.
+
+Authentication is the site session; anonymous requests get 401.
+"""
+from functools import wraps
+
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from messaging.archive import thread_page
+from messaging.models import Message, Thread, ThreadRead, epoch_aware
+
+from . import audiences
+from .db_routing import replica_reads
+from .freshness import feed_version, make_etag, profiles_version, revalidate, thread_etag
+from .models import Post, PostImages, Profile
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_IDS = 100
+
+POST_FIELDS = (
+    "id", "user", "title", "price", "description", "category", "images",
+    "pickup_spot", "location", "created_at", "updated_at", "expires_at",
+)
+PROFILE_FIELDS = ("id", "username", "display_name", "avatar", "bio", "interests")
+THREAD_FIELDS = ("id", "is_group", "name", "participants", "last_message", "unread", "created_at")
+MESSAGE_FIELDS = ("id", "thread", "sender", "text", "created_at", "updated_at")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(data, status=200) -> JsonResponse:
+    return JsonResponse(data, status=status, json_dumps_params={"separators": (",", ":")})
+
+
+def api_view(view_func):
+    """GET only, session users only, ``ApiError`` as a JSON error response."""
+    @require_GET
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({"error": "Authentication required."}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as exc:
+            return _json({"error": str(exc)}, status=exc.status)
+    return wrapper
+
+
+def _int(value, name, default=None, low=1, high=None) -> int | None:
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(f"{name} must be a number.")
+    if number < low or (high is not None and number > high):
+        raise ApiError(f"{name} must be between {low} and {high}." if high else f"{name} must be at least {low}.")
+    return number
+
+
+def _ids(request) -> list | None:
+    raw = request.GET.get("ids")
+    if raw is None:
+        return None
+    ids = list(dict.fromkeys(_int(part, "ids") for part in raw.split(",") if part.strip()))
+    if len(ids) > MAX_IDS:
+        raise ApiError(f"At most {MAX_IDS} ids per request.")
+    return ids
+
+
+def _fields(request, allowed) -> tuple:
+    raw = request.GET.get("fields")
+    if not raw:
+        return allowed
+    wanted = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        raise ApiError("Unknown fields: " + ", ".join(unknown) + ". Available: " + ", ".join(allowed) + ".")
+    # "id" always comes back so clients can match results to requests.
+    return tuple(f for f in allowed if f == "id" or f in wanted)
+
+
+def _wants_profiles(request) -> bool:
+    return "profiles" in request.GET.get("include", "profiles").split(",")
+
+
+def _page(request, queryset):
+    """``(rows, next cursor)`` for a list ordered by descending id."""
+    limit = _int(request.GET.get("limit"), "limit", DEFAULT_LIMIT, high=MAX_LIMIT)
+    before = _int(request.GET.get("before"), "before")
+    if before:
+        queryset = queryset.filter(pk__lt=before)
+    rows = list(queryset.order_by("-pk")[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1].pk if more else None)
+
+
+def _by_ids(queryset, ids) -> list:
+    """The rows of ``queryset`` among ``ids``, in the requested order; missing or hidden ids are left out."""
+    found = queryset.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def _media_url(field, name, url):
+    """The stored URL; rows written before URLs were stored ask the storage."""
+    return url or (field.storage.url(name) if name else None)
+
+
+# Batched loaders: one query per call, keyed by id.
+
+def load_profiles(user_ids, fields=PROFILE_FIELDS) -> dict:
+    avatar = Profile._meta.get_field("avatar")
+    rows = (
+        Profile.objects.filter(user_id__in=set(user_ids))
+        .values(
+            "user_id", "user__username", "user__first_name", "user__last_name",
+            "nickname", "avatar", "avatar_url", "bio", "interests",
+        )
+    )
+    profiles = {}
+    for row in rows:
+        full_name = f"{row['user__first_name']} {row['user__last_name']}".strip()
+        data = {
+            "id": row["user_id"],
+            "username": row["user__username"],
+            # Same order of preference as Profile.display_name.
+            "display_name": row["nickname"] or full_name or row["user__username"],
+            "avatar": _media_url(avatar, row["avatar"], row["avatar_url"]),
+            "bio": row["bio"],
+            "interests": row["interests"],
+        }
+        profiles[row["user_id"]] = {f: data[f] for f in fields}
+    return profiles
+
+
+def load_post_images(post_ids) -> dict:
+    image = PostImages._meta.get_field("image")
+    images = {pk: [] for pk in post_ids}
+    rows = PostImages.objects.filter(post_id__in=post_ids).order_by("pk").values_list("post_id", "image", "url")
+    for post_id, name, url in rows:
+        images[post_id].append(_media_url(image, name, url))
+    return images
+
+
+def load_participants(thread_ids) -> dict:
+    participants = {pk: [] for pk in thread_ids}
+    rows = Thread.participants.through.objects.filter(thread_id__in=thread_ids).order_by("user_id")
+    for thread_id, user_id in rows.values_list("thread_id", "user_id"):
+        participants[thread_id].append(user_id)
+    return participants
+
+
+def load_last_messages(thread_ids) -> dict:
+    """Newest live message per thread; threads whose history is all archived map to None."""
+    latest = (
+        Message.objects.filter(thread_id__in=thread_ids)
+        .values("thread_id").annotate(latest=Max("pk")).values("latest")
+    )
+    messages = {m.thread_id: m for m in Message.objects.filter(pk__in=Subquery(latest))}
+    return {pk: messages.get(pk) for pk in thread_ids}
+
+
+def load_unread(thread_ids, user) -> dict:
+    """Messages from others newer than ``user`` last read each thread, in one grouped query."""
+    last_read = ThreadRead.objects.filter(thread_id=OuterRef("thread_id"), user=user).values("last_read_at")[:1]
+    rows = (
+        Message.objects.filter(thread_id__in=thread_ids)
+        .filter(Q(sender__isnull=True) | ~Q(sender=user))
+        .filter(created_at__gt=Coalesce(Subquery(last_read), Value(epoch_aware())))
+        .values("thread_id").annotate(n=Count("pk")).values_list("thread_id", "n")
+    )
+    unread = dict.fromkeys(thread_ids, 0)
+    unread.update(rows)
+    return unread
+
+
+# Serialisers.
+
+def _message(m, fields) -> dict:
+    data = {
+        "id": m.pk,
+        "thread": m.thread_id,
+        "sender": m.sender_id,
+        "text": m.text,
+        "created_at": m.created_at,
+        "updated_at": m.updated_at,
+    }
+    return {f: data[f] for f in fields}
+
+
+def serialize_posts(posts, fields) -> list:
+    images = load_post_images([p.pk for p in posts]) if "images" in fields else {}
+    result = []
+    for p in posts:
+        data = {
+            "id": p.pk,
+            "user": p.user_id,
+            "title": p.title,
+            "price": p.price,
+            "description": p.description,
+            "category": p.category,
+            "images": images.get(p.pk),
+            "pickup_spot": p.pickup_spot or None,
+            "location": [p.latitude, p.longitude] if p.geohash else None,
+            "created_at": p.created_at,
+            "updated_at": p.updated_at,
+            "expires_at": p.expires_at,
+        }
+        result.append({f: data[f] for f in fields})
+    return result
+
+
+def serialize_threads(threads, fields, user) -> list:
+    ids = [t.pk for t in threads]
+    participants = load_participants(ids) if "participants" in fields else {}
+    last = load_last_messages(ids) if "last_message" in fields else {}
+    unread = load_unread(ids, user) if "unread" in fields else {}
+    result = []
+    for t in threads:
+        data = {
+            "id": t.pk,
+            "is_group": t.is_group,
+            "name": t.name,
+            "participants": participants.get(t.pk),
+            "last_message": _message(last[t.pk], MESSAGE_FIELDS) if last.get(t.pk) else None,
+            "unread": unread.get(t.pk),
+            "created_at": t.created_at,
+        }
+        result.append({f: data[f] for f in fields})
+    return result
+
+
+def _respond(request, key, items, user_ids=(), listing=False, cursor=None) -> JsonResponse:
+    data = {key: items}
+    if listing:
+        data["next"] = cursor
+    if _wants_profiles(request):
+        data["profiles"] = load_profiles({pk for pk in user_ids if pk})
+    return _json(data)
+
+
+# Views.
+
+def posts_etag(request):
+    return make_etag(
+        request, "api:posts", feed_version(), profiles_version(), audiences.excluded_version(request.user.pk),
+    )
+
+
+def profiles_etag(request):
+    return make_etag(request, "api:profiles", profiles_version())
+
+
+def messages_etag(request, thread_id):
+    return thread_etag(request, thread_id)
+
+
+@api_view
+@replica_reads
+@revalidate(posts_etag)
+def posts(request):
+    """Posts the viewer may see; filter lists with ``category`` and ``q`` like the dashboard."""
+    fields = _fields(request, POST_FIELDS)
+    visible = audiences.visible(Post.objects.all(), request.user)
+    ids = _ids(request)
+    cursor = None
+    if ids is not None:
+        rows = _by_ids(visible, ids)
+    else:
+        category = request.GET.get("category")
+        query = (request.GET.get("q") or "").strip()
+        if category:
+            visible = visible.filter(category=category)
+        if query:
+            visible = visible.filter(title__icontains=query)
+        rows, cursor = _page(request, visible)
+    return _respond(request, "posts", serialize_posts(rows, fields), {p.user_id for p in rows}, ids is None, cursor)
+
+
+@api_view
+@replica_reads
+@revalidate(profiles_etag)
+def profiles(request):
+    """Public profiles by user id: ``?ids=`` is required."""
+    ids = _ids(request)
+    if not ids:
+        raise ApiError("Pass the user ids to fetch as ?ids=.")
+    found = load_profiles(ids, _fields(request, PROFILE_FIELDS))
+    return _json({"profiles": [found[pk] for pk in ids if pk in found]})
+
+
+@api_view
+@replica_reads
+def threads(request):
+    """The viewer's conversations, newest first."""
+    fields = _fields(request, THREAD_FIELDS)
+    mine = Thread.objects.filter(participants=request.user)
+    ids = _ids(request)
+    cursor = None
+    if ids is not None:
+        rows = _by_ids(mine, ids)
+    else:
+        rows, cursor = _page(request, mine)
+    items = serialize_threads(rows, fields, request.user)
+    user_ids = set()
+    for item in items:
+        user_ids.update(item.get("participants") or ())
+        if item.get("last_message"):
+            user_ids.add(item["last_message"]["sender"])
+    return _respond(request, "threads", items, user_ids, ids is None, cursor)
+
+
+@api_view
+@replica_reads
+def messages(request):
+    """Messages by id (``?ids=`` required), from the viewer's threads only; live messages only."""
+    ids = _ids(request)
+    if not ids:
+        raise ApiError("Pass the message ids to fetch as ?ids=.")
+    fields = _fields(request, MESSAGE_FIELDS)
+    rows = _by_ids(Message.objects.filter(thread__participants=request.user), ids)
+    return _respond(request, "messages", [_message(m, fields) for m in rows], {m.sender_id for m in rows})
+
+
+@api_view
+@replica_reads
+@revalidate(messages_etag)
+def thread_messages(request, thread_id):
+    """
+    One page of a thread, live and archived history alike, oldest first;
+    ``next`` is the ``before`` cursor of the page preceding it.
+    """
+    if not Thread.objects.filter(pk=thread_id, participants=request.user).exists():
+        raise ApiError("Not found.", status=404)
+    fields = _fields(request, MESSAGE_FIELDS)
+    limit = _int(request.GET.get("limit"), "limit", DEFAULT_LIMIT, high=MAX_LIMIT)
+    page, older = thread_page(thread_id, _int(request.GET.get("before"), "before"), limit)
+    return _respond(request, "messages", [_message(m, fields) for m in page], {m.sender_id for m in page}, True, older)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts", api.posts, name="posts"),
+    path("profiles", api.profiles, name="profiles"),
+    path("threads", api.threads, name="threads"),
+    path("threads/<int:thread_id>/messages", api.thread_messages, name="thread_messages"),
+    path("messages", api.messages, name="messages"),
+]
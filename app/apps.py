@@ -5,4 +5,9 @@ class AppConfig(AppConfig):
     name = "app"
 
     def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
         import app.signals
+
+        # The login pipeline writes last_login in its own single UPDATE.
+        user_logged_in.disconnect(dispatch_uid="update_last_login")
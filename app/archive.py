@@ -0,0 +1,154 @@
+"""
+Listing expiry: moving expired posts to the archive tables and back.
+
+``archive_expired`` (run by ``manage.py archive_posts``) takes expired posts
+in batches and, per batch in one transaction, copies them with their images
+and hidden audiences into ArchivedPost / ArchivedPostImage, then deletes
+the originals and everything hanging off them with plain batched DELETEs.
+Image files and blob references move with the rows, so nothing is removed
+from storage. Posts with unresolved flags wait until a moderator has dealt
+with them. ``restore`` is the reverse, used when a seller renews an
+archived listing.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import freshness, rollups
+from .bulk import raw_delete
+from .models import (
+    ArchivedPost,
+    ArchivedPostImage,
+    Post,
+    PostDailyStats,
+    PostFlag,
+    PostImages,
+    PostLSHBucket,
+    PostSignature,
+    SavedSearchMatch,
+    listing_expiry,
+)
+
+DEFAULT_BATCH_SIZE = 500
+
+POST_FIELDS = (
+    "id", "user_id", "title", "price", "description", "category", "created_at", "updated_at", "expires_at",
+    "pickup_spot", "latitude", "longitude", "geohash",
+)
+
+
+def expired_posts(now):
+    return Post.objects.filter(expires_at__lte=now).exclude(flags__resolved=False)
+
+
+def _forget(user_ids) -> None:
+    for user_id in user_ids:
+        freshness.invalidate_posts(user_id)
+
+
+def archive_batch(ids, now) -> int:
+    hidden = Post.hidden_audiences.through
+    with transaction.atomic():
+        posts = list(Post.objects.select_for_update().filter(pk__in=ids, expires_at__lte=now).values(*POST_FIELDS))
+        ids = [p["id"] for p in posts]
+        if not ids:
+            return 0
+        totals = {
+            row["post_id"]: row
+            for row in PostDailyStats.objects.filter(post_id__in=ids)
+            .values("post_id").annotate(views=Sum("views"), inquiries=Sum("inquiries"))
+        }
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(
+                **p,
+                archived_at=now,
+                views=totals.get(p["id"], {}).get("views") or 0,
+                inquiries=totals.get(p["id"], {}).get("inquiries") or 0,
+            )
+            for p in posts
+        ])
+        images = list(PostImages.objects.filter(post_id__in=ids).values_list("pk", "post_id", "image", "url", "blob_id"))
+        ArchivedPostImage.objects.bulk_create([
+            ArchivedPostImage(post_id=post_id, image=image, url=url, blob_id=blob_id)
+            for _, post_id, image, url, blob_id in images
+        ])
+        hidden_rows = list(hidden.objects.filter(post_id__in=ids).values_list("pk", "post_id", "audience_id"))
+        ArchivedPost.hidden_audiences.through.objects.bulk_create([
+            ArchivedPost.hidden_audiences.through(archivedpost_id=post_id, audience_id=audience_id)
+            for _, post_id, audience_id in hidden_rows
+        ])
+
+        raw_delete(PostImages, [pk for pk, *_ in images])
+        raw_delete(hidden, [pk for pk, *_ in hidden_rows])
+        flags = list(PostFlag.objects.filter(post_id__in=ids).values_list("pk", "resolved"))
+        raw_delete(PostFlag, [pk for pk, _ in flags])
+        raw_delete(PostLSHBucket, list(PostLSHBucket.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+        raw_delete(PostSignature, list(PostSignature.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+        raw_delete(PostDailyStats, list(PostDailyStats.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+        raw_delete(SavedSearchMatch, list(SavedSearchMatch.objects.filter(post_id__in=ids).values_list("pk", flat=True)))
+        raw_delete(Post, ids)
+        # Plain DELETEs send no signals; move the admin counters here.
+        rollups.add(rollups.POSTS, -len(ids))
+        rollups.add(rollups.ARCHIVED_POSTS, len(ids))
+        rollups.add(rollups.OPEN_FLAGS, -sum(not resolved for _, resolved in flags))
+    _forget({p["user_id"] for p in posts})
+    return len(ids)
+
+
+def archive_expired(now=None, batch_size=DEFAULT_BATCH_SIZE, report=None) -> int:
+    now = now or timezone.now()
+    total = 0
+    while True:
+        ids = list(expired_posts(now).order_by("expires_at").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += archive_batch(ids, now)
+        if report:
+            report(total)
+
+
+def restore(archived: ArchivedPost) -> Post:
+    """
+    Move an archived listing back to ``Post`` with a fresh lifetime. It is
+    relisted: ``created_at`` restarts, so it shows up as new in the feed.
+    """
+    # Deferred: dedupe pulls in numpy.
+    from .dedupe import index_post
+
+    with transaction.atomic():
+        post = Post(
+            id=archived.pk,
+            user_id=archived.user_id,
+            title=archived.title,
+            price=archived.price,
+            description=archived.description,
+            category=archived.category,
+            expires_at=listing_expiry(),
+            pickup_spot=archived.pickup_spot,
+            latitude=archived.latitude,
+            longitude=archived.longitude,
+            geohash=archived.geohash,
+        )
+        post.save(force_insert=True)
+        PostImages.objects.bulk_create([
+            PostImages(post=post, image=img.image, url=img.url, blob_id=img.blob_id)
+            for img in archived.images.all()
+        ])
+        post.hidden_audiences.set(archived.hidden_audiences.all())
+        if archived.views or archived.inquiries:
+            # Per-day detail is gone; keep the totals on the day it was archived.
+            PostDailyStats.objects.create(
+                post=post,
+                day=timezone.localdate(archived.archived_at),
+                views=archived.views,
+                inquiries=archived.inquiries,
+            )
+        raw_delete(ArchivedPostImage, [img.pk for img in archived.images.all()])
+        raw_delete(ArchivedPost.hidden_audiences.through, list(
+            ArchivedPost.hidden_audiences.through.objects.filter(archivedpost_id=archived.pk).values_list("pk", flat=True)
+        ))
+        raw_delete(ArchivedPost, [archived.pk])
+        rollups.add(rollups.ARCHIVED_POSTS, -1)
+    index_post(post)
+    _forget([post.user_id])
+    return post
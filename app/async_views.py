@@ -0,0 +1,127 @@
+"""
+Async versions of the hot read views, served when ``settings.ASYNC_VIEWS``
+is on (the ASGI profile). They use the async ORM and ``asyncio.gather`` for
+queries that don't depend on each other, then render in a worker thread
+because templates and context processors still touch the ORM lazily.
+
+Django's async ORM runs each query on the request's sync thread, so gathered
+queries don't overlap on the database; what the event loop gains is that the
+worker can serve other requests while a page waits on them.
+"""
+import asyncio
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.shortcuts import redirect, render
+
+from . import audiences, counters, geo
+from .db_routing import replica_reads
+from .freshness import dashboard_etag, revalidate
+from .models import Post, Profile
+from .ranking import ranked_key, record_engagement
+from .views import FEED_PAGE_SIZE
+
+
+async def _none():
+    return None
+
+
+def _page_number(value) -> int:
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+async def _page_rows(queryset, number: int) -> list:
+    start = (number - 1) * FEED_PAGE_SIZE
+    return [row async for row in queryset[start:start + FEED_PAGE_SIZE]]
+
+
+@login_required
+@replica_reads
+@revalidate(dashboard_etag)
+async def dashboard(request):
+    user = await request.auser()
+
+    selected_category = request.GET.get('category') or None
+    search_query = (request.GET.get('q') or "").strip()
+    newest_first = request.GET.get('sort') == "new"
+    point = geo.requested_point(request.GET)
+    radius = geo.parse_radius(request.GET.get('radius'))
+    want_ranking = not (selected_category or search_query or newest_first or point)
+
+    (profile, _), ranked, excluded = await asyncio.gather(
+        Profile.objects.aget_or_create(user=user),
+        cache.aget(ranked_key(user.id)) if want_ranking else _none(),
+        sync_to_async(audiences.excluded_posts)(user.pk),
+    )
+    role = getattr(profile, "status", "Member")
+
+    if not getattr(profile, "onboarding_complete", False):
+        return redirect("onboarding")
+
+    posts = Post.objects.all().order_by('-created_at')
+    if excluded:
+        posts = posts.exclude(pk__in=excluded)
+
+    categories = Post._meta.get_field('category').choices
+
+    if selected_category:
+        posts = posts.filter(category=selected_category)
+
+    if search_query:
+        posts = posts.filter(title__icontains=search_query)
+
+    if point:
+        # Nearest first.
+        ids, _ = await asyncio.gather(
+            sync_to_async(geo.nearby)(posts, *point, radius),
+            sync_to_async(record_engagement)(user, selected_category, views=1) if selected_category else _none(),
+        )
+        page_obj = Paginator(ids, FEED_PAGE_SIZE).get_page(request.GET.get('page'))
+        by_id = await posts.ain_bulk(list(page_obj.object_list))
+        page_posts = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+    elif ranked:
+        # Posts created since the last ranking run go on top, newest first.
+        computed_at = datetime.fromtimestamp(ranked["computed_at"], tz=dt_timezone.utc)
+        fresh = [pk async for pk in posts.filter(created_at__gt=computed_at).values_list("id", flat=True)]
+        seen = set(fresh)
+        ids = fresh + [pk for pk in ranked["ids"] if pk not in seen]
+        page_obj = Paginator(ids, FEED_PAGE_SIZE).get_page(request.GET.get('page'))
+        by_id = await posts.ain_bulk(list(page_obj.object_list))
+        page_posts = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+    else:
+        # Fetch the requested page alongside the total; only an
+        # out-of-range page number costs a second fetch.
+        number = _page_number(request.GET.get('page'))
+        total, page_posts, _ = await asyncio.gather(
+            posts.acount(),
+            _page_rows(posts, number),
+            sync_to_async(record_engagement)(user, selected_category, views=1) if selected_category else _none(),
+        )
+        page_obj = Paginator(range(total), FEED_PAGE_SIZE).get_page(number)
+        if page_obj.number != number:
+            page_posts = await _page_rows(posts, page_obj.number)
+
+    counters.record_views([p.id for p in page_posts if p.user_id != user.id])
+
+    context = {
+        "profile": profile,
+        "posts": page_posts,
+        "page_obj": page_obj,
+        "ranked": bool(ranked),
+        "selected_category": selected_category,
+        "categories": categories,
+        "search_query": search_query,
+        "pickup_spots": geo.SPOT_CHOICES,
+        "radius_choices": geo.RADIUS_CHOICES,
+        "near": request.GET.get('near') or "",
+        "radius": radius,
+    }
+
+    template = "organizer_dashboard.html" if str(role).lower() == "organizer" else "dashboard.html"
+    return await sync_to_async(render)(request, template, context)
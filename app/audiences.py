@@ -0,0 +1,141 @@
+"""
+Listing visibility through audiences.
+
+A seller hides a listing from one or more of their audiences (reusable
+lists of users) instead of from individual users, so a post carries a
+handful of rows however large the lists are. What a viewer may not see is
+compiled into one set of post ids per viewer and applied as a plain
+``pk IN (...)`` exclusion rather than an anti-join in every feed query.
+With a shared cache the sets are cached, and signals drop a viewer's set
+when they join or leave an audience, or when a post starts or stops being
+hidden from one they belong to. Without one (see app/caching.py) each set
+is computed per request, so no worker shows listings that should be hidden.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from . import caching
+from .models import Audience, Post
+
+User = get_user_model()
+
+CACHE_TIMEOUT = 60 * 60
+MAX_PER_USER = 20
+MAX_MEMBERS = 5000
+
+
+class AudienceError(Exception):
+    """Raised when an audience cannot be saved."""
+
+
+def _key(user_id) -> str:
+    return f"audiences:excluded:{user_id}"
+
+
+def _compute(user_ids) -> dict:
+    """``{user_id: set of post ids}`` hidden from each of ``user_ids``, in one query."""
+    excluded = {user_id: set() for user_id in user_ids}
+    rows = (
+        Post.hidden_audiences.through.objects
+        .filter(audience__members__in=user_ids)
+        .values_list("audience__members", "post_id", "post__user_id")
+    )
+    for user_id, post_id, owner_id in rows:
+        # A seller who is in their own audience still sees their listings.
+        if owner_id != user_id:
+            excluded[user_id].add(post_id)
+    return excluded
+
+
+def excluded_for(user_ids) -> dict:
+    """``{user_id: frozenset of post ids}``, from a shared cache where possible."""
+    user_ids = list(user_ids)
+    if not caching.is_shared():
+        return {user_id: frozenset(ids) for user_id, ids in _compute(user_ids).items()}
+    found = cache.get_many([_key(user_id) for user_id in user_ids])
+    result = {user_id: found[_key(user_id)] for user_id in user_ids if _key(user_id) in found}
+    missing = [user_id for user_id in user_ids if user_id not in result]
+    if missing:
+        computed = {user_id: frozenset(ids) for user_id, ids in _compute(missing).items()}
+        cache.set_many(
+            {_key(user_id): ids for user_id, ids in computed.items()},
+            caching.computed_timeout(CACHE_TIMEOUT),
+        )
+        result.update(computed)
+    return result
+
+
+def excluded_posts(user_id) -> frozenset:
+    return excluded_for([user_id])[user_id]
+
+
+def excluded_version(user_id) -> str:
+    """Changes whenever the set does; for ETags."""
+    ids = ",".join(map(str, sorted(excluded_posts(user_id))))
+    return hashlib.md5(ids.encode(), usedforsecurity=False).hexdigest()
+
+
+def visible(queryset, user):
+    """``queryset`` of posts without those hidden from ``user``."""
+    excluded = excluded_posts(user.pk)
+    return queryset.exclude(pk__in=excluded) if excluded else queryset
+
+
+def invalidate(user_ids) -> None:
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def invalidate_audiences(audience_ids) -> None:
+    """Drop the sets of everyone in any of ``audience_ids``."""
+    members = Audience.members.through.objects.filter(audience_id__in=audience_ids)
+    invalidate(set(members.values_list("user_id", flat=True)))
+
+
+def hidden_users(post) -> set:
+    """Ids of the users ``post`` is hidden from."""
+    return set(
+        Audience.members.through.objects
+        .filter(audience__posts=post)
+        .exclude(user_id=post.user_id)
+        .values_list("user_id", flat=True)
+    )
+
+
+def parse_usernames(text: str) -> list:
+    return list(dict.fromkeys(name for name in text.replace(",", " ").split() if name))
+
+
+def save_audience(owner, name: str, usernames: str, audience=None) -> Audience:
+    """
+    Create an audience, or update ``audience``, from a name and a list of
+    usernames separated by commas or whitespace. Raises ``AudienceError``
+    for bad input.
+    """
+    name = (name or "").strip()[:80]
+    if not name:
+        raise AudienceError("Give the audience a name.")
+    taken = Audience.objects.filter(owner=owner, name=name)
+    if audience:
+        taken = taken.exclude(pk=audience.pk)
+    if taken.exists():
+        raise AudienceError(f"You already have an audience called “{name}”.")
+    if audience is None and Audience.objects.filter(owner=owner).count() >= MAX_PER_USER:
+        raise AudienceError(f"You can keep up to {MAX_PER_USER} audiences.")
+
+    names = parse_usernames(usernames)
+    if len(names) > MAX_MEMBERS:
+        raise AudienceError(f"An audience can have up to {MAX_MEMBERS} members.")
+    members = dict(User.objects.filter(username__in=names).exclude(pk=owner.pk).values_list("username", "pk"))
+    unknown = [n for n in names if n not in members and n != owner.username]
+    if unknown:
+        raise AudienceError("No such user: " + ", ".join(unknown[:5]) + (" …" if len(unknown) > 5 else ""))
+
+    if audience is None:
+        audience = Audience.objects.create(owner=owner, name=name)
+    elif audience.name != name:
+        audience.name = name
+        audience.save(update_fields=["name", "updated_at"])
+    audience.members.set(members.values())
+    return audience
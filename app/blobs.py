@@ -0,0 +1,133 @@
+"""
+Content-addressed storage for post images.
+
+Every post image is stored once and tracked by a ``StoredBlob`` with its
+SHA-256 and a reference count. ``PostImages`` rows point at the blob, so
+re-using a photo across listings adds a row, not an object. Form uploads
+are written under ``posts/sha256/<ab>/<hash><ext>``; direct uploads keep
+the name they were uploaded under and are hashed when claimed, and a copy
+of content that is already stored is deleted there.
+"""
+import hashlib
+import logging
+import re
+from collections import Counter
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, ProtectedError, Value
+from django.db.models.functions import Greatest
+
+from .media import delete_files
+from .models import PostImages, StoredBlob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_sha256(value) -> bool:
+    return bool(value) and bool(SHA256_RE.fullmatch(value))
+
+
+def cas_name(sha256: str, ext: str = "") -> str:
+    return f"posts/sha256/{sha256[:2]}/{sha256}{ext}"
+
+
+def hash_chunks(chunks):
+    """Hash an iterable of byte chunks; returns ``(hexdigest, size)``."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def hash_stored(name: str):
+    with default_storage.open(name, "rb") as fh:
+        return hash_chunks(iter(lambda: fh.read(CHUNK_SIZE), b""))
+
+
+def register(sha256: str, name: str, size: int) -> StoredBlob:
+    """
+    Record a stored object as the blob for ``sha256``. If another object
+    already holds that content, the new copy is deleted and the existing
+    blob returned.
+    """
+    blob, created = StoredBlob.objects.get_or_create(
+        sha256=sha256,
+        defaults={"name": name, "size": size},
+    )
+    if not created and blob.name != name:
+        delete_files([name])
+    return blob
+
+
+def store_file(uploaded_file, ext: str = "") -> StoredBlob:
+    """
+    Store a file received by the web worker (multipart fallback). The hash is
+    computed while streaming the upload's chunks; known content is not
+    written again.
+    """
+    sha256, size = hash_chunks(uploaded_file.chunks())
+    blob = StoredBlob.objects.filter(sha256=sha256).first()
+    if blob:
+        return blob
+    name = default_storage.save(cas_name(sha256, ext), uploaded_file)
+    return register(sha256, name, size)
+
+
+def add_images(post, blobs) -> list:
+    """
+    Attach blobs to a post as PostImages and take a reference on each.
+    Blobs released concurrently (and so already gone) are skipped.
+    """
+    counts = Counter(blob.pk for blob in blobs)
+    created = []
+    with transaction.atomic():
+        alive = {
+            b.pk: b
+            for b in StoredBlob.objects.select_for_update().filter(pk__in=counts)
+        }
+        for blob in blobs:
+            if blob.pk in alive:
+                created.append(PostImages.objects.create(post=post, image=blob.name, blob=blob))
+        for pk, n in counts.items():
+            if pk in alive:
+                StoredBlob.objects.filter(pk=pk).update(refcount=F("refcount") + n)
+    return created
+
+
+def release(blob_ids) -> int:
+    """
+    Drop one reference per id in ``blob_ids`` (repeat an id to drop several).
+    Blobs that reach zero are deleted, and their stored objects once the
+    surrounding transaction commits, so a rollback leaves no row pointing
+    at a missing file. Returns how many blobs were removed.
+    """
+    counts = Counter(pk for pk in blob_ids if pk)
+    for pk, n in counts.items():
+        StoredBlob.objects.filter(pk=pk).update(refcount=Greatest(F("refcount") - n, Value(0)))
+
+    removed = 0
+    for pk in counts:
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(pk=pk, refcount__lte=0).first()
+            if blob is None:
+                continue
+            try:
+                blob.delete()
+            except ProtectedError:
+                # Refcount drifted below the real number of rows; repair it.
+                StoredBlob.objects.filter(pk=pk).update(
+                    refcount=blob.images.count() + blob.archived_images.count()
+                )
+                logger.warning("Blob %s still referenced; refcount reset", blob.sha256)
+                continue
+            transaction.on_commit(partial(delete_files, [blob.name]))
+            removed += 1
+    return removed
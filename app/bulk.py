@@ -0,0 +1,16 @@
+"""Batched row operations shared by the background jobs."""
+from django.db import connection
+
+
+def raw_delete(model, ids) -> None:
+    """
+    ``DELETE ... WHERE pk IN (ids)`` without the ORM collector: no signals
+    and no cascades, so callers delete dependent rows first.
+    """
+    if not ids:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({placeholders})", list(ids))
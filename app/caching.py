@@ -0,0 +1,34 @@
+"""
+Whether the default cache is shared by every worker process, and how long
+to keep values computed from the database.
+
+The local default, LocMemCache, lives inside one process: a key dropped by
+the worker that handled a write survives in all the others, and values set
+by a management command never reach the web workers. Code whose
+correctness, not just speed, depends on the cache checks ``is_shared``
+first.
+"""
+from django.conf import settings
+
+from .db_routing import reading_from_replica
+
+PER_PROCESS_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+REPLICA_TIMEOUT = 15
+
+
+def is_shared(alias="default") -> bool:
+    return settings.CACHES[alias]["BACKEND"] not in PER_PROCESS_BACKENDS
+
+
+def computed_timeout(timeout: int) -> int:
+    """
+    ``timeout`` for a value just computed from the database, or
+    ``REPLICA_TIMEOUT`` when it was read from the replica: a replica may lag
+    behind the write that dropped the key, so its answer is not pinned for
+    longer than a lagging read is tolerated.
+    """
+    return REPLICA_TIMEOUT if reading_from_replica() else timeout
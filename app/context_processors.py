@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from .freshness import profiles_version
+
+
+def fragment_versions(request):
+    """
+    ``profiles_version`` for the keys of cached fragments that show names and
+    avatars, so any profile edit moves them to new keys in every worker.
+    Queried only by templates that use it.
+    """
+    return {"profiles_version": SimpleLazyObject(profiles_version)}
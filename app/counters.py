@@ -0,0 +1,138 @@
+"""
+Write-behind listing counters (``PostDailyStats``).
+
+Feed impressions and message inquiries are counted in this process's
+memory and written out in batches: a flush turns everything buffered into
+one INSERT of missing daily rows plus one UPDATE per day and field, each
+adding a ``CASE`` of per-post increments. The request that finds the buffer
+due (``FLUSH_SECONDS`` old or ``FLUSH_KEYS`` posts) flushes it after its
+response has been sent, and whatever is left is flushed at exit. A killed
+worker loses at most one interval of counts, which analytics can live with.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import freshness
+from .models import Post, PostDailyStats
+
+logger = logging.getLogger(__name__)
+
+VIEWS = "views"
+INQUIRIES = "inquiries"
+
+FLUSH_SECONDS = 30
+FLUSH_KEYS = 1000
+# Posts per UPDATE, to keep the CASE expressions a reasonable size.
+BATCH_SIZE = 500
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._started = time.monotonic()
+
+    def add(self, post_ids, field: str) -> None:
+        day = timezone.localdate()
+        with self._lock:
+            if not self._counts:
+                self._started = time.monotonic()
+            for post_id in post_ids:
+                self._counts[(post_id, day, field)] += 1
+
+    def due(self) -> bool:
+        return bool(self._counts) and (
+            len(self._counts) >= FLUSH_KEYS
+            or time.monotonic() - self._started >= FLUSH_SECONDS
+        )
+
+    def drain(self) -> Counter:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+    def restore(self, counts: Counter) -> None:
+        with self._lock:
+            self._counts.update(counts)
+
+
+buffer = CounterBuffer()
+
+
+def record_views(post_ids) -> None:
+    buffer.add(post_ids, VIEWS)
+
+
+def record_inquiry(post_id) -> None:
+    buffer.add([post_id], INQUIRIES)
+
+
+def write_counts(counts: Counter) -> int:
+    """Add ``{(post_id, day, field): n}`` to ``PostDailyStats``; returns rows touched."""
+    owners = dict(
+        Post.objects.filter(pk__in={post_id for post_id, _, _ in counts})
+        .values_list("pk", "user_id")
+    )
+    # Posts deleted since they were counted are dropped.
+    by_day = {}
+    for (post_id, day, field), n in counts.items():
+        if post_id in owners:
+            by_day.setdefault(day, {}).setdefault(field, {})[post_id] = n
+    if not by_day:
+        return 0
+
+    now = timezone.now()
+    touched = 0
+    with transaction.atomic():
+        PostDailyStats.objects.bulk_create(
+            [
+                PostDailyStats(post_id=post_id, day=day)
+                for day, fields in by_day.items()
+                for post_id in set().union(*fields.values())
+            ],
+            ignore_conflicts=True,
+        )
+        for day, fields in by_day.items():
+            for field, increments in fields.items():
+                items = list(increments.items())
+                for start in range(0, len(items), BATCH_SIZE):
+                    batch = items[start:start + BATCH_SIZE]
+                    touched += PostDailyStats.objects.filter(
+                        day=day, post_id__in=[post_id for post_id, _ in batch]
+                    ).update(**{
+                        field: F(field) + Case(
+                            *(When(post_id=post_id, then=Value(n)) for post_id, n in batch),
+                            default=Value(0),
+                            output_field=IntegerField(),
+                        ),
+                        "updated_at": now,
+                    })
+    freshness.invalidate_stats(set(owners.values()))
+    return touched
+
+
+def flush() -> int:
+    counts = buffer.drain()
+    if not counts:
+        return 0
+    try:
+        return write_counts(counts)
+    except DatabaseError:
+        logger.exception("Could not flush %s listing counters; keeping them for the next flush", len(counts))
+        buffer.restore(counts)
+        return 0
+
+
+def flush_if_due() -> None:
+    if buffer.due():
+        flush()
+
+
+atexit.register(flush)
@@ -0,0 +1,117 @@
+"""
+Read-replica routing.
+
+Writes always go to ``default``. Reads go to ``default`` too, except inside
+views wrapped in ``@replica_reads``, which send them to the alias named by
+``settings.DATABASE_REPLICA`` when that database is configured.
+
+A browser that has just made a write request (POST, etc.) carries a short-lived
+cookie set by ``PrimaryStickinessMiddleware``. While the cookie is present
+its reads stay on the primary, so a message just sent or a post just created
+shows up even if the replica lags behind.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = getattr(settings, "DATABASE_REPLICA", None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def reading_from_replica() -> bool:
+    return _read_alias.get() is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def replica_reads(view_func):
+    """
+    Serve a read-only view from the replica. The view must not rely on
+    reading its own writes; anything it writes still goes to the primary.
+    Works on async views too: ``sync_to_async`` copies the context, so ORM
+    calls made from the view see the same alias.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = replica_alias()
+            if alias is None or getattr(request, "pinned_to_primary", False):
+                return await view_func(request, *args, **kwargs)
+            token = _read_alias.set(alias)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if alias is None or getattr(request, "pinned_to_primary", False):
+            return view_func(request, *args, **kwargs)
+        token = _read_alias.set(alias)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Pin a browser to the primary for ``REPLICA_STICKY_SECONDS`` after any
+    write request, and mark requests that arrive within that window.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.pinned_to_primary = STICKY_COOKIE in request.COOKIES
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        request.pinned_to_primary = STICKY_COOKIE in request.COOKIES
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and replica_alias():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 15),
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,199 @@
+"""
+Freshness validators for conditional GET.
+
+Each page's ETag is built from a few cheap "versions": one aggregate query
+over ``updated_at`` instead of the page's own querysets. With a shared cache
+the versions are memoised and dropped by signals when the rows change;
+otherwise they are recomputed (see app/caching.py). The tag also folds in
+the viewer, because hidden listings and staff links make every page
+user-specific, and the CSRF cookie, because the cached HTML carries a token
+derived from it. Pages that show relative times ("Expires in 3 hours") add
+the current minute.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from . import caching
+from .audiences import excluded_version
+from .models import Post, PostDailyStats, Profile
+from .ranking import get_ranked
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _aggregate_version(queryset) -> str:
+    agg = queryset.aggregate(last=Max("updated_at"), count=Count("pk"))
+    last = agg["last"].timestamp() if agg["last"] else 0
+    return f"{last}:{agg['count']}"
+
+
+def _version(key: str, queryset) -> str:
+    if not caching.is_shared():
+        return _aggregate_version(queryset)
+    version = cache.get(key)
+    if version is None:
+        version = _aggregate_version(queryset)
+        cache.set(key, version, caching.computed_timeout(CACHE_TIMEOUT))
+    return version
+
+
+def feed_version() -> str:
+    return _version("freshness:feed", Post.objects.all())
+
+
+def user_posts_version(user_id) -> str:
+    return _version(f"freshness:posts:{user_id}", Post.objects.filter(user_id=user_id))
+
+
+def user_stats_version(user_id) -> str:
+    return _version(f"freshness:stats:{user_id}", PostDailyStats.objects.filter(post__user_id=user_id))
+
+
+def profiles_version() -> str:
+    """Names and avatars appear on every page, so any profile edit counts."""
+    return _version("freshness:profiles", Profile.objects.all())
+
+
+def thread_version(thread_id, user) -> str | None:
+    """
+    Not memoised: the same query also checks membership, so a non-participant
+    gets no tag and falls through to the view's 404.
+    """
+    from messaging.models import Message
+
+    agg = (
+        Message.objects
+        .filter(thread_id=thread_id, thread__participants=user)
+        .aggregate(last=Max("updated_at"), count=Count("pk"))
+    )
+    if not agg["count"]:
+        return None
+    return f"{agg['last'].timestamp()}:{agg['count']}"
+
+
+def invalidate_posts(user_id) -> None:
+    cache.delete_many(["freshness:feed", f"freshness:posts:{user_id}"])
+
+
+def invalidate_stats(user_ids) -> None:
+    cache.delete_many([f"freshness:stats:{user_id}" for user_id in user_ids])
+
+
+def invalidate_profiles() -> None:
+    cache.delete("freshness:profiles")
+
+
+def touch_post(post_id) -> None:
+    """
+    Bump a post's ``updated_at`` for changes stored outside its own row
+    (images, hidden audiences).
+    """
+    Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+    user_id = Post.objects.filter(pk=post_id).values_list("user_id", flat=True).first()
+    invalidate_posts(user_id)
+
+
+def clock_version(seconds=60) -> str:
+    """Changes every ``seconds``: for pages whose text changes with time alone."""
+    return str(int(time.time() // seconds))
+
+
+def make_etag(request, page: str, *versions) -> str | None:
+    if any(v is None for v in versions):
+        return None
+    user = request.user
+    # Pages embed CSRF tokens; make sure the cookie they derive from exists
+    # now, so the first response's tag still matches on the next request.
+    get_token(request)
+    parts = [
+        page,
+        str(user.pk),
+        "staff" if user.is_staff else "",
+        request.META.get("CSRF_COOKIE", ""),
+        request.GET.urlencode(),
+        *versions,
+    ]
+    return hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def revalidate(etag_func):
+    """
+    Answer matching ``If-None-Match`` requests with 304 before the view runs,
+    and tell browsers to keep a private copy but always revalidate it.
+    Wrap with ``login_required`` outside this so ``request.user`` is real.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            # Django's condition() would call etag_func on the event loop;
+            # the versions hit the cache and database, so run it in a thread.
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                etag = quote_etag(etag) if etag is not None else None
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                if etag and request.method in ("GET", "HEAD"):
+                    response.headers.setdefault("ETag", etag)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        conditional = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def dashboard_etag(request):
+    ranked = get_ranked(request.user.pk)
+    ranked_at = ranked["computed_at"] if ranked else 0
+    return make_etag(
+        request,
+        "dashboard",
+        feed_version(),
+        profiles_version(),
+        excluded_version(request.user.pk),
+        str(ranked_at),
+    )
+
+
+def my_posts_etag(request):
+    return make_etag(
+        request,
+        "my_posts",
+        user_posts_version(request.user.pk),
+        user_stats_version(request.user.pk),
+        profiles_version(),
+        # "Expires in …" counts down to the minute.
+        clock_version(),
+    )
+
+
+def user_profile_etag(request, user_id):
+    return make_etag(
+        request,
+        f"user_profile:{user_id}",
+        user_posts_version(user_id),
+        profiles_version(),
+        excluded_version(request.user.pk),
+    )
+
+
+def thread_etag(request, thread_id):
+    return make_etag(request, f"thread:{thread_id}", thread_version(thread_id, request.user), profiles_version())
@@ -0,0 +1,185 @@
+"""
+Pickup locations and "near me" search.
+
+A post's optional pickup point is stored as latitude/longitude plus its
+geohash, an indexed string in which every prefix is a grid cell. A radius
+search picks the cell size that is at least as large as the radius, so the
+circle lies within the centre's cell and its eight neighbours, and asks for
+each of those cells as a ``geohash >= cell AND geohash < next cell`` range,
+where the next cell bumps the cell's last base32 character. The bounds only
+contain digits and lowercase letters, which sort the same under byte order
+and under the linguistic collations Postgres databases usually have, so the
+range is a plain index scan either way. Candidates are then refined with the
+exact great-circle distance.
+"""
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+GEOHASH_PRECISION = 9  # cells of about 5 m
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Named spots offered when posting and searching.
+PICKUP_SPOTS = [
+    ("rotunda", "The Rotunda", 38.0356, -78.5034),
+    ("newcomb", "Newcomb Hall", 38.0359, -78.5066),
+    ("clemons", "Clemons Library", 38.0363, -78.5057),
+    ("corner", "The Corner", 38.0349, -78.5003),
+    ("clark", "Clark Hall", 38.0330, -78.5075),
+    ("rice", "Rice Hall", 38.0316, -78.5108),
+    ("ohill", "Observatory Hill Dining", 38.0350, -78.5150),
+    ("gooch_dillard", "Gooch/Dillard", 38.0297, -78.5177),
+    ("runk", "Runk Dining", 38.0293, -78.5213),
+    ("aquatic", "Aquatic & Fitness Center", 38.0385, -78.5128),
+    ("jpj", "John Paul Jones Arena", 38.0461, -78.5067),
+    ("barracks", "Barracks Road Shopping Center", 38.0518, -78.5057),
+]
+SPOTS = {key: (label, lat, lon) for key, label, lat, lon in PICKUP_SPOTS}
+SPOT_CHOICES = [(key, label) for key, label, _, _ in PICKUP_SPOTS]
+
+RADIUS_CHOICES = [(0.5, "500 m"), (1, "1 km"), (2, "2 km"), (5, "5 km"), (10, "10 km")]
+DEFAULT_RADIUS_KM = 1
+MAX_RADIUS_KM = 50
+
+
+def encode(lat: float, lon: float, precision=GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, x = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if x >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int):
+    """``(height, width)`` in degrees of a geohash cell."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def distance_km(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle (haversine) distance."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def search_cells(lat, lon, radius_km) -> list:
+    """
+    Geohash prefixes whose cells together cover the circle: the centre's
+    cell and its neighbours, at the finest precision whose cells are still
+    at least ``radius_km`` across. Empty if the radius is too large to
+    narrow anything down.
+    """
+    shrink = max(math.cos(math.radians(lat)), 1e-6)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height * KM_PER_DEGREE >= radius_km and width * KM_PER_DEGREE * shrink >= radius_km:
+            break
+    else:
+        return []
+    cells = {
+        encode(
+            max(-90.0, min(90.0, lat + dy * height)),
+            (lon + dx * width + 180) % 360 - 180,
+            precision,
+        )
+        for dy in (-1, 0, 1)
+        for dx in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+def parse_point(lat, lon):
+    """``(lat, lon)`` as floats from form input, or None if missing or out of range."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or math.isnan(lat) or math.isnan(lon):
+        return None
+    return lat, lon
+
+
+def parse_radius(value) -> float:
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RADIUS_KM
+    return min(max(radius, 0.1), MAX_RADIUS_KM) if math.isfinite(radius) else DEFAULT_RADIUS_KM
+
+
+def requested_point(params):
+    """
+    The search centre from query parameters: ``near`` names a spot, or is
+    ``here`` with ``lat``/``lon`` filled in by the browser. None otherwise.
+    """
+    near = params.get("near") or ""
+    if near in SPOTS:
+        _, lat, lon = SPOTS[near]
+        return lat, lon
+    if near == "here":
+        return parse_point(params.get("lat"), params.get("lon"))
+    return None
+
+
+def set_location(post, spot="", lat=None, lon=None) -> None:
+    """Set (or clear) ``post``'s pickup location from a named spot or a point; doesn't save."""
+    point = parse_point(lat, lon)
+    if spot in SPOTS:
+        _, *point = SPOTS[spot]
+    else:
+        spot = ""
+    post.pickup_spot = spot
+    post.latitude, post.longitude = point or (None, None)
+    post.geohash = encode(*point) if point else ""
+
+
+def cell_end(cell: str) -> str:
+    """
+    The first geohash after every hash that starts with ``cell``, or "" when
+    none follows (the cell is all "z"s).
+    """
+    head = cell.rstrip("z")
+    if not head:
+        return ""
+    return head[:-1] + BASE32[BASE32.index(head[-1]) + 1]
+
+
+def cell_filter(cell: str) -> Q:
+    end = cell_end(cell)
+    return Q(geohash__gte=cell, geohash__lt=end) if end else Q(geohash__gte=cell)
+
+
+def nearby(queryset, lat, lon, radius_km) -> list:
+    """
+    Ids of the posts in ``queryset`` with a pickup point within
+    ``radius_km`` of ``(lat, lon)``, nearest first.
+    """
+    cells = search_cells(lat, lon, radius_km)
+    candidates = queryset.exclude(geohash="")
+    if cells:
+        candidates = candidates.filter(reduce(or_, map(cell_filter, cells)))
+    found = []
+    for pk, plat, plon in candidates.order_by().values_list("pk", "latitude", "longitude"):
+        d = distance_km(lat, lon, plat, plon)
+        if d <= radius_km:
+            found.append((d, pk))
+    found.sort()
+    return [pk for _, pk in found]
@@ -0,0 +1,19 @@
+"""
+Pillow, loaded on first use. Importing it and registering the HEIF opener
+costs tens of milliseconds that most requests, and every management command,
+would otherwise pay at startup.
+"""
+from functools import cache
+
+
+@cache
+def pil_image():
+    """The ``PIL.Image`` module, with HEIC/HEIF support when available."""
+    from PIL import Image
+
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except Exception:
+        pass
+    return Image
@@ -0,0 +1,110 @@
+"""
+The login pipeline: everything derived from a user when they log in.
+
+One query loads the user with their profile and Google account data. The
+derived values (``is_staff`` from ``MODERATOR_EMAILS``, names from Google,
+the profile role and ``last_login``) are compared with what is stored, and
+each table gets at most one UPDATE, covering only the fields that changed.
+Django's own ``update_last_login`` receiver is disconnected in
+``AppConfig.ready`` so ``last_login`` rides along in the same UPDATE.
+"""
+from allauth.socialaccount.models import SocialAccount
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import JSONField, OuterRef, Subquery
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Profile
+
+User = get_user_model()
+
+GOOGLE = "google"
+
+
+def is_moderator_email(email) -> bool:
+    """``MODERATOR_EMAILS`` is normalised to a frozenset in settings."""
+    return bool(email) and email.strip().lower() in settings.MODERATOR_EMAILS
+
+
+def split_full_name(name: str):
+    """
+    Best-effort split of a full name into (first, last).
+    If there's only one token, treat it as first name.
+    """
+    parts = (name or "").strip().split()
+    if not parts:
+        return "", ""
+    return parts[0], " ".join(parts[1:])
+
+
+def google_names(extra_data):
+    """(given, family) from a Google account's ``extra_data``."""
+    data = extra_data or {}
+    given = (data.get("given_name") or "").strip()
+    family = (data.get("family_name") or "").strip()
+    if not given and not family:
+        given, family = split_full_name(data.get("name") or "")
+    return given, family
+
+
+def load_login_state(user_id):
+    """The user, their profile (joined) and Google ``extra_data``, in one query."""
+    google = (
+        SocialAccount.objects
+        .filter(user=OuterRef("pk"), provider=GOOGLE)
+        .order_by("pk")
+        .values("extra_data")[:1]
+    )
+    return (
+        User.objects
+        .select_related("profile")
+        .annotate(google_data=Subquery(google, output_field=JSONField()))
+        .get(pk=user_id)
+    )
+
+
+def requested_role(request, is_staff: bool) -> str:
+    """Role from ``?role=...``; organizer needs staff, so no privilege escalation."""
+    role = (request.GET.get("role") if request is not None else "") or "member"
+    return "organizer" if role.lower() == "organizer" and is_staff else "member"
+
+
+def is_admin_site_login(request) -> bool:
+    return request is not None and request.path == reverse("admin:login")
+
+
+def run_login_pipeline(request, user) -> None:
+    state = load_login_state(user.pk)
+
+    user_changes = {"last_login": timezone.now()}
+
+    # Staff status follows MODERATOR_EMAILS for site logins; signing in to
+    # the Django admin itself leaves it alone.
+    if not is_admin_site_login(request):
+        is_mod = is_moderator_email(state.email)
+        if is_mod and not state.is_staff:
+            user_changes["is_staff"] = True
+        elif not is_mod and state.is_staff and not state.is_superuser:
+            user_changes["is_staff"] = False
+
+    given, family = google_names(state.google_data)
+    if not state.first_name and given:
+        user_changes["first_name"] = given
+    if not state.last_name and family:
+        user_changes["last_name"] = family
+
+    for field, value in user_changes.items():
+        setattr(user, field, value)
+    user.save(update_fields=list(user_changes))
+
+    is_staff = user_changes.get("is_staff", state.is_staff)
+    role = requested_role(request, is_staff or state.is_superuser)
+    try:
+        profile = state.profile
+    except Profile.DoesNotExist:
+        Profile.objects.get_or_create(user=user, defaults={"role": role})
+        return
+    if profile.role != role:
+        profile.role = role
+        profile.save(update_fields=["role", "updated_at"])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.archive import DEFAULT_BATCH_SIZE, archive_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Move expired listings, with their images and hidden audiences, from Post "
+        "to the archive tables in batches. Run periodically, e.g. hourly from the scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def report(total):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  archived {total}")
+
+        total = archive_expired(batch_size=options["batch_size"], report=report)
+        self.stdout.write(f"Archived {total} expired posts in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,187 @@
+import gzip
+import json
+import re
+from pathlib import Path
+
+from allauth.socialaccount.models import SocialApp
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from app.models import Post, PostFlag, Profile
+from messaging.models import Message, Thread
+
+User = get_user_model()
+
+INLINE_RE = re.compile(r"<(style|script)(?![^>]*\bsrc=)[^>]*>(.*?)</\1>", re.S)
+
+
+def inline_bytes(source: str) -> int:
+    return sum(len(m.group(2).encode()) for m in INLINE_RE.finditer(source))
+
+
+def compressed_sizes(data: bytes):
+    gz = len(gzip.compress(data, compresslevel=9))
+    try:
+        import brotli
+    except ImportError:
+        return gz, None
+    return gz, len(brotli.compress(data))
+
+
+def asset_path(name: str):
+    """The file behind a static name: a source file, or a collected (hashed) one."""
+    found = finders.find(name)
+    if found:
+        return Path(found)
+    if settings.STATIC_ROOT and Path(settings.STATIC_ROOT, name).is_file():
+        return Path(settings.STATIC_ROOT, name)
+    return None
+
+
+def linked_assets(html: str) -> list:
+    """Static names linked from rendered HTML by ``href``/``src``, in order."""
+    pattern = r"""(?:href|src)=["']%s([^"'?#]+)""" % re.escape(settings.STATIC_URL)
+    return list(dict.fromkeys(re.findall(pattern, html)))
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the main pages with seeded data and report what each one sends: "
+        "the HTML response plus the static bundles it links, raw and gzipped. "
+        "Fails when a page's total exceeds the budget or links a missing file. "
+        "Seeds data inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=int,
+            default=getattr(settings, "PAGE_BUDGET_BYTES", 64 * 1024),
+            help="Maximum raw bytes of HTML plus linked bundles per page (default: PAGE_BUDGET_BYTES).",
+        )
+        parser.add_argument("--save", help="Write the measurements to this JSON file, e.g. on main.")
+        parser.add_argument("--compare", help="Compare against measurements saved with --save.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                pages = self._measure()
+                raise Rollback
+        except Rollback:
+            pass
+
+        before = {}
+        if options["compare"]:
+            before = json.loads(Path(options["compare"]).read_text())
+        self._report(pages, before)
+
+        if options["save"]:
+            Path(options["save"]).write_text(json.dumps(pages, indent=2, sort_keys=True))
+
+        missing = sorted({name for page in pages.values() for name in page["missing"]})
+        if missing:
+            raise CommandError(f"Linked static files not found: {', '.join(missing)}")
+        over_budget = [label for label, page in pages.items() if page["total"] > options["budget"]]
+        if over_budget:
+            raise CommandError(
+                f"{len(over_budget)} page(s) over the {options['budget']} byte budget: "
+                + ", ".join(over_budget)
+            )
+
+    def _seed(self):
+        if not SocialApp.objects.filter(provider="google").exists():
+            # The login page links the Google provider, which needs an app.
+            app = SocialApp.objects.create(provider="google", name="Google", client_id="asset-budget")
+            app.sites.add(Site.objects.get_current())
+        viewer = User.objects.create_user(
+            "asset_budget", "asset_budget@example.com", "x", is_staff=True, is_superuser=True,
+        )
+        seller = User.objects.create_user("asset_budget_seller", "asset_budget_seller@example.com", "x")
+        Profile.objects.filter(user__in=[viewer, seller]).update(onboarding_complete=True)
+        posts = Post.objects.bulk_create(
+            Post(user=seller, title=f"Desk lamp {n}", price=5, description="Works fine.", category="other")
+            for n in range(12)
+        )
+        PostFlag.objects.create(post=posts[0], flagged_by=viewer, reason="Duplicate listing")
+        thread, _ = Thread.for_users(viewer, seller)
+        for n in range(10):
+            Message.objects.create(thread=thread, sender=seller if n % 2 else viewer, text=f"Message {n}")
+        return viewer, seller, thread
+
+    def _measure(self):
+        viewer, seller, thread = self._seed()
+        pages = [
+            ("login", None, reverse("account_login")),
+            ("dashboard", viewer, reverse("dashboard") + "?sort=new"),
+            ("my posts", seller, reverse("myposts")),
+            ("new post", viewer, reverse("newpost")),
+            ("saved searches", viewer, reverse("saved_searches")),
+            ("audiences", viewer, reverse("audiences")),
+            ("profile", viewer, reverse("profile")),
+            ("user profile", viewer, reverse("user_profile", args=[seller.pk])),
+            ("inbox", viewer, reverse("messaging:inbox")),
+            ("thread", viewer, reverse("messaging:thread", args=[thread.pk])),
+            ("new group", viewer, reverse("messaging:group_new")),
+            ("admin dashboard", viewer, reverse("admin_dashboard")),
+        ]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], RATE_LIMIT_ENABLED=False):
+            for label, user, url in pages:
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"{label}: GET {url} returned {response.status_code}")
+                html = response.content
+                assets, missing = {}, []
+                for name in linked_assets(html.decode()):
+                    path = asset_path(name)
+                    if path is None:
+                        missing.append(name)
+                    else:
+                        assets[name] = path.read_bytes()
+                asset_bytes = sum(len(data) for data in assets.values())
+                results[label] = {
+                    "html": len(html),
+                    "html_gzip": compressed_sizes(html)[0],
+                    "inline": inline_bytes(html.decode()),
+                    "assets": asset_bytes,
+                    "assets_gzip": sum(compressed_sizes(data)[0] for data in assets.values()),
+                    "total": len(html) + asset_bytes,
+                    "linked": sorted(assets),
+                    "missing": missing,
+                }
+        return results
+
+    def _report(self, pages, before):
+        header = f"{'page':20} {'html':>8} {'gzip':>7} {'inline':>7} {'bundles':>8} {'gzip':>7} {'total':>8}"
+        if before:
+            header += f" {'before':>8} {'saved':>8}"
+        self.stdout.write(header)
+        for label, page in pages.items():
+            line = (
+                f"{label:20} {page['html']:>8} {page['html_gzip']:>7} {page['inline']:>7} "
+                f"{page['assets']:>8} {page['assets_gzip']:>7} {page['total']:>8}"
+            )
+            if label in before:
+                line += f" {before[label]['total']:>8} {before[label]['total'] - page['total']:>8}"
+            self.stdout.write(line)
+
+        self.stdout.write(f"\n{'static bundle':40} {'raw':>8} {'gzip':>8} {'brotli':>8}")
+        for name in sorted({name for page in pages.values() for name in page["linked"]}):
+            data = asset_path(name).read_bytes()
+            gz, br = compressed_sizes(data)
+            self.stdout.write(f"{name:40} {len(data):>8} {gz:>8} {br if br is not None else '-':>8}")
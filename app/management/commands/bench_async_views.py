@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
+
+from app.models import Post, Profile
+from messaging.models import Message, Thread
+
+User = get_user_model()
+
+PREFIX = "bench_async_"
+
+
+def load_urls(async_views: bool) -> None:
+    """Re-import the urlconfs so they pick the sync or async view set."""
+    import app.urls
+    import messaging.urls
+
+    with override_settings(ASYNC_VIEWS=async_views):
+        importlib.reload(messaging.urls)
+        importlib.reload(app.urls)
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sustained requests/sec of the hot read views through the WSGI "
+        "handler (sync views, one thread per concurrent client) and the ASGI "
+        "handler (async views, one task per client). Seeds committed rows with "
+        f"the '{PREFIX}' prefix and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--messages", type=int, default=50)
+
+    def handle(self, *args, **options):
+        viewer = self._seed(options["posts"], options["messages"])
+        thread_id = Thread.objects.filter(participants=viewer).values_list("pk", flat=True).first()
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for mode in ("sync", "async"):
+                    load_urls(mode == "async")
+                    paths = {
+                        "dashboard": reverse("dashboard"),
+                        "inbox": reverse("messaging:inbox"),
+                        "thread": reverse("messaging:thread", args=[thread_id]),
+                        "user_list": reverse("messaging:user_list"),
+                    }
+                    for name, path in paths.items():
+                        if mode == "sync":
+                            done, errors = self._run_sync(viewer, path, options)
+                        else:
+                            done, errors = asyncio.run(self._run_async(viewer, path, options))
+                        rate = done / options["seconds"]
+                        suffix = f" ({errors} errors)" if errors else ""
+                        self.stdout.write(f"{mode:5} {name:10} {rate:8.1f} req/s{suffix}")
+        finally:
+            load_urls(settings.ASYNC_VIEWS)
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _seed(self, posts, messages):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        viewer = User.objects.create_user(f"{PREFIX}viewer", f"{PREFIX}viewer@example.com", "x")
+        authors = [
+            User.objects.create_user(f"{PREFIX}{i}", f"{PREFIX}{i}@example.com", "x")
+            for i in range(10)
+        ]
+        Profile.objects.filter(user__in=[viewer, *authors]).update(onboarding_complete=True)
+        Post.objects.bulk_create([
+            Post(
+                user=authors[i % len(authors)],
+                title=f"Listing {i}",
+                price=10,
+                description="Lightly used, pick up on grounds.",
+                category="books",
+            )
+            for i in range(posts)
+        ])
+        for author in authors[:5]:
+            thread, _ = Thread.for_users(viewer, author)
+            Message.objects.bulk_create([
+                Message(thread=thread, sender=author if i % 2 else viewer, text=f"Message {i}")
+                for i in range(messages)
+            ])
+        return viewer
+
+    def _run_sync(self, viewer, path, options):
+        deadline = time.perf_counter() + options["seconds"]
+
+        def worker():
+            client = Client()
+            client.force_login(viewer)
+            done = errors = 0
+            try:
+                while time.perf_counter() < deadline:
+                    if client.get(path).status_code == 200:
+                        done += 1
+                    else:
+                        errors += 1
+            finally:
+                connection.close()
+            return done, errors
+
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            results = list(pool.map(lambda _: worker(), range(options["concurrency"])))
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    async def _run_async(self, viewer, path, options):
+        deadline = time.perf_counter() + options["seconds"]
+
+        async def worker():
+            client = AsyncClient()
+            await client.aforce_login(viewer)
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                if (await client.get(path)).status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+            return done, errors
+
+        results = await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+        return sum(r[0] for r in results), sum(r[1] for r in results)
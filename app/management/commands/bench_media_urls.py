@@ -0,0 +1,101 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import engines
+from django.test.utils import override_settings
+
+from app.media import public_url
+from app.models import Post, PostImages, Profile
+
+User = get_user_model()
+
+# The same markup, once asking the storage for each URL and once reading
+# the URL stored on the row.
+STORAGE_TEMPLATE = """
+{% for img in images %}<img src="{{ img.image.url }}">{% endfor %}
+{% for p in profiles %}{% if p.avatar %}<div style="background-image:url('{{ p.avatar.url }}')"></div>{% endif %}{% endfor %}
+"""
+STORED_TEMPLATE = """
+{% for img in images %}<img src="{{ img.src }}">{% endfor %}
+{% for p in profiles %}{% if p.avatar_src %}<div style="background-image:url('{{ p.avatar_src }}')"></div>{% endif %}{% endfor %}
+"""
+
+S3_STORAGE = {
+    "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+    # Public URLs on a custom domain are built locally; no requests are made.
+    "OPTIONS": {
+        "bucket_name": "bench-bucket",
+        "custom_domain": "bench-bucket.s3.amazonaws.com",
+        "location": "media",
+        "querystring_auth": False,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering post images and avatars with URLs resolved by the "
+        "storage backend per render versus read from the stored url columns. "
+        "Seeds data inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--images", type=int, default=3, help="Images per post.")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--s3", action="store_true", help="Use the S3 backend (django-storages) as prod does.")
+
+    def _seed(self, posts, images):
+        authors = [
+            User.objects.create_user(f"bench_media_{i}", f"bench_media_{i}@example.com", "x")
+            for i in range(50)
+        ]
+        for profile in Profile.objects.filter(user__in=authors):
+            profile.avatar = f"avatars/bench_{profile.user_id}.jpg"
+            profile.save(update_fields=["avatar"])
+        created = Post.objects.bulk_create([
+            Post(user=authors[i % len(authors)], title=f"Listing {i}", price=10, description="x", category="books")
+            for i in range(posts)
+        ])
+        PostImages.objects.bulk_create([
+            PostImages(post=post, image=name, url=public_url(name))
+            for post in created
+            for name in (f"posts/bench_{post.pk}_{n}.jpg" for n in range(images))
+        ])
+        return [p.user_id for p in created], [p.pk for p in created]
+
+    def _time(self, label, template, context, iterations):
+        timings = []
+        for _ in range(iterations):
+            # Fresh instances each time, as each request loads its own rows.
+            images = list(PostImages.objects.filter(post_id__in=context["post_ids"]))
+            by_user = {p.user_id: p for p in Profile.objects.filter(user_id__in=set(context["author_ids"]))}
+            # One avatar per card, as on the dashboard.
+            profiles = [by_user[pk] for pk in context["author_ids"]]
+            start = time.perf_counter()
+            template.render({"images": images, "profiles": profiles})
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"  {label:28} mean {statistics.mean(timings):8.2f} ms   "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms"
+        )
+        return statistics.mean(timings)
+
+    def handle(self, *args, **options):
+        storages = {**settings.STORAGES, "default": S3_STORAGE} if options["s3"] else settings.STORAGES
+        engine = engines["django"]
+        with override_settings(STORAGES=storages), transaction.atomic():
+            author_ids, post_ids = self._seed(options["posts"], options["images"])
+            context = {"author_ids": author_ids, "post_ids": post_ids}
+            backend = settings.STORAGES["default"]["BACKEND"].rsplit(".", 1)[-1]
+            self.stdout.write(
+                f"{len(post_ids) * options['images']} images, {len(post_ids)} avatars, storage {backend}"
+            )
+            before = self._time("url from storage", engine.from_string(STORAGE_TEMPLATE), context, options["iterations"])
+            after = self._time("stored url", engine.from_string(STORED_TEMPLATE), context, options["iterations"])
+            self.stdout.write(f"  saving {before - after:.2f} ms per render ({before / after:.1f}x)")
+            transaction.set_rollback(True)
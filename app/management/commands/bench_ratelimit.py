@@ -0,0 +1,55 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from app.ratelimit import Policy, bucket_cache, hit, rate_limit
+
+
+def plain_view(request):
+    return HttpResponse("ok")
+
+
+limited_view = rate_limit("bench_user", "1000000/s")(
+    rate_limit("bench_ip", "1000000/s", key="ip")(plain_view)
+)
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of the rate limiter against the configured cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        factory = RequestFactory()
+
+        def run(view):
+            start = time.perf_counter()
+            for i in range(n):
+                request = factory.post("/bench/", REMOTE_ADDR=f"10.0.{i % 250}.1")
+                request.user = AnonymousUser()
+                view(request)
+            return (time.perf_counter() - start) / n * 1e6
+
+        with override_settings(RATE_LIMITS={}):
+            run(limited_view)  # warm up
+            base = run(plain_view)
+            limited = run(limited_view)
+
+        self.stdout.write(f"cache backend: {bucket_cache().__class__.__name__}")
+        self.stdout.write(f"view without limiter: {base:8.1f} us/request")
+        self.stdout.write(f"view with 2 policies: {limited:8.1f} us/request")
+        self.stdout.write(self.style.SUCCESS(f"limiter overhead:     {limited - base:8.1f} us/request"))
+
+        policy = Policy("bench_burst", "5/m", burst=5)
+        bucket_cache().delete("rl:bench_burst:bench")
+        outcomes = [hit(policy, "bench", now_ms=1_000_000)[0] for _ in range(7)]
+        later = hit(policy, "bench", now_ms=1_000_000 + 12_000)[0]
+        self.stdout.write(
+            f"sanity (5/m, burst 5): {sum(outcomes)} of 7 instant requests allowed, "
+            f"{'one more' if later else 'none'} allowed 12s later"
+        )
@@ -0,0 +1,139 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Post, SavedSearch
+from app.saved_searches import find_matches, index_term, title_terms
+
+User = get_user_model()
+
+WORDS = (
+    "desk lamp chair table sofa couch bed frame mattress dresser shelf bookcase "
+    "mirror rug curtain fan heater kettle toaster blender microwave fridge pan pot "
+    "knife mug plate bowl laptop monitor keyboard mouse charger cable headphones "
+    "speaker phone tablet camera printer router calculator textbook notebook novel "
+    "chemistry calculus physics biology economics history psychology statistics "
+    "jacket coat hoodie sweater jeans boots sneakers dress shirt scarf gloves hat "
+    "ticket concert football basketball game season pass parking bike helmet lock "
+    "ikea apple samsung dell lenovo sony bose nike adidas patagonia northface "
+    "black white blue red green grey wooden metal vintage new used small large"
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time matching new posts against saved searches through the reverse "
+        "index, compared with scanning every saved search, and check both give "
+        "the same matches. Seeds data inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=100_000)
+        parser.add_argument("--posts", type=int, default=200, help="New posts to match.")
+        parser.add_argument("--per-user", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _query(self):
+        """Mostly two-word phrases ("sony headphones"), some single words and prefixes."""
+        roll = self.rng.random()
+        if roll < 0.6:
+            return " ".join(self.rng.sample(WORDS, 2))
+        if roll < 0.8:
+            return self.rng.choice(WORDS)
+        if roll < 0.95:
+            word = self.rng.choice(WORDS)
+            return word[:self.rng.randint(3, max(3, len(word)))]
+        return ""
+
+    def _run(self, options):
+        categories = [code for code, _ in Post.CATEGORIES]
+        users = options["searches"] // options["per_user"] + 1
+        User.objects.bulk_create(
+            [User(username=f"bench_saved_{i}", password="!") for i in range(users)],
+            batch_size=1000,
+        )
+        user_ids = list(User.objects.filter(username__startswith="bench_saved_").values_list("pk", flat=True))
+        seller = User.objects.create(username="bench_saved_seller", password="!")
+
+        start = time.perf_counter()
+        rows, seen = [], set()
+        while len(rows) < options["searches"]:
+            user_id = user_ids[len(rows) // options["per_user"]]
+            query = self._query()
+            category = self.rng.choice(categories) if self.rng.random() < 0.6 or not query else ""
+            if (user_id, query, category) in seen:
+                continue
+            seen.add((user_id, query, category))
+            rows.append(SavedSearch(user_id=user_id, query=query, category=category, term=index_term(query)))
+        SavedSearch.objects.bulk_create(rows, batch_size=5000)
+        self.stdout.write(f"Seeded {len(rows)} saved searches for {len(user_ids)} users in {time.perf_counter() - start:.1f}s")
+
+        biggest = (
+            SavedSearch.objects.values("category", "term")
+            .annotate(n=Count("pk")).order_by("-n").first()
+        )
+        self.stdout.write(f"Largest index key: {biggest['category'] or 'any'}/{biggest['term']!r} with {biggest['n']} searches")
+
+        posts = [
+            Post(
+                user_id=seller.pk,
+                title=" ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(3, 6))).capitalize(),
+                category=self.rng.choice(categories),
+            )
+            for _ in range(options["posts"])
+        ]
+
+        indexed_ms, indexed_matches, candidates = [], [], 0
+        for post in posts:
+            with CaptureQueriesContext(connection) as captured:
+                t0 = time.perf_counter()
+                indexed_matches.append(sorted(find_matches(post)))
+                indexed_ms.append((time.perf_counter() - t0) * 1000)
+            assert len(captured) == 1
+            candidates += SavedSearch.objects.filter(
+                category__in=["", post.category], term__in=title_terms(post.title),
+            ).count()
+
+        # Baseline: every saved search, already in memory, checked per post.
+        everything = list(SavedSearch.objects.values_list("pk", "user_id", "query", "category"))
+        scan_ms, scan_matches = [], []
+        for post in posts:
+            t0 = time.perf_counter()
+            title = post.title.lower()
+            scan_matches.append(sorted(
+                pk for pk, user_id, query, category in everything
+                if user_id != post.user_id
+                and category in ("", post.category)
+                and query.lower() in title
+            ))
+            scan_ms.append((time.perf_counter() - t0) * 1000)
+
+        agree = indexed_matches == scan_matches
+        per_post = sum(len(m) for m in indexed_matches) / len(posts)
+        self.stdout.write(
+            f"Per post: {candidates / len(posts):.1f} candidates, {per_post:.1f} matches; "
+            f"index and scan agree: {agree}"
+        )
+        self.stdout.write(f"{'method':<28} {'mean ms':>9} {'p95 ms':>9}")
+        for label, timings in (("reverse index (1 query)", indexed_ms), ("scan all (in memory)", scan_ms)):
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            self.stdout.write(f"{label:<28} {statistics.mean(timings):>9.2f} {p95:>9.2f}")
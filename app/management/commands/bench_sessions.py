@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from app.models import Post, PostFlag, Profile
+
+User = get_user_model()
+
+PROFILES = [
+    ("db sessions, fallback messages", {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.fallback.FallbackStorage",
+    }),
+    ("db sessions, session messages", {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.session.SessionStorage",
+    }),
+    ("cached sessions, cookie messages", {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    }),
+    ("configured", {
+        "SESSION_ENGINE": settings.SESSION_ENGINE,
+        "MESSAGE_STORAGE": settings.MESSAGE_STORAGE,
+    }),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Count django_session queries per request for a page view and for a "
+        "POST that flashes a message, under the plain DB session engine and the "
+        "configured one. Seeds data inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["iterations"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, iterations):
+        staff = User.objects.create_user("bench_sessions", "bench_sessions@example.com", "x", is_staff=True, is_superuser=True)
+        author = User.objects.create_user("bench_sessions_author", "bench_sessions_author@example.com", "x")
+        Profile.objects.filter(user__in=[staff, author]).update(onboarding_complete=True)
+        post = Post.objects.create(user=author, title="Desk lamp", price=5, description="Works.")
+
+        self.stdout.write(f"{'profile':<34} {'flow':<14} {'session q/req':>14} {'all q/req':>10} {'ms/req':>8}")
+        for label, overrides in PROFILES:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                RATE_LIMIT_ENABLED=False,
+                **overrides,
+            ):
+                caches[settings.SESSION_CACHE_ALIAS].clear()
+                client = Client()
+                client.force_login(staff)
+                client.get(reverse("dashboard"))  # warm up
+
+                def page_view():
+                    client.get(reverse("dashboard"))
+
+                def flash():
+                    flag = PostFlag.objects.create(post=post, flagged_by=author, reason="bench")
+                    client.post(reverse("admin_resolve_flag", args=[flag.pk]), follow=True)
+
+                for flow, step in (("page view", page_view), ("flash message", flash)):
+                    session_queries = total_queries = 0
+                    start = time.perf_counter()
+                    for _ in range(iterations):
+                        with CaptureQueriesContext(connection) as captured:
+                            step()
+                        total_queries += len(captured)
+                        session_queries += sum("django_session" in q["sql"] for q in captured)
+                    elapsed = (time.perf_counter() - start) / iterations * 1000
+                    self.stdout.write(
+                        f"{label:<34} {flow:<14} {session_queries / iterations:>14.2f} "
+                        f"{total_queries / iterations:>10.1f} {elapsed:>8.2f}"
+                    )
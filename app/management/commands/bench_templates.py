@@ -0,0 +1,136 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from app.media import public_url
+from app.models import Post, PostImages, Profile
+from app.views import dashboard
+from messaging.models import Message, Thread
+from messaging.views import thread_detail
+
+User = get_user_model()
+
+UNCACHED_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+CACHED_LOADERS = [("django.template.loaders.cached.Loader", UNCACHED_LOADERS)]
+
+
+def templates_with(loaders):
+    from django.conf import settings
+
+    config = dict(settings.TEMPLATES[0])
+    config["APP_DIRS"] = False
+    config["OPTIONS"] = {**config.get("OPTIONS", {}), "loaders": loaders}
+    return [config]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering of dashboard and thread_detail with and without the "
+        "cached template loader and {% cache %} fragments. Seeds data inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def _seed(self, posts, messages):
+        viewer = User.objects.create_user("bench_viewer", "bench_viewer@example.com", "x")
+        authors = [
+            User.objects.create_user(f"bench_author_{i}", f"bench_author_{i}@example.com", "x", first_name="Author")
+            for i in range(20)
+        ]
+        Profile.objects.filter(user__in=[viewer, *authors]).update(onboarding_complete=True)
+
+        created = Post.objects.bulk_create([
+            Post(
+                user=authors[i % len(authors)],
+                title=f"Listing {i}",
+                price=10,
+                description="Lightly used, pick up on grounds. " * 5,
+                category="books",
+            )
+            for i in range(posts)
+        ])
+        PostImages.objects.bulk_create([
+            PostImages(post=post, image=name, url=public_url(name))
+            for post in created
+            for name in (f"posts/bench_{post.pk}_{n}.jpg" for n in range(2))
+        ])
+
+        thread, _ = Thread.for_users(viewer, authors[0])
+        Message.objects.bulk_create([
+            Message(thread=thread, sender=viewer if i % 2 else authors[0], text=f"Message {i}")
+            for i in range(messages)
+        ])
+        return viewer, thread
+
+    def _time(self, label, view, make_request, iterations, clear_fragments):
+        timings = []
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries[-1] += 1
+            return execute(sql, params, many, context)
+
+        for _ in range(iterations):
+            if clear_fragments:
+                cache.clear()
+            request = make_request()
+            queries.append(0)
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                response = view()(request)
+                response.content
+                timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"  {label:34} mean {statistics.mean(timings):8.2f} ms   "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms   queries {queries[-1]}"
+        )
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        iterations = options["iterations"]
+
+        with transaction.atomic():
+            viewer, thread = self._seed(options["posts"], options["messages"])
+
+            def dashboard_request():
+                request = factory.get("/dashboard/")
+                request.user = viewer
+                return request
+
+            def thread_request():
+                request = factory.get(f"/messages/t/{thread.pk}/")
+                request.user = viewer
+                return request
+
+            pages = [
+                ("dashboard", lambda: dashboard, dashboard_request),
+                ("thread_detail", lambda: lambda r: thread_detail(r, thread_id=thread.pk), thread_request),
+            ]
+            scenarios = [
+                ("uncached loader, no fragments", UNCACHED_LOADERS, True),
+                ("cached loader, cold fragments", CACHED_LOADERS, True),
+                ("cached loader, warm fragments", CACHED_LOADERS, False),
+            ]
+
+            for name, view, make_request in pages:
+                self.stdout.write(name)
+                for label, loaders, clear_fragments in scenarios:
+                    with override_settings(TEMPLATES=templates_with(loaders)):
+                        view()(make_request())  # warm-up: fills loader and fragment caches
+                        self._time(label, view, make_request, iterations, clear_fragments)
+
+            transaction.set_rollback(True)
+        cache.clear()
@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from messaging.archive import DEFAULT_BATCH_SIZE, compact, compact_cutoff
+from messaging.models import Message, MessageArchiveBlock
+
+
+def table_bytes(model):
+    """Size of a table with its indexes, where the database can tell (else None)."""
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT pg_total_relation_size(%s)"
+    elif connection.vendor == "sqlite":
+        sql = (
+            "SELECT SUM(d.pgsize) FROM dbstat d "
+            "JOIN sqlite_master m ON d.name = m.name WHERE m.tbl_name = %s"
+        )
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            return cursor.fetchone()[0] or 0
+    except DatabaseError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Pack messages older than --days into compressed per-thread, per-month "
+        "archive blocks and delete the originals. Run periodically, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=180, help="Keep messages from the last N days live.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Blocks per batch.")
+
+    def _sizes(self):
+        return {model: table_bytes(model) for model in (Message, MessageArchiveBlock)}
+
+    def handle(self, *args, **options):
+        cutoff = compact_cutoff(timedelta(days=options["days"]))
+        before = self._sizes()
+        start = time.perf_counter()
+
+        def report(total):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  compacted {total}")
+
+        total = compact(cutoff, batch_size=options["batch_size"], report=report)
+        self.stdout.write(
+            f"Compacted {total} messages from before {cutoff:%Y-%m-%d} in {time.perf_counter() - start:.2f}s"
+        )
+
+        after = self._sizes()
+        for model in (Message, MessageArchiveBlock):
+            if before[model] is not None:
+                self.stdout.write(
+                    f"  {model._meta.db_table}: {before[model] / 1024:.0f} KiB -> {after[model] / 1024:.0f} KiB"
+                )
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.media import DEFAULT_WORKERS, MAX_BATCH, delete_in_batches, iter_storage
+from app.models import ArchivedPostImage, ClaimedUpload, PostImages, Profile, StoredBlob
+from app.uploads import UPLOAD_PREFIXES, token_max_age
+
+# Keep IN (...) lists under SQLite's bound-parameter limit.
+LOOKUP_CHUNK = 500
+
+
+class ReferenceSet:
+    """
+    Set of referenced storage names kept in a temporary on-disk SQLite file,
+    so the diff never needs every name in memory.
+    """
+
+    def __init__(self, directory):
+        self.db = sqlite3.connect(os.path.join(directory, "refs.sqlite3"))
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE refs (name TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def add_all(self, names, chunk_size=5000):
+        names = iter(names)
+        while True:
+            chunk = [(n,) for n in islice(names, chunk_size) if n]
+            if not chunk:
+                break
+            self.db.executemany("INSERT OR IGNORE INTO refs (name) VALUES (?)", chunk)
+        self.db.commit()
+
+    def missing(self, names):
+        """Return the names from ``names`` that are not in the set."""
+        found = set()
+        for start in range(0, len(names), LOOKUP_CHUNK):
+            part = names[start:start + LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(part))
+            rows = self.db.execute(f"SELECT name FROM refs WHERE name IN ({placeholders})", part)
+            found.update(name for (name,) in rows)
+        return [n for n in names if n not in found]
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete media files under the upload prefixes that no PostImages, "
+        "ArchivedPostImage, StoredBlob or Profile row references. Storage is "
+        "listed page by page and diffed against an on-disk set of referenced names."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting them.")
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Leave files modified within this window alone (uploads not yet attached to a post).",
+        )
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            choices=sorted(UPLOAD_PREFIXES.values()),
+            help="Only scan this prefix (repeatable). Defaults to every upload prefix.",
+        )
+        parser.add_argument("--batch-size", type=int, default=MAX_BATCH)
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    def handle(self, *args, **options):
+        prefixes = options["prefix"] or sorted(UPLOAD_PREFIXES.values())
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        self.stats = {"scanned": 0, "recent": 0, "referenced": 0, "orphans": 0}
+
+        if not options["dry_run"]:
+            # Tokens past their lifetime can't be replayed; forget their claims.
+            expired = timezone.now() - timedelta(seconds=token_max_age())
+            pruned, _ = ClaimedUpload.objects.filter(claimed_at__lt=expired).delete()
+            self.stdout.write(f"{pruned} expired upload claims pruned")
+
+        with tempfile.TemporaryDirectory(prefix="gc_media_") as directory:
+            refs = ReferenceSet(directory)
+            try:
+                # Snapshot references before listing: anything attached after
+                # this point is newer than the grace cutoff and is skipped.
+                refs.add_all(PostImages.objects.values_list("image", flat=True).iterator(chunk_size=2000))
+                refs.add_all(ArchivedPostImage.objects.values_list("image", flat=True).iterator(chunk_size=2000))
+                refs.add_all(StoredBlob.objects.values_list("name", flat=True).iterator(chunk_size=2000))
+                refs.add_all(Profile.objects.exclude(avatar="").values_list("avatar", flat=True).iterator(chunk_size=2000))
+                self.stdout.write(f"{len(refs)} referenced files")
+
+                orphans = self.find_orphans(refs, prefixes, cutoff, options["batch_size"])
+                if options["dry_run"]:
+                    for name in orphans:
+                        if options["verbosity"] > 1:
+                            self.stdout.write(f"  orphan {name}")
+                    deleted = failed = 0
+                else:
+                    deleted, failed = delete_in_batches(
+                        orphans,
+                        batch_size=options["batch_size"],
+                        workers=options["workers"],
+                    )
+            finally:
+                refs.close()
+
+        s = self.stats
+        self.stdout.write(
+            f"scanned {s['scanned']}, within grace period {s['recent']}, "
+            f"referenced {s['referenced']}, orphaned {s['orphans']}"
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing deleted."))
+        elif failed:
+            self.stdout.write(self.style.ERROR(f"Deleted {deleted}, failed {failed}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted}."))
+
+    def find_orphans(self, refs, prefixes, cutoff, page_size):
+        """Yield orphaned names one listing page at a time."""
+        for prefix in prefixes:
+            listing = iter_storage(prefix)
+            while True:
+                page = list(islice(listing, page_size))
+                if not page:
+                    break
+                self.stats["scanned"] += len(page)
+                old = [name for name, modified in page if modified < cutoff]
+                self.stats["recent"] += len(page) - len(old)
+                orphans = refs.missing(old)
+                self.stats["referenced"] += len(old) - len(orphans)
+                self.stats["orphans"] += len(orphans)
+                yield from orphans
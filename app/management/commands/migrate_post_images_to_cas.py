@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from app.blobs import hash_stored
+from app.media import delete_files, public_url
+from app.models import PostImages, StoredBlob
+
+
+class Command(BaseCommand):
+    help = (
+        "Attach legacy PostImages (no blob) to content-addressed StoredBlobs. "
+        "The first file seen for a hash is adopted as the blob in place (no "
+        "copy); later identical files are re-pointed to it and deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Hash and report, change nothing.")
+        parser.add_argument("--limit", type=int, help="Stop after this many images.")
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        stats = {"images": 0, "adopted": 0, "deduplicated": 0, "missing": 0, "bytes_saved": 0}
+        seen = {}  # sha256 -> size, for --dry-run where no blobs are written
+        limit = options["limit"]
+        last_pk = 0
+
+        while not limit or stats["images"] < limit:
+            chunk = list(
+                PostImages.objects
+                .filter(blob__isnull=True, pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "image")[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+
+            for pk, name in chunk:
+                if limit and stats["images"] >= limit:
+                    break
+                last_pk = pk
+                stats["images"] += 1
+
+                try:
+                    sha256, size = hash_stored(name)
+                except Exception:
+                    stats["missing"] += 1
+                    self.stderr.write(f"  missing {name} (image {pk})")
+                    continue
+
+                if dry_run:
+                    if sha256 in seen or StoredBlob.objects.filter(sha256=sha256).exists():
+                        stats["deduplicated"] += 1
+                        stats["bytes_saved"] += size
+                    else:
+                        stats["adopted"] += 1
+                    seen[sha256] = size
+                    continue
+
+                with transaction.atomic():
+                    blob, created = StoredBlob.objects.get_or_create(
+                        sha256=sha256,
+                        defaults={"name": name, "size": size},
+                    )
+                    PostImages.objects.filter(pk=pk).update(blob=blob, image=blob.name, url=public_url(blob.name))
+                    StoredBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+
+                if created:
+                    stats["adopted"] += 1
+                else:
+                    stats["deduplicated"] += 1
+                    stats["bytes_saved"] += size
+                    if blob.name != name and not PostImages.objects.filter(image=name).exists():
+                        delete_files([name])
+
+        self.stdout.write(
+            f"{stats['images']} images: {stats['adopted']} adopted as blobs, "
+            f"{stats['deduplicated']} duplicates ({stats['bytes_saved']} bytes), "
+            f"{stats['missing']} missing files"
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: nothing changed."))
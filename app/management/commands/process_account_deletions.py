@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.account_deletion import DEFAULT_CHUNK_SIZE, claim_next_job, process_job
+from app.media import DEFAULT_WORKERS
+
+
+class Command(BaseCommand):
+    help = "Worker for queued account deletions. Runs until stopped unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per DELETE/UPDATE.")
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel media deletes.")
+        parser.add_argument("--poll", type=float, default=5.0, help="Seconds to sleep when the queue is empty.")
+
+    def report(self, job, step, count):
+        if self.verbosity > 1:
+            self.stdout.write(f"  job {job.pk}: {step} {count}")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+
+            self.stdout.write(f"Deleting user {job.user_id} (job {job.pk})")
+            ok = process_job(
+                job,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                report=self.report,
+            )
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"  done: {job.progress}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"  failed: {job.error.strip().splitlines()[-1]}"))
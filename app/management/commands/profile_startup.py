@@ -0,0 +1,95 @@
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Heavy modules that must only load on first use, never at boot.
+DEFAULT_FORBIDDEN = ["PIL.Image", "pillow_heif", "numpy", "boto3", "botocore"]
+
+SNIPPET = """\
+import time
+start = time.perf_counter()
+import {target}
+{load_urls}
+print(f"{{(time.perf_counter() - start) * 1000:.1f}}")
+"""
+
+LOAD_URLS = "from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+def parse_importtime(stderr: str):
+    """Yield ``(module, depth, self_us, cumulative_us)`` from ``-X importtime`` output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = int(head.rsplit(":", 1)[1])
+        depth = (len(name) - len(name.lstrip())) // 2
+        yield name.strip(), depth, self_us, int(cumulative_us)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start import cost in a fresh interpreter with -X importtime "
+        "and print per-package and per-module tables. With --max-ms, fail when "
+        "the import takes longer (used as a CI regression check)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", default="app.wsgi", help="Module to import (default: app.wsgi).")
+        parser.add_argument("--no-urls", action="store_true", help="Skip loading the URLconf (views) after the target.")
+        parser.add_argument("--runs", type=int, default=3, help="Keep the fastest of this many runs.")
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--max-ms", type=float, help="Fail if the fastest run exceeds this many milliseconds.")
+        parser.add_argument(
+            "--forbid",
+            action="append",
+            help=f"Fail if this module is imported at startup (repeatable). Defaults to {', '.join(DEFAULT_FORBIDDEN)}.",
+        )
+
+    def handle(self, *args, **options):
+        code = SNIPPET.format(
+            target=options["target"],
+            load_urls="" if options["no_urls"] else LOAD_URLS,
+        )
+
+        best = None
+        for _ in range(max(1, options["runs"])):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", code],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f"Import failed:\n{proc.stderr[-2000:]}")
+            elapsed = float(proc.stdout.strip().splitlines()[-1])
+            if best is None or elapsed < best[0]:
+                best = (elapsed, proc.stderr)
+
+        elapsed, stderr = best
+        rows = list(parse_importtime(stderr))
+        self.report(rows, options["top"])
+        self.stdout.write(f"\n{options['target']} cold start: {elapsed:.1f} ms (fastest of {options['runs']})")
+
+        imported = {name for name, *_ in rows}
+        forbidden = [m for m in (options["forbid"] or DEFAULT_FORBIDDEN) if m in imported]
+        if forbidden:
+            raise CommandError(f"Loaded at startup but should be lazy: {', '.join(forbidden)}")
+        if options["max_ms"] is not None and elapsed > options["max_ms"]:
+            raise CommandError(f"Cold start {elapsed:.1f} ms exceeds --max-ms {options['max_ms']:.0f}")
+
+    def report(self, rows, top):
+        by_package = defaultdict(int)
+        for name, _, self_us, _ in rows:
+            by_package[name.split(".")[0]] += self_us
+
+        self.stdout.write(f"{'package':<32} {'self ms':>9}")
+        for package, total in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+            self.stdout.write(f"{package:<32} {total / 1000:>9.1f}")
+
+        self.stdout.write(f"\n{'module (top-level imports)':<48} {'self ms':>9} {'cumul ms':>9}")
+        top_level = sorted((r for r in rows if r[1] <= 1), key=lambda r: -r[3])[:top]
+        for name, depth, self_us, cumulative_us in top_level:
+            label = ("  " * depth + name)[:48]
+            self.stdout.write(f"{label:<48} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import caching
+from app.models import Post
+from app.ranking import load_inputs, rank_users, store_rankings
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute every active user's ranked feed (ordered post ids) into the cache. "
+        "Run periodically, e.g. every 10 minutes from the scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Rank for users who logged in within this many days.")
+        parser.add_argument("--candidates", type=int, default=2000, help="Rank this many of the newest posts.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Users scored per vectorised batch.")
+
+    def handle(self, *args, **options):
+        if not caching.is_shared():
+            raise CommandError(
+                "The default cache is per-process, so rankings stored here would never reach the "
+                "web workers. Configure a shared cache (REDIS_URL) before running rank_feeds."
+            )
+        start = time.perf_counter()
+        computed_at = time.time()
+
+        candidates = [
+            (pk, category, created_at.timestamp())
+            for pk, category, created_at in (
+                Post.objects.order_by("-created_at")
+                .values_list("id", "category", "created_at")[: options["candidates"]]
+            )
+        ]
+
+        users = (
+            User.objects
+            .filter(
+                is_active=True,
+                last_login__gte=timezone.now() - timedelta(days=options["days"]),
+                profile__onboarding_complete=True,
+            )
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        ranked = 0
+        batch_size = options["batch_size"]
+        user_ids = list(users)
+        for start_at in range(0, len(user_ids), batch_size):
+            batch = user_ids[start_at:start_at + batch_size]
+            interests, engagement, hidden = load_inputs(batch)
+            rankings = rank_users(batch, candidates, interests, engagement, hidden, now=computed_at)
+            store_rankings(rankings, computed_at)
+            ranked += len(batch)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked {len(candidates)} posts for {ranked} users in {elapsed:.2f}s"
+        ))
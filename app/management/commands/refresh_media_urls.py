@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.media import public_url
+from app.models import ArchivedPostImage, PostImages, Profile
+
+# (model, file field, stored URL field)
+TARGETS = [
+    (PostImages, "image", "url"),
+    (ArchivedPostImage, "image", "url"),
+    (Profile, "avatar", "avatar_url"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the public URL of every post image and avatar next to its file name. "
+        "Run once after deploying stored URLs, and again whenever MEDIA_URL or the "
+        "storage's domain changes. Only rows whose URL differs are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        batch_size = options["batch_size"]
+        for model, file_field, url_field in TARGETS:
+            changed = 0
+            last_pk = 0
+            while True:
+                rows = list(
+                    model.objects.filter(pk__gt=last_pk).order_by("pk")
+                    .values_list("pk", file_field, url_field)[:batch_size]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                stale = [
+                    model(pk=pk, **{url_field: url})
+                    for pk, name, old in rows
+                    if (url := public_url(name)) != old
+                ]
+                with transaction.atomic():
+                    model.objects.bulk_update(stale, [url_field])
+                changed += len(stale)
+            self.stdout.write(f"  {model.__name__}.{url_field}: {changed} updated")
+        self.stdout.write(f"Done in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from messaging.digest import BATCH_SIZE, INTERVAL, MAX_AGE, send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Email every user a digest of their unread message threads. Users who "
+        "got one within --min-hours are skipped, and no message is included twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-hours", type=float, default=INTERVAL.total_seconds() / 3600)
+        parser.add_argument("--max-age-days", type=float, default=MAX_AGE.days)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Render digests but don't send or record them.")
+
+    def handle(self, *args, **options):
+        sent = send_digests(
+            interval=timedelta(hours=options["min_hours"]),
+            max_age=timedelta(days=options["max_age_days"]),
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        verb = "Would send" if options["dry_run"] else "Sent"
+        self.stdout.write(f"{verb} {sent} digest(s).")
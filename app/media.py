@@ -0,0 +1,151 @@
+"""
+Bulk operations on uploaded media in the default storage.
+"""
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+# S3 DeleteObjects accepts at most 1000 keys per call.
+MAX_BATCH = 1000
+
+
+def public_url(name) -> str:
+    """
+    The URL a stored file is served from, or "" for none. Rows keep this
+    next to the file name so pages don't go through the storage backend
+    (URL assembly per call on S3) for every image they show.
+    """
+    return default_storage.url(name) if name else ""
+
+
+def _is_s3(storage) -> bool:
+    return hasattr(storage, "bucket_name") and hasattr(storage, "bucket")
+
+
+def _delete_one(name: str) -> bool:
+    try:
+        default_storage.delete(name)
+    except Exception:
+        logger.exception("Could not delete media file %s", name)
+        return False
+    return True
+
+
+def delete_files(names, workers: int = DEFAULT_WORKERS) -> int:
+    """
+    Delete storage objects in parallel. Each delete is a network round trip
+    on S3, so they are spread over a thread pool. Returns how many failed.
+    """
+    names = [n for n in names if n]
+    if not names:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(workers, len(names))) as pool:
+        results = list(pool.map(_delete_one, names))
+    return results.count(False)
+
+
+def iter_storage(prefix: str):
+    """
+    Yield ``(name, last_modified)`` for every object under ``prefix``. On S3
+    the listing is paged (1000 keys per request) and keys arrive in sorted
+    order; nothing is collected in memory either way.
+    """
+    storage = default_storage
+    if _is_s3(storage):
+        yield from _iter_s3(storage, prefix)
+    else:
+        yield from _iter_filesystem(storage, prefix)
+
+
+def _iter_s3(storage, prefix):
+    from storages.utils import clean_name, safe_join
+
+    root = safe_join(storage.location, clean_name(prefix))
+    strip = len(storage.location.rstrip("/")) + 1 if storage.location else 0
+    paginator = storage.bucket.meta.client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=storage.bucket_name,
+        Prefix=root,
+        PaginationConfig={"PageSize": MAX_BATCH},
+    )
+    for page in pages:
+        for obj in page.get("Contents", ()):
+            yield obj["Key"][strip:], obj["LastModified"]
+
+
+def _iter_filesystem(storage, prefix):
+    base = storage.location
+    stack = [os.path.join(base, prefix)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, base).replace(os.sep, "/")
+                    modified = datetime.fromtimestamp(entry.stat().st_mtime, tz=dt_timezone.utc)
+                    yield name, modified
+
+
+def _delete_batch(names) -> int:
+    storage = default_storage
+    if not _is_s3(storage):
+        return [_delete_one(n) for n in names].count(False)
+
+    from storages.utils import clean_name, safe_join
+
+    try:
+        response = storage.bucket.meta.client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={
+                "Objects": [{"Key": safe_join(storage.location, clean_name(n))} for n in names],
+                "Quiet": True,
+            },
+        )
+    except Exception:
+        logger.exception("Batch delete of %d media files failed", len(names))
+        return len(names)
+    errors = response.get("Errors", [])
+    for error in errors:
+        logger.warning("Could not delete %s: %s", error.get("Key"), error.get("Message"))
+    return len(errors)
+
+
+def delete_in_batches(names, batch_size: int = MAX_BATCH, workers: int = DEFAULT_WORKERS):
+    """
+    Delete names from an iterable in batches, several batches at a time.
+    Only ``2 * workers`` batches are ever queued, so the input can be a
+    stream of any length. Returns ``(deleted, failed)``.
+    """
+    batch_size = min(batch_size, MAX_BATCH)
+    names = iter(names)
+    deleted = failed = 0
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(pending) < workers * 2:
+                batch = list(islice(names, batch_size))
+                if not batch:
+                    break
+                pending[pool.submit(_delete_batch, batch)] = len(batch)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                size = pending.pop(future)
+                errors = future.result()
+                failed += errors
+                deleted += size - errors
+    return deleted, failed
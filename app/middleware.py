@@ -1,29 +1,94 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.contrib import auth
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .models import Profile
+
+
+def _suspended_url():
+    try:
+        return reverse('suspended_page')
+    except:
+        return '/suspended'
+
+
+def _suspend(request, suspended_url):
+    messages.error(request,
+            "Your account has been suspended by an administrator. "
+            "Please contact support if you believe this is an error."
+        )
+    return redirect(suspended_url)
+
 
 class CheckSuspension:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         if request.user.is_authenticated and not request.user.is_staff:
-            try:
-                suspended_url = reverse('suspended_page')
-            except:
-                suspended_url = '/suspended'
+            suspended_url = _suspended_url()
             if request.path == suspended_url:
                 return self.get_response(request)
-        
+
             if hasattr(request.user, 'profile') and request.user.profile.status == "Suspended":
-                messages.error(request, 
-                        "Your account has been suspended by an administrator. "
-                        "Please contact support if you believe this is an error."
-                    )
+                response = _suspend(request, suspended_url)
                 auth.logout(request)
+                return response
 
-                return redirect(suspended_url)
-        
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if user.is_authenticated and not user.is_staff:
+            suspended_url = _suspended_url()
+            if request.path == suspended_url:
+                return await self.get_response(request)
+
+            status = await Profile.objects.filter(user=user).values_list("status", flat=True).afirst()
+            if status == "Suspended":
+                response = _suspend(request, suspended_url)
+                await auth.alogout(request)
+                return response
+
+        return await self.get_response(request)
+
+
+class HybridWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise 6 is sync-only middleware. Under ASGI, Django would run it
+    (and so every request behind it) through one sync thread; this variant
+    looks the file up inline and only serves static files off the loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,101 @@
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hidden_users_to_audiences(apps, schema_editor):
+    """
+    Each distinct set of users a seller hid posts from becomes one audience
+    ("Hidden list 1", "Hidden list 2", ...) that those posts are hidden from.
+    """
+    Post = apps.get_model('app', 'Post')
+    ArchivedPost = apps.get_model('app', 'ArchivedPost')
+    Audience = apps.get_model('app', 'Audience')
+
+    hidden = defaultdict(set)
+    for post_id, user_id in Post.hidden_from.through.objects.values_list('post_id', 'user_id'):
+        hidden[('post', post_id)].add(user_id)
+    for post_id, user_id in ArchivedPost.hidden_from.through.objects.values_list('archivedpost_id', 'user_id'):
+        hidden[('archived', post_id)].add(user_id)
+    if not hidden:
+        return
+
+    owners = {}
+    for kind, model in (('post', Post), ('archived', ArchivedPost)):
+        ids = [pk for k, pk in hidden if k == kind]
+        owners.update({(kind, pk): user_id for pk, user_id in model.objects.filter(pk__in=ids).values_list('pk', 'user_id')})
+
+    audiences = {}
+    post_links, archived_links = [], []
+    for (kind, post_id), user_ids in sorted(hidden.items(), key=lambda item: item[0][1]):
+        owner_id = owners[(kind, post_id)]
+        key = (owner_id, frozenset(user_ids))
+        if key not in audiences:
+            number = sum(1 for owner, _ in audiences if owner == owner_id) + 1
+            audience = Audience.objects.create(owner_id=owner_id, name=f'Hidden list {number}')
+            audience.members.set(user_ids)
+            audiences[key] = audience.pk
+        if kind == 'post':
+            post_links.append(Post.hidden_audiences.through(post_id=post_id, audience_id=audiences[key]))
+        else:
+            archived_links.append(ArchivedPost.hidden_audiences.through(archivedpost_id=post_id, audience_id=audiences[key]))
+    Post.hidden_audiences.through.objects.bulk_create(post_links)
+    ArchivedPost.hidden_audiences.through.objects.bulk_create(archived_links)
+
+
+def audiences_to_hidden_users(apps, schema_editor):
+    Post = apps.get_model('app', 'Post')
+    ArchivedPost = apps.get_model('app', 'ArchivedPost')
+    for model, column in ((Post, 'post_id'), (ArchivedPost, 'archivedpost_id')):
+        links = model.hidden_audiences.through.objects.values_list(column, 'audience__members')
+        model.hidden_from.through.objects.bulk_create(
+            [model.hidden_from.through(**{column: post_id, 'user_id': user_id}) for post_id, user_id in links if user_id],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_post_expires_at_archivedpost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Audience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('members', models.ManyToManyField(blank=True, related_name='audience_memberships', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audiences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='audience',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='unique_audience_name'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='hidden_audiences',
+            field=models.ManyToManyField(blank=True, related_name='archived_posts', to='app.audience'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hidden_audiences',
+            field=models.ManyToManyField(blank=True, help_text='Audiences whose members should NOT be able to see this post.', related_name='posts', to='app.audience'),
+        ),
+        migrations.RunPython(hidden_users_to_audiences, audiences_to_hidden_users),
+        migrations.RemoveField(
+            model_name='archivedpost',
+            name='hidden_from',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='hidden_from',
+        ),
+    ]
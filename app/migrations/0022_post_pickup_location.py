@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_sitecounter_dailyactivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='geohash',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='pickup_spot',
+            field=models.CharField(blank=True, choices=[('rotunda', 'The Rotunda'), ('newcomb', 'Newcomb Hall'), ('clemons', 'Clemons Library'), ('corner', 'The Corner'), ('clark', 'Clark Hall'), ('rice', 'Rice Hall'), ('ohill', 'Observatory Hill Dining'), ('gooch_dillard', 'Gooch/Dillard'), ('runk', 'Runk Dining'), ('aquatic', 'Aquatic & Fitness Center'), ('jpj', 'John Paul Jones Arena'), ('barracks', 'Barracks Road Shopping Center')], default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='pickup_spot',
+            field=models.CharField(blank=True, choices=[('rotunda', 'The Rotunda'), ('newcomb', 'Newcomb Hall'), ('clemons', 'Clemons Library'), ('corner', 'The Corner'), ('clark', 'Clark Hall'), ('rice', 'Rice Hall'), ('ohill', 'Observatory Hill Dining'), ('gooch_dillard', 'Gooch/Dillard'), ('runk', 'Runk Dining'), ('aquatic', 'Aquatic & Fitness Center'), ('jpj', 'John Paul Jones Arena'), ('barracks', 'Barracks Road Shopping Center')], default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_post_pickup_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpostimage',
+            name='url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='postimages',
+            name='url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_stored_media_urls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimedUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_id', models.CharField(max_length=32, unique=True)),
+                ('claimed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -1,8 +1,11 @@
+from datetime import timedelta
+
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.core.validators import MaxLengthValidator
+from django.utils import timezone
+
+from .geo import SPOT_CHOICES
 
 
 class Profile(models.Model):
@@ -22,15 +25,25 @@ class Profile(models.Model):
     interests = models.CharField(max_length=255, blank=True)
     status = models.CharField(max_length=50, default="Member")
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    # ``avatar``'s public URL, resolved when it is saved (see media.public_url).
+    avatar_url = models.CharField(max_length=500, blank=True, default="")
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default="member")
 
     nickname = models.CharField(max_length=64, blank=True, default="")
     sustainability_interests = models.JSONField(default=list, blank=True)
     onboarding_complete = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.get_username()
 
+    @property
+    def avatar_src(self) -> str:
+        """The avatar URL for templates; rows not yet backfilled ask the storage."""
+        if self.avatar_url or not self.avatar:
+            return self.avatar_url
+        return self.avatar.url
+
     @property
     def display_name(self) -> str:
         """
@@ -47,12 +60,29 @@ class Profile(models.Model):
         return self.user.get_username()
 
 
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def ensure_profile_exists(sender, instance, created, **kwargs):
+class Audience(models.Model):
     """
-    Ensure every user has a Profile row. If a profile already exists, do nothing.
+    A seller's reusable list of users, e.g. "my roommates", that listings
+    can be hidden from (see app/audiences.py).
     """
-    Profile.objects.get_or_create(user=instance)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="audiences")
+    name = models.CharField(max_length=80)
+    members = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=True, related_name="audience_memberships")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="unique_audience_name"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.owner_id})"
+
+
+def listing_expiry():
+    """When a listing posted or renewed now should expire."""
+    return timezone.now() + timedelta(days=settings.LISTING_LIFETIME_DAYS)
 
 
 class Post(models.Model):
@@ -75,29 +105,277 @@ class Post(models.Model):
         default='other'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Past this, ``manage.py archive_posts`` moves the listing to ArchivedPost.
+    expires_at = models.DateTimeField(default=listing_expiry, db_index=True)
 
-    hidden_from = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
+    # Optional pickup location, set through geo.set_location. ``geohash``
+    # indexes the point for radius search (app/geo.py).
+    pickup_spot = models.CharField(max_length=32, choices=SPOT_CHOICES, blank=True, default="")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default="", db_index=True)
+
+    hidden_audiences = models.ManyToManyField(
+        Audience,
         blank=True,
-        related_name="posts_hidden_from",
-        help_text="Users who should NOT be able to see this post.",
+        related_name="posts",
+        help_text="Audiences whose members should NOT be able to see this post.",
     )
 
     def __str__(self):
         return self.title
 
 
+class StoredBlob(models.Model):
+    """
+    One stored image object, addressed by the SHA-256 of its content and
+    shared by every PostImages row that uploaded the same bytes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.refcount} refs)"
+
+
+class ClaimedUpload(models.Model):
+    """
+    A direct-upload token that has been turned into a storage name. Tokens
+    are single-use; rows older than the token lifetime are pruned by
+    ``manage.py gc_media``.
+    """
+    token_id = models.CharField(max_length=32, unique=True)
+    claimed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.token_id
+
+
 class PostImages(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='posts/')
+    # ``image``'s public URL, resolved when the row is written (see media.public_url).
+    url = models.CharField(max_length=500, blank=True, default="")
+    blob = models.ForeignKey(
+        StoredBlob,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="images",
+    )
+
+    @property
+    def src(self) -> str:
+        return self.url or self.image.url
 
 
 class PostFlag(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="flags")
-    flagged_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Null for flags raised automatically (e.g. the duplicate detector).
+    flagged_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     reason = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     resolved = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"Flag on {self.post.title} by {self.flagged_by.username}"
\ No newline at end of file
+        by = self.flagged_by.username if self.flagged_by else "system"
+        return f"Flag on {self.post.title} by {by}"
+
+
+class PostSignature(models.Model):
+    """MinHash signature of a post's title + description (see app/dedupe.py)."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    minhash = models.BinaryField()
+
+
+class PostLSHBucket(models.Model):
+    """One LSH band of a post's signature; posts sharing a bucket are candidates."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="lsh_buckets")
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["band", "bucket"])]
+
+class AccountDeletionJob(models.Model):
+    """
+    Queued removal of a deactivated account. Holds the user id rather than a
+    foreign key so the record outlives the user it deletes.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    user_id = models.BigIntegerField(db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    step = models.CharField(max_length=50, blank=True, default="")
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Delete user {self.user_id} ({self.status})"
+
+
+class CategoryEngagement(models.Model):
+    """
+    How often a user browses a category and contacts its sellers; one input
+    to the personalised feed ranking (see app/ranking.py).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="category_engagement")
+    category = models.CharField(max_length=50, choices=Post.CATEGORIES)
+    views = models.PositiveIntegerField(default=0)
+    contacts = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category"], name="unique_user_category_engagement"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.category}: {self.views} views, {self.contacts} contacts"
+
+
+class PostDailyStats(models.Model):
+    """
+    Per-post, per-day listing analytics: feed impressions and message
+    inquiries. Written in batches by app/counters.py, never per request.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "day"], name="unique_post_daily_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} on {self.day}: {self.views} views, {self.inquiries} inquiries"
+
+
+class SavedSearch(models.Model):
+    """
+    A dashboard search (title text and/or category) a buyer wants to hear
+    about. ``term`` is the key it is filed under in the reverse index that
+    new posts are matched against (see app/saved_searches.py).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="saved_searches")
+    query = models.CharField(max_length=100, blank=True, default="")
+    category = models.CharField(max_length=50, choices=Post.CATEGORIES, blank=True, default="")
+    term = models.CharField(max_length=12, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "query", "category"], name="unique_user_saved_search"),
+        ]
+        indexes = [models.Index(fields=["category", "term"])]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.query!r} in {self.category or 'all'}"
+
+
+class SavedSearchMatch(models.Model):
+    """A new post that matched a saved search; unseen until ``seen_at`` is set."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="matches")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="saved_search_matches")
+    created_at = models.DateTimeField(auto_now_add=True)
+    seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["search", "post"], name="unique_saved_search_match"),
+        ]
+
+
+class ArchivedPost(models.Model):
+    """
+    An expired listing, moved out of ``Post`` by ``manage.py archive_posts``
+    so the table the feed scans only holds live ones. Keeps the post's id;
+    renewing moves it back (app/archive.py). ``views`` and ``inquiries`` are
+    the listing's PostDailyStats totals at the time it was archived.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_posts")
+    title = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.TextField()
+    category = models.CharField(max_length=50, choices=Post.CATEGORIES, default="other")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    pickup_spot = models.CharField(max_length=32, choices=SPOT_CHOICES, blank=True, default="")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default="")
+    archived_at = models.DateTimeField(db_index=True)
+    views = models.PositiveIntegerField(default=0)
+    inquiries = models.PositiveIntegerField(default=0)
+    hidden_audiences = models.ManyToManyField(Audience, blank=True, related_name="archived_posts")
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+
+class ArchivedPostImage(models.Model):
+    post = models.ForeignKey(ArchivedPost, on_delete=models.CASCADE, related_name="images")
+    image = models.ImageField(upload_to="posts/")
+    url = models.CharField(max_length=500, blank=True, default="")
+    blob = models.ForeignKey(
+        StoredBlob,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="archived_images",
+    )
+
+    @property
+    def src(self) -> str:
+        return self.url or self.image.url
+
+
+class SiteCounter(models.Model):
+    """
+    A live site-wide total (users, posts, messages, ...) for the admin
+    panel, kept current by signals with atomic increments and recounted
+    nightly (see app/rollups.py).
+    """
+    name = models.CharField(max_length=32, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class DailyActivity(models.Model):
+    """What happened on one day, rolled up by ``manage.py rollup_activity``."""
+    day = models.DateField(unique=True)
+    new_users = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    flags = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "daily activity"
+
+    def __str__(self):
+        return f"{self.day}: {self.new_users} users, {self.posts} posts, {self.messages} messages, {self.flags} flags"
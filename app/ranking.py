@@ -0,0 +1,146 @@
+"""
+Personalised feed ranking.
+
+A periodic job (``manage.py rank_feeds``) scores recent posts for every
+active user and caches the ordered post ids. The dashboard only reads that
+list, hydrates one page of it and puts posts newer than the ranking on top.
+
+score = INTEREST_WEIGHT * interest affinity of the post's category
+      + ENGAGEMENT_WEIGHT * the user's engagement with that category
+      + RECENCY_WEIGHT * exp(-age / RECENCY_SCALE)
+
+Affinities are per category, so a user's scores for all candidates are one
+gather from a (users x categories) matrix plus a shared recency vector.
+numpy is imported inside the scoring functions: web workers only read the
+cached lists and record engagement, and shouldn't pay for it at startup.
+"""
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import F
+
+from .audiences import excluded_for
+from .models import CategoryEngagement, Post, Profile
+
+CATEGORIES = [code for code, _ in Post.CATEGORIES]
+CATEGORY_INDEX = {code: i for i, code in enumerate(CATEGORIES)}
+
+# Which listing categories each onboarding interest is most likely to want.
+INTEREST_CATEGORIES = {
+    "zero_waste": {"clothing": 1.0, "furniture": 1.0, "kitchen": 0.7, "electronics": 0.5},
+    "food": {"kitchen": 1.0},
+    "energy": {"electronics": 1.0},
+    "transport": {"other": 0.7, "tickets": 0.3},
+    "community": {"tickets": 1.0, "books": 0.3},
+    "advocacy": {"books": 1.0, "tickets": 0.5},
+}
+
+INTEREST_WEIGHT = 1.0
+ENGAGEMENT_WEIGHT = 1.5
+RECENCY_WEIGHT = 2.0
+RECENCY_SCALE = 72 * 3600  # seconds; a three-day-old post keeps ~37% of its boost
+CONTACT_WEIGHT = 3  # one message to a seller counts as this many category views
+
+RANKED_TTL = 6 * 60 * 60
+
+
+def ranked_key(user_id) -> str:
+    return f"ranking:feed:{user_id}"
+
+
+def get_ranked(user_id):
+    """``{"ids": [...], "computed_at": epoch seconds}`` or None."""
+    return cache.get(ranked_key(user_id))
+
+
+def record_engagement(user, category, views=0, contacts=0) -> None:
+    if not user.is_authenticated or category not in CATEGORY_INDEX:
+        return
+    updated = CategoryEngagement.objects.filter(user=user, category=category).update(
+        views=F("views") + views,
+        contacts=F("contacts") + contacts,
+    )
+    if not updated:
+        try:
+            CategoryEngagement.objects.create(user=user, category=category, views=views, contacts=contacts)
+        except IntegrityError:
+            record_engagement(user, category, views, contacts)
+
+
+def interest_vector(interests):
+    import numpy as np
+
+    vec = np.zeros(len(CATEGORIES))
+    for interest in interests or []:
+        for category, weight in INTEREST_CATEGORIES.get(interest, {}).items():
+            vec[CATEGORY_INDEX[category]] += weight
+    peak = vec.max()
+    return vec / peak if peak > 0 else vec
+
+
+def affinity_matrix(user_ids, interests_by_user, engagement_by_user):
+    """(users x categories) affinity from interests and log-scaled engagement."""
+    import numpy as np
+
+    interest = np.array([interest_vector(interests_by_user.get(u)) for u in user_ids]).reshape(len(user_ids), -1)
+    engagement = np.zeros((len(user_ids), len(CATEGORIES)))
+    for row, user_id in enumerate(user_ids):
+        for category, value in engagement_by_user.get(user_id, {}).items():
+            engagement[row, CATEGORY_INDEX[category]] = value
+    engagement = np.log1p(engagement)
+    peaks = engagement.max(axis=1, keepdims=True)
+    engagement = np.divide(engagement, peaks, out=np.zeros_like(engagement), where=peaks > 0)
+    return INTEREST_WEIGHT * interest + ENGAGEMENT_WEIGHT * engagement
+
+
+def rank_users(user_ids, candidates, interests_by_user, engagement_by_user, hidden_by_user, now=None):
+    """
+    Score every candidate post for every user. ``candidates`` is a list of
+    ``(post_id, category, created_at epoch)``. Returns ``{user_id: [post ids]}``
+    best first, without posts hidden from that user.
+    """
+    import numpy as np
+
+    now = time.time() if now is None else now
+    if not candidates:
+        return {u: [] for u in user_ids}
+
+    post_ids = np.array([c[0] for c in candidates])
+    cat_idx = np.array([CATEGORY_INDEX.get(c[1], CATEGORY_INDEX["other"]) for c in candidates])
+    age = np.maximum(now - np.array([c[2] for c in candidates], dtype=float), 0)
+    recency = RECENCY_WEIGHT * np.exp(-age / RECENCY_SCALE)
+
+    affinity = affinity_matrix(user_ids, interests_by_user, engagement_by_user)
+    scores = affinity[:, cat_idx] + recency[None, :]
+    # Ties (same category and age) fall back to newest first.
+    order = np.lexsort((-post_ids[None, :].repeat(len(user_ids), 0), -scores), axis=1)
+
+    result = {}
+    for row, user_id in enumerate(user_ids):
+        ranked = post_ids[order[row]]
+        hidden = hidden_by_user.get(user_id)
+        if hidden:
+            ranked = ranked[~np.isin(ranked, list(hidden))]
+        result[user_id] = ranked.tolist()
+    return result
+
+
+def load_inputs(user_ids):
+    """Interests, engagement and hidden posts for a batch of users."""
+    interests = dict(
+        Profile.objects.filter(user_id__in=user_ids).values_list("user_id", "sustainability_interests")
+    )
+    engagement = defaultdict(dict)
+    rows = CategoryEngagement.objects.filter(user_id__in=user_ids).values_list("user_id", "category", "views", "contacts")
+    for user_id, category, views, contacts in rows:
+        engagement[user_id][category] = views + CONTACT_WEIGHT * contacts
+    return interests, engagement, excluded_for(user_ids)
+
+
+def store_rankings(rankings, computed_at) -> None:
+    cache.set_many(
+        {ranked_key(u): {"ids": ids, "computed_at": computed_at} for u, ids in rankings.items()},
+        RANKED_TTL,
+    )
@@ -0,0 +1,183 @@
+"""
+Token-bucket rate limiting for write endpoints.
+
+Each bucket is a single integer in the cache: the bucket's "theoretical
+arrival time" (GCRA) in milliseconds. A request moves it to
+``max(stored, now) + interval`` and is allowed while that stays within
+``burst`` intervals of now; a refused request writes nothing. The move is a
+compare-and-set: the request first ``add``s a claim key named after the value
+it read, so of several workers that read the same value only one writes and
+the others re-read. Values only grow, so a claim is never reused.
+
+Policies are declared on the view::
+
+    @rate_limit("send_message", "20/m", burst=10)
+    @rate_limit("send_message_ip", "60/m", key="ip")
+
+and can be retuned per name with ``settings.RATE_LIMITS``.
+"""
+import math
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.template.response import TemplateResponse
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Keys outlive their bucket so a busy bucket is not reset by expiry.
+MIN_KEY_TIMEOUT = 60 * 60
+
+# A claim only has to outlive the gap between a worker's read and its write.
+CLAIM_TIMEOUT = 5
+
+# Re-reads before a contended request is refused.
+MAX_ATTEMPTS = 5
+
+
+def parse_rate(rate: str):
+    """``"20/m"`` -> (20, 60). The period may carry a count: ``"100/5m"``."""
+    count, _, period = rate.partition("/")
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * PERIODS[period[-1]]
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    rate: str
+    burst: int | None = None
+    key: str = "user"
+    methods: tuple | None = ("POST",)
+
+    def limits(self):
+        """Return (emission interval ms, burst), honouring settings overrides."""
+        override = getattr(settings, "RATE_LIMITS", {}).get(self.name, {})
+        count, period = parse_rate(override.get("rate", self.rate))
+        burst = override.get("burst", self.burst) or count
+        return period * 1000 / count, burst
+
+    def applies_to(self, request) -> bool:
+        return self.methods is None or request.method in self.methods
+
+    def ident(self, request):
+        if self.key == "user":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                return f"u{user.pk}"
+            return f"ip{client_ip(request)}"
+        if self.key == "ip":
+            return f"ip{client_ip(request)}"
+        return self.key(request)
+
+
+def client_ip(request) -> str:
+    """
+    ``REMOTE_ADDR``, or the entry ``RATE_LIMIT_PROXY_COUNT`` hops from the end
+    of ``X-Forwarded-For`` when the app runs behind that many trusted proxies.
+    """
+    proxies = getattr(settings, "RATE_LIMIT_PROXY_COUNT", 0)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def bucket_cache():
+    return caches[getattr(settings, "RATE_LIMIT_CACHE", "default")]
+
+
+def hit(policy: Policy, ident: str, now_ms: int | None = None):
+    """
+    Take one token. Returns ``(allowed, retry_after_seconds)``.
+    """
+    interval, burst = policy.limits()
+    interval = max(1, int(interval))
+    window = interval * burst
+    now = int(time.time() * 1000) if now_ms is None else now_ms
+    key = f"rl:{policy.name}:{ident}"
+    cache = bucket_cache()
+    timeout = max(MIN_KEY_TIMEOUT, 2 * window // 1000)
+
+    for _ in range(MAX_ATTEMPTS):
+        stored = cache.get(key)
+        tat = max(stored or 0, now) + interval
+        if tat - now > window:
+            return False, math.ceil((tat - window - now) / 1000)
+        if stored is None:
+            if cache.add(key, tat, timeout):
+                return True, 0
+        elif cache.add(f"{key}:{stored}", 1, CLAIM_TIMEOUT):
+            cache.set(key, tat, timeout)
+            return True, 0
+    # Other requests for the same bucket kept winning; they are spending it.
+    return False, 1
+
+
+def check(request, policies):
+    """
+    Apply every policy that matches the request. Returns the retry delay of
+    the first exhausted bucket, or None when the request may proceed.
+    """
+    if not getattr(settings, "RATE_LIMIT_ENABLED", True):
+        return None
+    for policy in policies:
+        if not policy.applies_to(request):
+            continue
+        allowed, retry_after = hit(policy, policy.ident(request))
+        if not allowed:
+            return retry_after
+    return None
+
+
+def too_many_requests(request, retry_after: int):
+    response = TemplateResponse(
+        request,
+        "429.html",
+        {"retry_after": retry_after},
+        status=429,
+    )
+    response["Retry-After"] = str(max(1, retry_after))
+    return response
+
+
+def rate_limit(name: str, rate: str, burst: int | None = None, key="user", methods=("POST",)):
+    """
+    Limit a view with a token bucket. ``key`` is "user" (falls back to IP for
+    anonymous requests), "ip", or a callable returning an identifier.
+    ``methods=None`` limits every method. Stacked decorators share one check.
+    """
+    policy = Policy(name, rate, burst, key, tuple(methods) if methods else None)
+
+    def decorator(view_func):
+        inner = getattr(view_func, "_rate_limited_view", view_func)
+        policies = [policy, *getattr(view_func, "rate_limits", [])]
+
+        if iscoroutinefunction(inner):
+            @wraps(inner)
+            async def async_wrapper(request, *args, **kwargs):
+                retry_after = await sync_to_async(check)(request, policies)
+                if retry_after is not None:
+                    return too_many_requests(request, retry_after)
+                return await inner(request, *args, **kwargs)
+
+            async_wrapper.rate_limits = policies
+            async_wrapper._rate_limited_view = inner
+            return async_wrapper
+
+        @wraps(inner)
+        def wrapper(request, *args, **kwargs):
+            retry_after = check(request, policies)
+            if retry_after is not None:
+                return too_many_requests(request, retry_after)
+            return inner(request, *args, **kwargs)
+
+        wrapper.rate_limits = policies
+        wrapper._rate_limited_view = inner
+        return wrapper
+    return decorator
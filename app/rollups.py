@@ -0,0 +1,181 @@
+"""
+Admin statistics: live site counters and a daily activity series.
+
+``SiteCounter`` rows hold running totals that signals (app/signals.py,
+messaging/signals.py) move by one with an atomic ``UPDATE ... SET value =
+value + n``; jobs that add or remove rows in bulk adjust them the same way.
+``manage.py rollup_activity`` recounts them every night, which also undoes
+any drift, and fills ``DailyActivity`` for the last couple of days. The
+admin panel reads both with two small queries instead of counting tables.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from messaging.archive import EPOCH, decode
+from messaging.models import Message, MessageArchiveBlock, MessageFlag
+
+from .models import ArchivedPost, DailyActivity, Post, PostFlag, Profile, SiteCounter
+
+User = get_user_model()
+
+USERS = "users"
+SUSPENDED = "suspended"
+POSTS = "posts"
+ARCHIVED_POSTS = "archived_posts"
+MESSAGES = "messages"
+OPEN_FLAGS = "open_flags"
+COUNTERS = (USERS, SUSPENDED, POSTS, ARCHIVED_POSTS, MESSAGES, OPEN_FLAGS)
+
+SUSPENDED_STATUS = "Suspended"
+
+METRICS = ("new_users", "posts", "messages", "flags")
+TREND_DAYS = 30
+
+
+def add(name: str, delta: int) -> None:
+    """
+    Move a counter by ``delta``. Before the first ``reconcile`` there is no
+    row and nothing happens; ``read`` then counts from scratch.
+    """
+    if delta:
+        SiteCounter.objects.filter(name=name).update(value=F("value") + delta, updated_at=timezone.now())
+
+
+def exact_counts() -> dict:
+    archived_messages = MessageArchiveBlock.objects.aggregate(n=Sum("message_count"))["n"] or 0
+    return {
+        USERS: User.objects.count(),
+        SUSPENDED: Profile.objects.filter(status=SUSPENDED_STATUS).count(),
+        POSTS: Post.objects.count(),
+        ARCHIVED_POSTS: ArchivedPost.objects.count(),
+        MESSAGES: Message.objects.count() + archived_messages,
+        OPEN_FLAGS: PostFlag.objects.filter(resolved=False).count() + MessageFlag.objects.filter(resolved=False).count(),
+    }
+
+
+def reconcile() -> dict:
+    """
+    Set every counter to a fresh count. Increments made while it counts
+    can be lost or doubled; the next run puts them right.
+    """
+    counts = exact_counts()
+    SiteCounter.objects.bulk_create(
+        [SiteCounter(name=name, value=value) for name, value in counts.items()],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["value", "updated_at"],
+    )
+    return counts
+
+
+def read() -> dict:
+    values = dict(SiteCounter.objects.filter(name__in=COUNTERS).values_list("name", "value"))
+    if len(values) < len(COUNTERS):
+        values = reconcile()
+    return values
+
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _per_day(queryset, field, since, until) -> dict:
+    rows = (
+        queryset.filter(**{f"{field}__gte": since, f"{field}__lt": until})
+        .annotate(day=TruncDate(field))
+        .values("day")
+        .annotate(n=Count("pk"))
+        .values_list("day", "n")
+    )
+    return dict(rows)
+
+
+def _archived_messages_per_day(since, until) -> dict:
+    """Messages already compacted into blocks; only backfills reach them."""
+    counts = {}
+    # Blocks are per UTC month.
+    first_month = since.astimezone(dt_timezone.utc).date().replace(day=1)
+    blocks = MessageArchiveBlock.objects.filter(month__gte=first_month, month__lt=until.astimezone(dt_timezone.utc).date())
+    for data in blocks.values_list("data", flat=True).iterator():
+        for row in decode(data):
+            sent = EPOCH + timedelta(microseconds=row[3])
+            if since <= sent < until:
+                day = timezone.localdate(sent)
+                counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def _merge(*per_day) -> dict:
+    total = {}
+    for counts in per_day:
+        for day, n in counts.items():
+            total[day] = total.get(day, 0) + n
+    return total
+
+
+def rollup_days(start, end) -> int:
+    """(Re)build ``DailyActivity`` for every day from ``start`` to ``end``; returns rows written."""
+    since, until = _day_bounds(start, end)
+    metrics = {
+        "new_users": _per_day(User.objects.all(), "date_joined", since, until),
+        "posts": _merge(
+            _per_day(Post.objects.all(), "created_at", since, until),
+            _per_day(ArchivedPost.objects.all(), "created_at", since, until),
+        ),
+        "messages": _merge(
+            _per_day(Message.objects.all(), "created_at", since, until),
+            _archived_messages_per_day(since, until),
+        ),
+        "flags": _merge(
+            _per_day(PostFlag.objects.all(), "created_at", since, until),
+            _per_day(MessageFlag.objects.all(), "created_at", since, until),
+        ),
+    }
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    DailyActivity.objects.bulk_create(
+        [DailyActivity(day=day, **{name: metrics[name].get(day, 0) for name in METRICS}) for day in days],
+        update_conflicts=True,
+        unique_fields=["day"],
+        update_fields=[*METRICS, "updated_at"],
+    )
+    return len(days)
+
+
+def sparkline(values, width=120, height=28) -> str:
+    """``points`` for an SVG polyline of ``values``, scaled to the box."""
+    peak = max(values, default=0) or 1
+    step = width / max(len(values) - 1, 1)
+    return " ".join(f"{i * step:.1f},{height - 1 - v / peak * (height - 2):.1f}" for i, v in enumerate(values))
+
+
+def trends(days=TREND_DAYS, end=None) -> list:
+    """
+    ``[{metric, label, total, last, points}]`` for the ``days`` days up to
+    ``end`` (yesterday, the last day the nightly job has completed), from
+    ``DailyActivity``; days without a row count as zero.
+    """
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = end - timedelta(days=days - 1)
+    rows = {
+        row["day"]: row for row in
+        DailyActivity.objects.filter(day__gte=start, day__lte=end).values("day", *METRICS)
+    }
+    result = []
+    for metric in METRICS:
+        values = [rows.get(start + timedelta(days=i), {}).get(metric, 0) for i in range(days)]
+        result.append({
+            "metric": metric,
+            "label": metric.replace("_", " ").capitalize(),
+            "total": sum(values),
+            "last": values[-1],
+            "points": sparkline(values),
+        })
+    return result
@@ -0,0 +1,92 @@
+"""
+Saved searches, matched against new posts through a reverse index.
+
+A saved search is a dashboard filter kept for later: an optional category
+and optional text that must appear in the title, as with ``?q=``. Instead
+of running every saved search against each new post, each search is filed
+under one key, ``(category, term)``, where ``term`` is one trigram of its
+text (the whole text when shorter, "" when there is none). A title can only
+contain the text if it contains that trigram, so a new post looks up just
+the keys its own title produces, i.e. every substring of up to three
+characters, in its category and in "any category", through the
+``(category, term)`` index, and checks those candidates exactly. The work
+grows with the title and the number of candidates, not with the number of
+saved searches (``manage.py bench_saved_searches``).
+"""
+from .audiences import hidden_users
+from .models import Post, SavedSearch, SavedSearchMatch
+
+TERM_LENGTH = 3
+MAX_PER_USER = 20
+
+# Characters frequent enough in titles that a trigram made of them files a
+# search under a crowded key; the rarest trigram is picked instead.
+_COMMON = frozenset("etaoinsrhl ")
+
+
+class SavedSearchError(Exception):
+    """Raised when a search cannot be saved."""
+
+
+def normalize_query(text: str) -> str:
+    return (text or "").strip()[:100]
+
+
+def index_term(query: str) -> str:
+    text = query.lower()
+    if len(text) <= TERM_LENGTH:
+        return text
+    grams = sorted({text[i:i + TERM_LENGTH] for i in range(len(text) - TERM_LENGTH + 1)})
+    return min(grams, key=lambda g: sum(c in _COMMON for c in g))
+
+
+def title_terms(title: str) -> set:
+    """Every key a search matching ``title`` could be filed under."""
+    text = (title or "").lower()
+    terms = {""}
+    for size in range(1, TERM_LENGTH + 1):
+        terms.update(text[i:i + size] for i in range(len(text) - size + 1))
+    return terms
+
+
+def save_search(user, query: str, category: str):
+    """Returns ``(search, created)``; raises ``SavedSearchError`` for bad input."""
+    query = normalize_query(query)
+    category = category or ""
+    if category and category not in dict(Post.CATEGORIES):
+        raise SavedSearchError("Unknown category.")
+    if not query and not category:
+        raise SavedSearchError("Search for something or pick a category first.")
+    existing = SavedSearch.objects.filter(user=user, query=query, category=category).first()
+    if existing:
+        return existing, False
+    if SavedSearch.objects.filter(user=user).count() >= MAX_PER_USER:
+        raise SavedSearchError(f"You can keep up to {MAX_PER_USER} saved searches.")
+    search = SavedSearch.objects.create(user=user, query=query, category=category, term=index_term(query))
+    return search, True
+
+
+def find_matches(post, hidden_from=()) -> list:
+    """Ids of the saved searches ``post`` matches, other than its author's."""
+    title = (post.title or "").lower()
+    candidates = (
+        SavedSearch.objects
+        .filter(category__in=["", post.category], term__in=title_terms(post.title))
+        .exclude(user_id=post.user_id)
+        .values_list("pk", "user_id", "query")
+    )
+    hidden = set(hidden_from)
+    return [
+        pk for pk, user_id, query in candidates
+        if user_id not in hidden and query.lower() in title
+    ]
+
+
+def match_post(post) -> int:
+    """Queue a match for every saved search a new post satisfies."""
+    search_ids = find_matches(post, hidden_users(post))
+    SavedSearchMatch.objects.bulk_create(
+        [SavedSearchMatch(search_id=pk, post=post) for pk in search_ids],
+        ignore_conflicts=True,
+    )
+    return len(search_ids)
@@ -0,0 +1,13 @@
+"""
+Production settings for the ASGI deployment profile:
+
+    web: DJANGO_SETTINGS_MODULE=app.settings.asgi gunicorn app.asgi:application -k uvicorn_worker.UvicornWorker
+"""
+from .prod import *
+
+ASYNC_VIEWS = True
+
+# Async views run their queries on per-request threads; persistent
+# connections would pile up one per thread, so close them after each request.
+for _db in DATABASES.values():
+    _db["CONN_MAX_AGE"] = 0
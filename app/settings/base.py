@@ -62,7 +62,7 @@ SOCIALACCOUNT_AUTO_SIGNUP = True
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "app.middleware.HybridWhiteNoiseMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -72,6 +72,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "app.middleware.CheckSuspension",
+    "app.db_routing.PrimaryStickinessMiddleware",
 ]
 
 SOCIALACCOUNT_PROVIDERS = {
@@ -107,6 +108,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "app.context_processors.fragment_versions",
             ],
         },
     },
@@ -114,6 +116,29 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "app.wsgi.application"
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Per-process memory cache locally; prod.py switches to Redis when REDIS_URL is set.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "hoosmarket",
+    }
+}
+
+# Sessions live in django_session here; prod.py reads them through the cache
+# tier only when it is shared (see app/caching.py). Flash messages travel in
+# a signed cookie so showing one never writes the session.
+SESSION_ENGINE = "django.contrib.sessions.backends.db"
+SESSION_CACHE_ALIAS = "default"
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Rate limits (app/ratelimit.py). Buckets live in the cache above; override a
+# view's policy by name, e.g. {"send_message": {"rate": "30/m", "burst": 15}}.
+RATE_LIMIT_ENABLED = True
+RATE_LIMITS = {}
+RATE_LIMIT_PROXY_COUNT = 0
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -128,6 +153,23 @@ DATABASES = {
 db_from_env = dj_database_url.config(conn_max_age=600)
 DATABASES['default'].update(db_from_env)
 
+# Optional read replica (app/db_routing.py). Views marked @replica_reads read
+# from it; a browser stays on the primary for REPLICA_STICKY_SECONDS after a
+# write. Locally: DATABASE_REPLICA_URL=sqlite:///db.replica.sqlite3
+DATABASE_REPLICA = "replica"
+REPLICA_STICKY_SECONDS = 15
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+if DATABASE_REPLICA_URL:
+    DATABASES[DATABASE_REPLICA] = {
+        **dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=600),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["app.db_routing.ReplicaRouter"]
+
+# Serve the hot read views (dashboard, inbox, thread, user list) from their
+# async implementations. Only worth it under ASGI; see app/settings/asgi.py.
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,13 +204,55 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+# Shared CSS/JS lives in /static. WhiteNoise serves the collected files with
+# content-hashed names, gzip + brotli variants and immutable cache headers.
+STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
-MODERATOR_EMAILS = [
+# Upper bound on what a rendered page sends on a first visit (HTML plus the
+# static bundles it links), checked by `manage.py asset_budget`.
+PAGE_BUDGET_BYTES = 64 * 1024
+
+# Listings expire this many days after they are posted or renewed; expired
+# ones are moved to the archive by `manage.py archive_posts`.
+LISTING_LIFETIME_DAYS = config("LISTING_LIFETIME_DAYS", default=30, cast=int)
+
+# Direct-to-storage uploads (see app/uploads.py).
+# The local backend writes through default_storage; prod swaps in presigned S3 PUTs.
+UPLOAD_BACKEND = "app.uploads.LocalUploadBackend"
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+UPLOAD_TOKEN_MAX_AGE = 60 * 60
+
+# Outgoing mail (unread-message digests). SMTP from the environment; dev.py
+# prints to the console instead.
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = config("EMAIL_HOST", default="localhost")
+EMAIL_PORT = config("EMAIL_PORT", default=25, cast=int)
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="Hoos Market <no-reply@localhost>")
+# Absolute links in emails.
+SITE_URL = config("SITE_URL", default="http://localhost:8000")
+
+MODERATOR_EMAILS = frozenset(
     e.strip().lower()
     for e in config("MODERATOR_EMAILS", default="").split(",")
     if e.strip()
-]
+)
 
 # Activate Django-Heroku.
 # Use this code to avoid the psycopg2 / django-heroku error!  
@@ -9,11 +9,15 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['localhost','127.0.0.1','salty-shore-01968-bbd1b2057491.herokuapp.com']
 
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/5.2/howto/static-files/
-STATIC_URL = "static/"
+# Serve static files unhashed so runserver and tests work without collectstatic.
+STORAGES = {
+    **STORAGES,
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
 
-STATIC_ROOT = BASE_DIR / "staticfiles"
+EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 MEDIA_URL = "media/"
 
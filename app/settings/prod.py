@@ -9,6 +9,37 @@ DEBUG = False
 
 ALLOWED_HOSTS = ['salty-shore-01968-bbd1b2057491.herokuapp.com']
 
+SITE_URL = config('SITE_URL', default='https://salty-shore-01968-bbd1b2057491.herokuapp.com')
+
+# Templates are parsed once per process: explicit cached loader
+# (APP_DIRS must be off when loaders are listed).
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+
+# Shared cache tier for template fragments and everything else using django.core.cache
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+    # The cache is shared now, so sessions can be served from it and only
+    # fall back to django_session on a miss.
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Heroku's router appends the client address to X-Forwarded-For.
+RATE_LIMIT_PROXY_COUNT = 1
+
 # S3 Settings 
 # https://django-storages.readthedocs.io/en/latest/backends/amazon-S3.html
 
@@ -49,15 +80,15 @@ STORAGES = {
             },
         },
         "staticfiles": {
-            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
-            "OPTIONS": {
-                "location": "static", 
-                "default_acl": "public-read",
-            },
+            "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
         },
     }
 
-STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
+# Browser uploads go straight to the bucket (bucket CORS must allow PUT from the site).
+UPLOAD_BACKEND = "app.uploads.S3UploadBackend"
+
+# Static files are served by WhiteNoise from STATIC_ROOT, not from the bucket.
+STATIC_URL = '/static/'
 
 MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 
@@ -95,6 +126,7 @@ LOGGING = {
 """
 
 #Heroku Settings
-django_on_heroku.settings(locals())
+# staticfiles=False: the WhiteNoise middleware and storage are configured above.
+django_on_heroku.settings(locals(), staticfiles=False)
 if 'options' in DATABASES['default']:
     del DATABASES['default']['options']['sslmode']
@@ -0,0 +1,10 @@
+"""
+Settings for ``manage.py test``: the dev settings plus a ``replica`` alias
+that mirrors the test database. Routing to it stays off (DATABASE_REPLICA
+is None) except in the routing tests, which switch it on with
+``override_settings(DATABASE_REPLICA="replica")``.
+"""
+from .dev import *
+
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICA = None
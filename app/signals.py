@@ -1,84 +1,197 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
-from allauth.account.signals import user_logged_in
-from allauth.socialaccount.models import SocialAccount
-
-from .models import Profile
+from . import audiences, counters, freshness, rollups
+from .blobs import release
+from .login import run_login_pipeline
+from .media import public_url
+from .models import ArchivedPost, ArchivedPostImage, Audience, Post, PostFlag, PostImages, Profile
 
 User = get_user_model()
 
+# User fields that show up in rendered pages (display names).
+USER_DISPLAY_FIELDS = frozenset({"first_name", "last_name", "username"})
+
+
+def user_display_unchanged(update_fields) -> bool:
+    """True for routine User saves, e.g. ``last_login`` or ``is_staff`` at login."""
+    return update_fields is not None and not USER_DISPLAY_FIELDS & set(update_fields)
+
 
 @receiver(post_save, sender=User, dispatch_uid="app_profile_ensure_one")
 def ensure_profile(sender, instance, created, **kwargs):
     """
-    Idempotent: guarantees a Profile exists for every User.
-    Using get_or_create prevents UNIQUE constraint errors even if
-    the signal is accidentally registered twice.
+    Guarantees a Profile exists for every new User. Users that predate this
+    get theirs from the login pipeline.
     """
-    Profile.objects.get_or_create(user=instance)
+    if created:
+        Profile.objects.get_or_create(user=instance)
 
 
-@receiver(user_logged_in, dispatch_uid="app_assign_role_on_login")
-def assign_role_on_login(request, user, **kwargs):
-    """
-    Set role on login from ?role=... but never allow privilege escalation.
-    """
-    role = (request.GET.get("role") or "member").lower()
-    profile, _ = Profile.objects.get_or_create(user=user)
+@receiver(user_logged_in, dispatch_uid="app_login_pipeline")
+def login_pipeline(sender, request, user, **kwargs):
+    run_login_pipeline(request, user)
+
+
+@receiver(request_finished, dispatch_uid="app_flush_counters")
+def flush_counters(sender, **kwargs):
+    """Runs after the response has gone out, so no visitor waits on a flush."""
+    counters.flush_if_due()
+
+
+@receiver(post_save, sender=Post, dispatch_uid="app_post_freshness_save")
+@receiver(post_delete, sender=Post, dispatch_uid="app_post_freshness_delete")
+def post_freshness(sender, instance, **kwargs):
+    freshness.invalidate_posts(instance.user_id)
 
-    if role == "organizer" and (user.is_staff or user.is_superuser):
-        profile.role = "organizer"
+
+@receiver(post_save, sender=PostImages, dispatch_uid="app_post_images_freshness_save")
+@receiver(post_delete, sender=PostImages, dispatch_uid="app_post_images_freshness_delete")
+def post_images_freshness(sender, instance, **kwargs):
+    freshness.touch_post(instance.post_id)
+
+
+@receiver(m2m_changed, sender=Post.hidden_audiences.through, dispatch_uid="app_hidden_audiences_changed")
+def hidden_audiences_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """A post stopped or started being hidden from an audience."""
+    if action == "pre_clear":
+        # Clearing only shows posts to more people; drop the sets up front
+        # while the rows that say whose they are still exist.
+        if reverse:
+            audiences.invalidate_audiences([instance.pk])
+        else:
+            audiences.invalidate_audiences(list(instance.hidden_audiences.values_list("pk", flat=True)))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        audiences.invalidate_audiences([instance.pk])
+        post_ids = pk_set or []
     else:
-        profile.role = "member"
+        audiences.invalidate_audiences(pk_set or [])
+        post_ids = [instance.pk]
+    for post_id in post_ids:
+        freshness.touch_post(post_id)
+
+
+@receiver(m2m_changed, sender=Audience.members.through, dispatch_uid="app_audience_members_changed")
+def audience_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and not reverse:
+        audiences.invalidate_audiences([instance.pk])
+    elif action in ("post_add", "post_remove", "post_clear"):
+        audiences.invalidate([instance.pk] if reverse else pk_set or [])
+
+
+@receiver(pre_delete, sender=Audience, dispatch_uid="app_audience_deleted")
+def audience_deleted(sender, instance, **kwargs):
+    """Membership rows go without m2m signals; note who was in it first."""
+    user_ids = list(instance.members.values_list("pk", flat=True))
+    transaction.on_commit(lambda: audiences.invalidate(user_ids))
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="app_profile_freshness_save")
+@receiver(post_delete, sender=Profile, dispatch_uid="app_profile_freshness_delete")
+def profile_freshness(sender, instance, **kwargs):
+    freshness.invalidate_profiles()
+
 
-    profile.save(update_fields=["role"])
+@receiver(post_save, sender=User, dispatch_uid="app_user_freshness")
+def user_name_freshness(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Display names fall back to the User's own fields; count those edits as a
+    profile change. Routine saves such as ``last_login`` are ignored.
+    """
+    if created or user_display_unchanged(update_fields):
+        return
+    Profile.objects.filter(user=instance).update(updated_at=timezone.now())
+    freshness.invalidate_profiles()
 
 
-def _split_full_name(name: str):
+@receiver(post_delete, sender=PostImages, dispatch_uid="app_post_images_release_blob")
+@receiver(post_delete, sender=ArchivedPostImage, dispatch_uid="app_archived_post_images_release_blob")
+def release_post_image_blob(sender, instance, **kwargs):
     """
-    Best-effort split of a full name into (first, last).
-    If there's only one token, treat it as first name.
+    Covers every ORM path: image removal in edits, post and user deletes,
+    archived listings deleted in the admin. Bulk jobs that delete with
+    plain DELETEs release the blobs themselves.
     """
-    if not name:
-        return "", ""
-    parts = name.strip().split()
-    if not parts:
-        return "", ""
-    if len(parts) == 1:
-        return parts[0], ""
-    return parts[0], " ".join(parts[1:])
-
-
-@receiver(user_logged_in, dispatch_uid="app_sync_google_name_on_login")
-def sync_google_name_on_login(request, user, **kwargs):
+    if instance.blob_id:
+        release([instance.blob_id])
+
+
+@receiver(post_save, sender=User, dispatch_uid="app_user_counter_save")
+@receiver(post_save, sender=Post, dispatch_uid="app_post_counter_save")
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        rollups.add(rollups.USERS if sender is User else rollups.POSTS, 1)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="app_user_counter_delete")
+@receiver(post_delete, sender=Post, dispatch_uid="app_post_counter_delete")
+@receiver(post_delete, sender=ArchivedPost, dispatch_uid="app_archived_post_counter_delete")
+def count_deleted(sender, instance, **kwargs):
+    name = {User: rollups.USERS, Post: rollups.POSTS, ArchivedPost: rollups.ARCHIVED_POSTS}[sender]
+    rollups.add(name, -1)
+
+
+@receiver(post_save, sender=PostFlag, dispatch_uid="app_post_flag_counter_save")
+def count_open_flag(sender, instance, created, **kwargs):
+    """Resolving goes through ``update()``; those call sites adjust the counter."""
+    if created and not instance.resolved:
+        rollups.add(rollups.OPEN_FLAGS, 1)
+
+
+@receiver(post_delete, sender=PostFlag, dispatch_uid="app_post_flag_counter_delete")
+def count_deleted_flag(sender, instance, **kwargs):
+    if not instance.resolved:
+        rollups.add(rollups.OPEN_FLAGS, -1)
+
+
+def _suspended(status) -> bool:
+    return status == rollups.SUSPENDED_STATUS
+
+
+@receiver(post_init, sender=Profile, dispatch_uid="app_profile_status_loaded")
+def remember_profile_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status isn't fetched just for this.
+    instance._loaded_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="app_profile_suspended_counter_save")
+def count_suspended(sender, instance, created, **kwargs):
+    before = None if created else instance._loaded_status
+    if created or before is not None:
+        rollups.add(rollups.SUSPENDED, _suspended(instance.status) - _suspended(before))
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Profile, dispatch_uid="app_profile_suspended_counter_delete")
+def count_deleted_suspended(sender, instance, **kwargs):
+    if _suspended(instance.__dict__.get("status")):
+        rollups.add(rollups.SUSPENDED, -1)
+
+
+@receiver(post_save, sender=PostImages, dispatch_uid="app_post_image_url")
+@receiver(post_save, sender=ArchivedPostImage, dispatch_uid="app_archived_post_image_url")
+def store_image_url(sender, instance, **kwargs):
     """
-    On Google login, populate User.first_name / User.last_name if they are empty.
-    This does NOT touch Profile.nickname (which overrides display via Profile.display_name).
+    After the save, when the file field has its final storage name. Bulk
+    writes (archiving, restores) copy ``url`` themselves.
     """
-    try:
-        sa = SocialAccount.objects.filter(user=user, provider="google").first()
-        if not sa:
-            return
-
-        data = sa.extra_data or {}
-        given = (data.get("given_name") or "").strip()
-        family = (data.get("family_name") or "").strip()
-        fallback_full = (data.get("name") or "").strip()
-
-        if (not given and not family) and fallback_full:
-            given, family = _split_full_name(fallback_full)
-
-        to_update = []
-        if not user.first_name and given:
-            user.first_name = given
-            to_update.append("first_name")
-        if not user.last_name and family:
-            user.last_name = family
-            to_update.append("last_name")
-
-        if to_update:
-            user.save(update_fields=to_update)
-    except Exception:
-        pass
+    url = public_url(instance.image.name)
+    if url != instance.url:
+        sender.objects.filter(pk=instance.pk).update(url=url)
+        instance.url = url
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="app_profile_avatar_url")
+def store_avatar_url(sender, instance, **kwargs):
+    url = public_url(instance.avatar.name)
+    if url != instance.avatar_url:
+        Profile.objects.filter(pk=instance.pk).update(avatar_url=url)
+        instance.avatar_url = url
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import rollups
+from app.account_deletion import claim_next_job, process_job
+from app.archive import archive_expired
+from app.audiences import save_audience
+from app.models import AccountDeletionJob, ArchivedPost, Audience, Post, PostFlag, StoredBlob
+from messaging.archive import compact, compact_cutoff, decode
+from messaging.models import Message, MessageArchiveBlock, MessageFlag, Thread
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+User = get_user_model()
+
+
+class AccountDeletionTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("leaver")
+        self.other = make_user("stayer")
+        rollups.reconcile()
+
+    def run_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            while (job := claim_next_job()) is not None:
+                process_job(job)
+        return AccountDeletionJob.objects.order_by("pk").last()
+
+    def test_view_deactivates_and_queues(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("delete_account"))
+        self.assertRedirects(response, reverse("account_login"), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(AccountDeletionJob.objects.get().user_id, self.user.pk)
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_worker_removes_the_users_rows_and_media(self):
+        shared = image_bytes()
+        own = make_post(self.user, images=[shared, image_bytes(color=(1, 2, 3))])
+        kept = make_post(self.other, images=[shared])
+        make_post(self.user, "Old", expires_at=timezone.now() - timedelta(days=1))
+        archive_expired()
+        self.user.profile.avatar.save("me.png", ContentFile(image_bytes()))
+        avatar = self.user.profile.avatar.name
+        audience = save_audience(self.user, "Roommates", "stayer")
+        own.hidden_audiences.add(audience)
+        PostFlag.objects.create(post=kept, flagged_by=self.user, reason="Spam")
+        PostFlag.objects.create(post=own, flagged_by=self.other, reason="Spam")
+        unique_blob = StoredBlob.objects.get(refcount=1)
+
+        AccountDeletionJob.objects.create(user_id=self.user.pk)
+        job = self.run_jobs()
+
+        self.assertEqual(job.status, AccountDeletionJob.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [kept])
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(Audience.objects.exists())
+        self.assertFalse(PostFlag.objects.exists())
+        self.assertFalse(default_storage.exists(avatar))
+        self.assertFalse(default_storage.exists(unique_blob.name))
+        shared_blob = StoredBlob.objects.get()
+        self.assertEqual(shared_blob.refcount, 1)
+        self.assertTrue(default_storage.exists(shared_blob.name))
+        self.assertEqual(job.step, "user")
+        self.assertEqual(job.progress["posts"], 1)
+        self.assertEqual(rollups.read(), rollups.exact_counts())
+
+    def test_messages_stay_without_a_sender(self):
+        thread, _ = Thread.for_users(self.user, self.other)
+        group = Thread.create_group("Sale", self.user, [self.other])
+        old = Message.objects.create(thread=thread, sender=self.user, text="Old")
+        cutoff = compact_cutoff(timedelta(days=180))
+        Message.objects.filter(pk=old.pk).update(created_at=cutoff - timedelta(days=1))
+        compact(cutoff)
+        reply = Message.objects.create(thread=thread, sender=self.other, text="Reply")
+        mine = Message.objects.create(thread=thread, sender=self.user, text="Mine")
+        MessageFlag.objects.create(message=reply, flagged_by=self.user, reason="Rude")
+
+        AccountDeletionJob.objects.create(user_id=self.user.pk)
+        self.run_jobs()
+
+        mine.refresh_from_db()
+        self.assertIsNone(mine.sender_id)
+        self.assertTrue(Message.objects.filter(pk=reply.pk, sender=self.other).exists())
+        self.assertEqual([row[1] for row in decode(MessageArchiveBlock.objects.get().data)], [None])
+        self.assertEqual(list(thread.participants.all()), [self.other])
+        group.refresh_from_db()
+        self.assertIsNone(group.created_by_id)
+        self.assertFalse(MessageFlag.objects.exists())
+
+    def test_failed_job_is_recorded_and_can_be_retried(self):
+        make_post(self.user)
+        job = AccountDeletionJob.objects.create(user_id=self.user.pk)
+        with mock.patch("app.account_deletion.scrub_sender", side_effect=RuntimeError("storage down")):
+            self.assertFalse(process_job(claim_next_job()))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AccountDeletionJob.FAILED)
+        self.assertIn("storage down", job.error)
+
+        AccountDeletionJob.objects.filter(pk=job.pk).update(status=AccountDeletionJob.PENDING)
+        self.assertEqual(self.run_jobs().status, AccountDeletionJob.DONE)
+        self.assertFalse(Post.objects.exists())
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        AccountDeletionJob.objects.create(user_id=self.user.pk)
+        self.assertIsNotNone(claim_next_job())
+        self.assertIsNone(claim_next_job())
+
+    def test_command_drains_the_queue(self):
+        AccountDeletionJob.objects.create(user_id=self.user.pk)
+        AccountDeletionJob.objects.create(user_id=self.other.pk)
+        out = StringIO()
+        call_command("process_account_deletions", "--once", stdout=out)
+        self.assertEqual(out.getvalue().count("done:"), 2)
+        self.assertFalse(User.objects.exists())
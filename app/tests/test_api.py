@@ -0,0 +1,180 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import api
+from app.audiences import save_audience
+from messaging.archive import compact, compact_cutoff
+from messaging.models import Message, Thread, ThreadRead
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+
+class ApiTestCase(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = make_user("seller", nickname="Sal")
+        self.buyer = make_user("buyer")
+        self.client.force_login(self.buyer)
+
+    def get(self, name, status=200, args=(), **params):
+        response = self.client.get(reverse(f"api:{name}", args=args), params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def query_count(self, name, args=(), **params):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(name, args=args, **params)
+        return len(queries)
+
+
+class AuthTests(ApiTestCase):
+    def test_anonymous_requests_get_401(self):
+        self.client.logout()
+        for name, args in [("posts", ()), ("profiles", ()), ("threads", ()), ("messages", ()), ("thread_messages", (1,))]:
+            response = self.client.get(reverse(f"api:{name}", args=args))
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json(), {"error": "Authentication required."})
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(reverse("api:posts")).status_code, 405)
+
+
+class PostApiTests(ApiTestCase):
+    def test_list_pages_newest_first_with_a_cursor(self):
+        posts = [make_post(self.seller, f"Item {n}") for n in range(5)]
+        first = self.get("posts", limit=2)
+        self.assertEqual([p["id"] for p in first["posts"]], [posts[4].pk, posts[3].pk])
+        self.assertEqual(first["next"], posts[3].pk)
+
+        rest = self.get("posts", limit=3, before=first["next"])
+        self.assertEqual([p["id"] for p in rest["posts"]], [posts[2].pk, posts[1].pk, posts[0].pk])
+        self.assertIsNone(rest["next"])
+
+    def test_batch_keeps_request_order_and_drops_missing_ids(self):
+        a, b = make_post(self.seller, "A"), make_post(self.seller, "B")
+        data = self.get("posts", ids=f"{b.pk},999,{a.pk},{b.pk}")
+        self.assertEqual([p["id"] for p in data["posts"]], [b.pk, a.pk])
+        self.assertNotIn("next", data)
+
+    def test_posts_hidden_from_the_viewer_are_left_out(self):
+        hidden = make_post(self.seller, "Secret")
+        hidden.hidden_audiences.add(save_audience(self.seller, "Roommates", "buyer"))
+        shown = make_post(self.seller, "Open")
+
+        self.assertEqual([p["id"] for p in self.get("posts")["posts"]], [shown.pk])
+        self.assertEqual([p["id"] for p in self.get("posts", ids=f"{hidden.pk},{shown.pk}")["posts"]], [shown.pk])
+
+        self.client.force_login(make_user("stranger"))
+        self.assertEqual({p["id"] for p in self.get("posts")["posts"]}, {shown.pk, hidden.pk})
+
+    def test_fields_trim_objects_and_profiles_are_side_loaded(self):
+        post = make_post(self.seller, images=[image_bytes()])
+        data = self.get("posts", fields="title,images")
+        [item] = data["posts"]
+        self.assertEqual(set(item), {"id", "title", "images"})
+        self.assertEqual(item["images"], [post.images.get().url])
+        self.assertEqual(data["profiles"], {
+            str(self.seller.pk): {
+                "id": self.seller.pk, "username": "seller", "display_name": "Sal",
+                "avatar": None, "bio": self.seller.profile.bio, "interests": self.seller.profile.interests,
+            },
+        })
+        self.assertNotIn("profiles", self.get("posts", include=""))
+
+    def test_filters_match_the_dashboard(self):
+        lamp = make_post(self.seller, "Desk lamp", category="furniture")
+        make_post(self.seller, "Desk", category="other")
+        make_post(self.seller, "Chair", category="furniture")
+        data = self.get("posts", category="furniture", q="lamp")
+        self.assertEqual([p["id"] for p in data["posts"]], [lamp.pk])
+
+    def test_bad_parameters_are_400(self):
+        self.assertIn("Unknown fields: colour", self.get("posts", status=400, fields="colour")["error"])
+        self.assertEqual(self.get("posts", status=400, limit=0)["error"], f"limit must be between 1 and {api.MAX_LIMIT}.")
+        self.assertEqual(self.get("posts", status=400, ids="1,x")["error"], "ids must be a number.")
+        too_many = ",".join(str(n) for n in range(1, api.MAX_IDS + 2))
+        self.assertEqual(self.get("posts", status=400, ids=too_many)["error"], f"At most {api.MAX_IDS} ids per request.")
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        make_post(self.seller, images=[image_bytes()])
+        small = self.query_count("posts")
+        for n in range(8):
+            make_post(make_user(f"seller{n}"), f"Item {n}", images=[image_bytes(color=(n, 0, 0))] * 2)
+        self.assertEqual(self.query_count("posts"), small)
+        self.assertEqual(self.query_count("posts", fields="title"), small - 1)
+
+    def test_unchanged_list_answers_304(self):
+        make_post(self.seller)
+        response = self.client.get(reverse("api:posts"))
+        again = self.client.get(reverse("api:posts"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+
+class ProfileApiTests(ApiTestCase):
+    def test_batch_of_public_profiles(self):
+        data = self.get("profiles", ids=f"{self.buyer.pk},{self.seller.pk},999", fields="display_name")
+        self.assertEqual(data["profiles"], [
+            {"id": self.buyer.pk, "display_name": "buyer"},
+            {"id": self.seller.pk, "display_name": "Sal"},
+        ])
+
+    def test_ids_are_required(self):
+        self.assertEqual(self.get("profiles", status=400)["error"], "Pass the user ids to fetch as ?ids=.")
+
+
+class MessagingApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.thread, _ = Thread.for_users(self.buyer, self.seller)
+        self.question = Message.objects.create(thread=self.thread, sender=self.buyer, text="Still available?")
+        self.answer = Message.objects.create(thread=self.thread, sender=self.seller, text="Yes")
+        self.private, _ = Thread.for_users(self.seller, make_user("other"))
+        self.secret = Message.objects.create(thread=self.private, sender=self.seller, text="Not for the buyer")
+
+    def test_threads_list_only_the_viewers_conversations(self):
+        data = self.get("threads")
+        [thread] = data["threads"]
+        self.assertEqual(thread["id"], self.thread.pk)
+        self.assertEqual(thread["participants"], sorted([self.buyer.pk, self.seller.pk]))
+        self.assertEqual(thread["last_message"]["text"], "Yes")
+        self.assertEqual(thread["unread"], 1)
+        self.assertEqual(set(data["profiles"]), {str(self.buyer.pk), str(self.seller.pk)})
+        self.assertEqual(self.get("threads", ids=f"{self.private.pk}")["threads"], [])
+
+    def test_unread_follows_the_read_marker(self):
+        ThreadRead.objects.create(thread=self.thread, user=self.buyer, last_read_at=timezone.now())
+        self.assertEqual(self.get("threads", fields="unread")["threads"], [{"id": self.thread.pk, "unread": 0}])
+
+    def test_thread_query_count_does_not_grow_with_the_batch(self):
+        small = self.query_count("threads")
+        for n in range(6):
+            thread, _ = Thread.for_users(self.buyer, make_user(f"seller{n}"))
+            Message.objects.create(thread=thread, sender=thread.participants.exclude(pk=self.buyer.pk).get(), text="Hi")
+        self.assertEqual(self.query_count("threads"), small)
+
+    def test_messages_only_from_the_viewers_threads(self):
+        data = self.get("messages", ids=f"{self.answer.pk},{self.secret.pk},{self.question.pk}", fields="text")
+        self.assertEqual(data["messages"], [
+            {"id": self.answer.pk, "text": "Yes"},
+            {"id": self.question.pk, "text": "Still available?"},
+        ])
+        self.assertEqual(self.get("messages", status=400)["error"], "Pass the message ids to fetch as ?ids=.")
+
+    def test_thread_messages_page_into_archived_history(self):
+        cutoff = compact_cutoff(timedelta(days=180))
+        Message.objects.filter(pk=self.question.pk).update(created_at=cutoff - timedelta(days=1))
+        compact(cutoff)
+
+        latest = self.get("thread_messages", args=[self.thread.pk], limit=1)
+        self.assertEqual([m["text"] for m in latest["messages"]], ["Yes"])
+        older = self.get("thread_messages", args=[self.thread.pk], limit=1, before=latest["next"])
+        self.assertEqual([m["text"] for m in older["messages"]], ["Still available?"])
+        self.assertIsNone(older["next"])
+
+    def test_outsiders_get_404_for_a_thread(self):
+        self.assertEqual(self.get("thread_messages", status=404, args=[self.private.pk]), {"error": "Not found."})
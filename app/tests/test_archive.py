@@ -0,0 +1,155 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app import rollups
+from app.archive import archive_expired, restore
+from app.models import (
+    ArchivedPost,
+    Audience,
+    Post,
+    PostDailyStats,
+    PostFlag,
+    PostSignature,
+    StoredBlob,
+)
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+
+class ArchiveTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = make_user("seller")
+        self.past = timezone.now() - timedelta(days=1)
+        rollups.reconcile()
+
+    def expired_post(self, title="Desk lamp", **fields):
+        return make_post(self.seller, title, expires_at=self.past, **fields)
+
+    def assertCountersExact(self):
+        self.assertEqual(rollups.read(), rollups.exact_counts())
+
+    def test_expired_posts_move_with_images_audiences_and_stats(self):
+        roommates = Audience.objects.create(owner=self.seller, name="Roommates")
+        post = self.expired_post(images=[image_bytes()])
+        post.hidden_audiences.add(roommates)
+        image_name = post.images.get().image.name
+        PostDailyStats.objects.create(post=post, day=timezone.localdate() - timedelta(days=3), views=5, inquiries=1)
+        PostDailyStats.objects.create(post=post, day=timezone.localdate() - timedelta(days=2), views=2)
+        live = make_post(self.seller, "Fridge")
+
+        self.assertEqual(archive_expired(), 1)
+        self.assertEqual(list(Post.objects.all()), [live])
+        self.assertFalse(PostDailyStats.objects.exists())
+        archived = ArchivedPost.objects.get()
+        self.assertEqual((archived.pk, archived.title), (post.pk, "Desk lamp"))
+        self.assertEqual((archived.views, archived.inquiries), (7, 1))
+        self.assertEqual([img.image.name for img in archived.images.all()], [image_name])
+        self.assertEqual(list(archived.hidden_audiences.all()), [roommates])
+        self.assertTrue(default_storage.exists(image_name))
+        self.assertCountersExact()
+
+    def test_batches_cover_every_expired_post(self):
+        for n in range(3):
+            self.expired_post(f"Item {n}")
+        self.assertEqual(archive_expired(batch_size=2), 3)
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(MODERATOR_EMAILS=frozenset({"moderator@example.com"}))
+    def test_posts_with_open_flags_wait_for_a_moderator(self):
+        post = self.expired_post()
+        flag = PostFlag.objects.create(post=post, flagged_by=make_user("neighbour"), reason="Spam")
+        rollups.reconcile()
+        self.assertEqual(archive_expired(), 0)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+        self.client.force_login(make_user("moderator"))
+        self.client.get(reverse("admin_resolve_flag", args=[flag.pk]))
+        self.assertEqual(archive_expired(), 1)
+        self.assertFalse(PostFlag.objects.exists())
+        self.assertCountersExact()
+
+    def test_restore_relists_with_a_fresh_lifetime(self):
+        roommates = Audience.objects.create(owner=self.seller, name="Roommates")
+        post = self.expired_post(images=[image_bytes()])
+        post.hidden_audiences.add(roommates)
+        PostDailyStats.objects.create(post=post, day=timezone.localdate(), views=4, inquiries=2)
+        created_at = post.created_at
+        archive_expired()
+
+        restored = restore(ArchivedPost.objects.get())
+        self.assertEqual(restored.pk, post.pk)
+        self.assertGreater(restored.expires_at, timezone.now())
+        self.assertGreater(restored.created_at, created_at)
+        self.assertEqual(restored.images.count(), 1)
+        self.assertEqual(list(restored.hidden_audiences.all()), [roommates])
+        stats = PostDailyStats.objects.get(post=restored)
+        self.assertEqual((stats.views, stats.inquiries), (4, 2))
+        self.assertTrue(PostSignature.objects.filter(post=restored).exists())
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(StoredBlob.objects.get().refcount, 1)
+        self.assertCountersExact()
+
+    def test_renew_relists_only_the_owners_archived_post(self):
+        post = self.expired_post()
+        archive_expired()
+
+        self.client.force_login(make_user("other"))
+        response = self.client.post(reverse("renew_post"), {"post_id": post.pk})
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(ArchivedPost.objects.filter(pk=post.pk).exists())
+
+        self.client.force_login(self.seller)
+        self.assertRedirects(self.client.post(reverse("renew_post"), {"post_id": post.pk}), reverse("myposts"))
+        self.assertTrue(Post.objects.filter(pk=post.pk, user=self.seller).exists())
+
+    def test_command_reports_the_total(self):
+        self.expired_post()
+        out = StringIO()
+        call_command("archive_posts", stdout=out)
+        self.assertTrue(out.getvalue().startswith("Archived 1 expired posts"))
+
+
+class ArchivedImageBlobTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("seller")
+        self.past = timezone.now() - timedelta(days=1)
+
+    def archive(self, *posts):
+        for post in posts:
+            post.expires_at = self.past
+            post.save(update_fields=["expires_at"])
+        archive_expired()
+
+    def test_deleting_an_archived_post_releases_its_blob(self):
+        self.archive(make_post(self.user, images=[image_bytes()]))
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchivedPost.objects.get().delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_shared_blob_survives_until_last_reference(self):
+        body = image_bytes()
+        live = make_post(self.user, images=[body])
+        self.archive(make_post(self.user, images=[body]))
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+
+        ArchivedPost.objects.get().delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        live.delete()
+        self.assertFalse(StoredBlob.objects.exists())
@@ -0,0 +1,101 @@
+import time
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import resolve, reverse
+
+from app import geo
+from app.audiences import save_audience
+from app.ranking import store_rankings
+
+from .utils import make_post, make_user, serve_async_views
+
+
+@mock.patch("app.async_views.FEED_PAGE_SIZE", 2)
+@mock.patch("app.views.FEED_PAGE_SIZE", 2)
+class AsyncDashboardTests(TestCase):
+    """The async dashboard serves the same page as the sync one for every kind of feed."""
+
+    def setUp(self):
+        cache.clear()
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+        self.client.force_login(self.buyer)
+        self.posts = [
+            make_post(self.seller, "Desk lamp", "furniture"),
+            make_post(self.seller, "Mini fridge", "appliances"),
+            make_post(self.seller, "Floor lamp", "furniture"),
+            make_post(self.buyer, "Bike", "other"),
+            make_post(self.seller, "TI-84 calculator", "other"),
+        ]
+        hidden = make_post(self.seller, "Roommate lamp", "furniture")
+        hidden.hidden_audiences.add(save_audience(self.seller, "Roommates", "buyer"))
+        for n, post in enumerate(self.posts):
+            geo.set_location(post, geo.SPOT_CHOICES[n][0])
+            post.save()
+
+    def feed(self, **params):
+        response = self.client.get(reverse("dashboard"), params)
+        self.assertEqual(response.status_code, 200)
+        page = response.context["page_obj"]
+        return [p.pk for p in response.context["posts"]], page.number, page.paginator.num_pages, response.context["ranked"]
+
+    def feeds(self, queries):
+        return [self.feed(**params) for params in queries]
+
+    def assertSameFeeds(self, *queries):
+        expected = self.feeds(queries)
+        serve_async_views(self)
+        self.assertTrue(iscoroutinefunction(resolve(reverse("dashboard")).func))
+        self.assertEqual(self.feeds(queries), expected)
+        return expected
+
+    def test_filtered_and_paged_feeds_match(self):
+        feeds = self.assertSameFeeds(
+            {"sort": "new"},
+            {"sort": "new", "page": "2"},
+            {"sort": "new", "page": "99"},
+            {"sort": "new", "page": "nope"},
+            {"category": "furniture"},
+            {"q": "lamp"},
+            {"q": "nothing like it"},
+        )
+        self.assertEqual(feeds[0], ([self.posts[4].pk, self.posts[3].pk], 1, 3, False))
+        self.assertEqual(feeds[4][0], [self.posts[2].pk, self.posts[0].pk])
+
+    def test_ranked_feed_matches(self):
+        ranked = [self.posts[1].pk, self.posts[4].pk, self.posts[0].pk]
+        store_rankings({self.buyer.pk: ranked}, time.time())
+        newer = make_post(self.seller, "Chair")
+        [first, second] = self.assertSameFeeds({}, {"page": "2"})
+        self.assertEqual(first, ([newer.pk, ranked[0]], 1, 2, True))
+
+    def test_nearby_feed_matches(self):
+        nearby = self.assertSameFeeds(
+            {"near": "rotunda", "radius": "0.5"},
+            {"near": "rotunda", "radius": "0.5", "page": "2"},
+            {"near": "here", "lat": "38.03", "lon": "-78.50"},
+        )
+        self.assertEqual(nearby[0][0][0], self.posts[0].pk)
+
+    def test_views_are_counted(self):
+        serve_async_views(self)
+        with mock.patch("app.counters.record_views") as record_views:
+            self.client.get(reverse("dashboard"), {"sort": "new"})
+        record_views.assert_called_once_with([self.posts[4].pk])
+
+    def test_redirects_and_revalidation(self):
+        serve_async_views(self)
+        url = reverse("dashboard")
+        first = self.client.get(url, {"sort": "new"})
+        again = self.client.get(url, {"sort": "new"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        self.client.force_login(make_user("newcomer", onboarding_complete=False))
+        self.assertRedirects(self.client.get(url), reverse("onboarding"), fetch_redirect_response=False)
+
+        self.client.logout()
+        self.assertRedirects(self.client.get(url), f"{settings.LOGIN_URL}?next={url}", fetch_redirect_response=False)
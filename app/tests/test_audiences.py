@@ -0,0 +1,67 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from app import audiences
+from app.audiences import AudienceError, excluded_posts, save_audience
+from app.models import Audience, Post
+
+from .utils import make_post, make_user, use_shared_cache
+
+
+class AudienceVisibilityTests(TestCase):
+    def setUp(self):
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+        self.friend = make_user("friend")
+        self.audience = save_audience(self.seller, "Roommates", "buyer")
+        self.post = make_post(self.seller)
+        self.post.hidden_audiences.add(self.audience)
+
+    def feed(self, user):
+        return set(audiences.visible(Post.objects.all(), user).values_list("pk", flat=True))
+
+    def test_hidden_from_members_only(self):
+        self.assertEqual(self.feed(self.buyer), set())
+        self.assertEqual(self.feed(self.friend), {self.post.pk})
+
+    def test_seller_in_their_own_audience_still_sees_the_post(self):
+        Audience.members.through.objects.create(audience=self.audience, user=self.seller)
+        self.assertEqual(self.feed(self.seller), {self.post.pk})
+
+    def test_feed_and_profile_pages_leave_the_post_out(self):
+        self.client.force_login(self.buyer)
+        feed = self.client.get(reverse("dashboard"))
+        self.assertNotIn(self.post, feed.context["posts"])
+        profile = self.client.get(reverse("user_profile", args=[self.seller.pk]))
+        self.assertNotContains(profile, self.post.title)
+
+    def test_membership_changes_apply_at_once_without_a_shared_cache(self):
+        # Rows written behind the signals' back, as another worker's change
+        # looks to this process.
+        self.assertEqual(self.feed(self.friend), {self.post.pk})
+        Audience.members.through.objects.create(audience=self.audience, user=self.friend)
+        self.assertEqual(self.feed(self.friend), set())
+
+    def test_shared_cache_is_invalidated_by_membership_and_post_changes(self):
+        use_shared_cache(self)
+        self.assertEqual(excluded_posts(self.friend.pk), frozenset())
+        self.audience.members.add(self.friend)
+        self.assertEqual(excluded_posts(self.friend.pk), {self.post.pk})
+        self.post.hidden_audiences.remove(self.audience)
+        self.assertEqual(excluded_posts(self.friend.pk), frozenset())
+        self.post.hidden_audiences.add(self.audience)
+        self.assertEqual(excluded_posts(self.friend.pk), {self.post.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.audience.delete()
+        self.assertEqual(excluded_posts(self.friend.pk), frozenset())
+
+
+class SaveAudienceTests(TestCase):
+    def test_rejects_unknown_usernames_and_duplicate_names(self):
+        owner = make_user("owner")
+        make_user("ann")
+        with self.assertRaisesMessage(AudienceError, "No such user: bob"):
+            save_audience(owner, "Club", "ann, bob")
+        save_audience(owner, "Club", "ann")
+        with self.assertRaises(AudienceError):
+            save_audience(owner, "Club", "")
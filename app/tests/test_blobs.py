@@ -0,0 +1,63 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import TestCase
+
+from app.blobs import add_images, release
+from app.models import StoredBlob
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+
+class BlobRefcountTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("seller")
+
+    def test_same_content_is_stored_once(self):
+        body = image_bytes()
+        first = make_post(self.user, images=[body])
+        second = make_post(self.user, images=[body, body])
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.refcount, 3)
+        self.assertEqual({img.image.name for img in [*first.images.all(), *second.images.all()]}, {blob.name})
+
+    def test_blob_and_file_go_with_the_last_reference(self):
+        first = make_post(self.user, images=[image_bytes()])
+        second = make_post(self.user, images=[image_bytes()])
+        blob = StoredBlob.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.images.get().delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_rolled_back_release_keeps_the_file(self):
+        post = make_post(self.user, images=[image_bytes()])
+        blob = StoredBlob.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    post.delete()
+                    raise RuntimeError("abort")
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(StoredBlob.objects.filter(pk=blob.pk, refcount=1).exists())
+        self.assertTrue(default_storage.exists(blob.name))
+
+    def test_drifted_refcount_is_repaired_instead_of_deleting(self):
+        post = make_post(self.user, images=[image_bytes()])
+        blob = StoredBlob.objects.get()
+        StoredBlob.objects.filter(pk=blob.pk).update(refcount=1)
+        add_images(post, [blob])
+
+        self.assertEqual(release([blob.pk, blob.pk]), 0)
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 2)
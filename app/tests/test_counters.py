@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import counters
+from app.models import PostDailyStats
+
+from .utils import make_post, make_user
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        counters.buffer.drain()
+        self.addCleanup(counters.buffer.drain)
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+
+    def stats(self):
+        return {
+            (s.post_id, s.day): (s.views, s.inquiries)
+            for s in PostDailyStats.objects.all()
+        }
+
+    def test_flush_adds_buffered_counts_to_daily_rows(self):
+        lamp, desk = make_post(self.seller, "Lamp"), make_post(self.seller, "Desk")
+        counters.record_views([lamp.pk, desk.pk])
+        counters.record_views([lamp.pk])
+        counters.record_inquiry(desk.pk)
+        self.assertEqual(counters.flush(), 3)
+
+        today = timezone.localdate()
+        self.assertEqual(self.stats(), {(lamp.pk, today): (2, 0), (desk.pk, today): (1, 1)})
+        counters.record_views([lamp.pk])
+        counters.flush()
+        self.assertEqual(self.stats()[(lamp.pk, today)], (3, 0))
+        self.assertEqual(counters.flush(), 0)
+
+    def test_deleted_posts_are_dropped(self):
+        post = make_post(self.seller)
+        counters.record_views([post.pk])
+        post.delete()
+        self.assertEqual(counters.flush(), 0)
+        self.assertFalse(PostDailyStats.objects.exists())
+
+    def test_failed_flush_keeps_the_counts(self):
+        post = make_post(self.seller)
+        counters.record_views([post.pk])
+        with mock.patch("app.counters.write_counts", side_effect=DatabaseError("locked")):
+            with self.assertLogs("app.counters", "ERROR"):
+                self.assertEqual(counters.flush(), 0)
+        counters.flush()
+        self.assertEqual(self.stats(), {(post.pk, timezone.localdate()): (1, 0)})
+
+    def test_due_by_age_or_size(self):
+        post = make_post(self.seller)
+        self.assertFalse(counters.buffer.due())
+        counters.record_views([post.pk])
+        self.assertFalse(counters.buffer.due())
+        with mock.patch.object(counters, "FLUSH_KEYS", 1):
+            self.assertTrue(counters.buffer.due())
+        with mock.patch.object(counters, "FLUSH_SECONDS", 0):
+            self.assertTrue(counters.buffer.due())
+
+    def test_flush_query_count_does_not_grow_with_the_batch(self):
+        def flush_queries(posts):
+            counters.record_views([p.pk for p in posts])
+            counters.record_inquiry(posts[0].pk)
+            with CaptureQueriesContext(connection) as queries:
+                counters.flush()
+            return len(queries)
+
+        small = flush_queries([make_post(self.seller, f"Item {n}") for n in range(2)])
+        self.assertEqual(flush_queries([make_post(self.seller, f"More {n}") for n in range(40)]), small)
+
+    def test_feed_counts_views_of_other_sellers_posts(self):
+        theirs = make_post(self.seller)
+        make_post(self.buyer, "Mine")
+        self.client.force_login(self.buyer)
+        with mock.patch.object(counters, "FLUSH_SECONDS", 0):
+            self.client.get(reverse("dashboard"), {"sort": "new"})
+        self.assertEqual(self.stats(), {(theirs.pk, timezone.localdate()): (1, 0)})
+
+    def test_contacting_a_seller_about_a_post_counts_an_inquiry(self):
+        post = make_post(self.seller)
+        other = make_post(make_user("other"))
+        self.client.force_login(self.buyer)
+        compose = reverse("messaging:compose", args=[self.seller.pk])
+        with mock.patch("messaging.views.record_engagement") as record_engagement:
+            self.client.get(compose, {"post": post.pk})
+            self.client.get(compose, {"post": post.pk})
+            counters.flush()
+            self.assertEqual(self.stats(), {})
+
+            self.client.post(f"{compose}?post={post.pk}", {"text": ""})
+            self.client.post(f"{compose}?post={post.pk}", {"text": "Is it still available?"})
+            self.client.post(f"{compose}?post={other.pk}", {"text": "And this one?"})
+        counters.flush()
+        self.assertEqual(self.stats(), {(post.pk, timezone.localdate()): (0, 1)})
+        record_engagement.assert_called_once_with(self.buyer, "other", contacts=1)
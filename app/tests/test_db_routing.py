@@ -0,0 +1,82 @@
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app import caching
+from app.db_routing import STICKY_COOKIE, replica_reads
+from app.models import Post
+
+from .utils import make_post, make_user
+
+REPLICA = "replica"
+
+# TransactionTestCase: the replica alias mirrors the test database through
+# its own connection, which can't see rows inside a test's open transaction.
+
+
+class FakeRequest:
+    pinned_to_primary = False
+
+
+@override_settings(DATABASE_REPLICA=REPLICA)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def test_reads_in_marked_views_go_to_the_replica(self):
+        view = replica_reads(lambda request: Post.objects.all().db)
+        self.assertEqual(view(FakeRequest()), REPLICA)
+        self.assertEqual(Post.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_writes_in_marked_views_go_to_the_primary(self):
+        user = make_user("seller")
+
+        @replica_reads
+        def view(request):
+            post = Post.objects.create(user=user, title="Lamp", price=1, description="")
+            return router.db_for_write(Post), post._state.db
+
+        self.assertEqual(view(FakeRequest()), (DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS))
+
+    def test_pinned_requests_read_from_the_primary(self):
+        request = FakeRequest()
+        request.pinned_to_primary = True
+        view = replica_reads(lambda request: Post.objects.all().db)
+        self.assertEqual(view(request), DEFAULT_DB_ALIAS)
+
+    def test_values_computed_from_the_replica_are_cached_briefly(self):
+        view = replica_reads(lambda request: caching.computed_timeout(3600))
+        self.assertEqual(view(FakeRequest()), caching.REPLICA_TIMEOUT)
+        self.assertEqual(caching.computed_timeout(3600), 3600)
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_a_replica_everything_stays_on_the_primary(self):
+        view = replica_reads(lambda request: Post.objects.all().db)
+        self.assertEqual(view(FakeRequest()), DEFAULT_DB_ALIAS)
+
+
+@override_settings(DATABASE_REPLICA=REPLICA)
+class ReadYourWritesTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        self.user = make_user("viewer")
+        make_post(make_user("seller"))
+        self.client.force_login(self.user)
+
+    def feed_queries(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return len(replica)
+
+    def test_feed_is_read_from_the_replica(self):
+        self.assertGreater(self.feed_queries(), 0)
+
+    def test_a_write_pins_the_browser_to_the_primary(self):
+        response = self.client.post(reverse("profile"), {"action": "update_bio", "bio": "Hi"})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.feed_queries(), 0)
+
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertGreater(self.feed_queries(), 0)
@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from app import dedupe
+from app.models import Post, PostFlag, PostLSHBucket, PostSignature
+
+from .utils import make_post, make_user
+
+LAMP = (
+    "Adjustable LED desk lamp with three brightness levels and a USB charging port. "
+    "Barely used, works perfectly, pick up near the Corner."
+)
+LAMP_REPOST = (
+    "Adjustable LED desk lamp with 3 brightness levels and a USB charging port! "
+    "Barely used, works perfectly, pick up near the Corner."
+)
+BIKE = "Blue road bike, 54cm aluminium frame, new tyres and brake pads. Great for getting to grounds."
+
+
+class SignatureTests(TestCase):
+    def test_normalize_folds_case_and_punctuation(self):
+        self.assertEqual(dedupe.normalize("  Mini-Fridge!!  (Like NEW)_ "), "mini fridge like new")
+
+    def test_batch_signatures_match_single_ones(self):
+        texts = [dedupe.normalize(t) for t in (LAMP, BIKE, "tv")]
+        batch = dedupe.signatures(texts)
+        self.assertEqual(batch.shape, (3, dedupe.NUM_PERM))
+        for text, sig in zip(texts, batch):
+            self.assertTrue((dedupe.signature(text) == sig).all())
+
+    def test_similarity_tracks_text_overlap(self):
+        lamp, repost, bike = (dedupe.signature(dedupe.normalize(t)) for t in (LAMP, LAMP_REPOST, BIKE))
+        self.assertEqual(dedupe.similarity(lamp, lamp), 1.0)
+        self.assertGreaterEqual(dedupe.similarity(lamp, repost), dedupe.SIMILARITY_THRESHOLD)
+        self.assertLess(dedupe.similarity(lamp, bike), 0.2)
+
+
+class IndexTests(TestCase):
+    def setUp(self):
+        self.seller = make_user("seller")
+        self.reseller = make_user("reseller")
+
+    def test_near_duplicate_is_flagged_against_the_original(self):
+        original = make_post(self.seller, "Desk lamp", description=LAMP)
+        dedupe.index_post(original, flag=True)
+        repost = make_post(self.reseller, "Desk lamp", description=LAMP_REPOST)
+
+        self.assertEqual(dedupe.index_post(repost, flag=True), [original.pk])
+        flag = PostFlag.objects.get()
+        self.assertEqual(flag.post, repost)
+        self.assertIsNone(flag.flagged_by)
+        self.assertFalse(flag.resolved)
+        self.assertEqual(flag.reason, f"{dedupe.DUPLICATE_REASON} of #{original.pk}")
+
+    def test_unrelated_posts_are_not_flagged(self):
+        dedupe.index_post(make_post(self.seller, "Desk lamp", description=LAMP), flag=True)
+        bike = make_post(self.reseller, "Road bike", description=BIKE)
+        self.assertEqual(dedupe.index_post(bike, flag=True), [])
+        self.assertFalse(PostFlag.objects.exists())
+
+    def test_reindexing_replaces_signature_and_buckets(self):
+        original = make_post(self.seller, "Desk lamp", description=LAMP)
+        dedupe.index_post(original)
+        post = make_post(self.reseller, "Desk lamp", description=LAMP_REPOST)
+        dedupe.index_post(post)
+        self.assertEqual(PostLSHBucket.objects.filter(post=post).count(), dedupe.BANDS)
+
+        post.title, post.description = "Road bike", BIKE
+        post.save()
+        self.assertEqual(dedupe.index_post(post, flag=True), [])
+        self.assertEqual(PostLSHBucket.objects.filter(post=post).count(), dedupe.BANDS)
+        self.assertEqual(PostSignature.objects.count(), 2)
+
+    def test_index_without_flag_only_records_the_signature(self):
+        dedupe.index_post(make_post(self.seller, "Desk lamp", description=LAMP))
+        self.assertEqual(dedupe.index_post(make_post(self.reseller, "Desk lamp", description=LAMP_REPOST)), [])
+        self.assertFalse(PostFlag.objects.exists())
+
+    def test_batch_index_agrees_with_single_index(self):
+        posts = [
+            make_post(self.seller, "Desk lamp", description=LAMP),
+            make_post(self.reseller, "Road bike", description=BIKE),
+        ]
+        dedupe.index_batch(posts)
+        batch = {s.post_id: bytes(s.minhash) for s in PostSignature.objects.all()}
+        buckets = set(PostLSHBucket.objects.values_list("post_id", "band", "bucket"))
+
+        for post in posts:
+            dedupe.index_post(post)
+        self.assertEqual({s.post_id: bytes(s.minhash) for s in PostSignature.objects.all()}, batch)
+        self.assertEqual(set(PostLSHBucket.objects.values_list("post_id", "band", "bucket")), buckets)
+
+    def test_build_command_indexes_missing_posts_and_reports_pairs(self):
+        original = make_post(self.seller, "Desk lamp", description=LAMP)
+        repost = make_post(self.reseller, "Desk lamp", description=LAMP_REPOST)
+        make_post(self.reseller, "Road bike", description=BIKE)
+
+        out = StringIO()
+        call_command("build_dedupe_index", "--report", stdout=out)
+        self.assertEqual(PostSignature.objects.count(), 3)
+        self.assertIn(f"#{original.pk} ~ #{repost.pk}", out.getvalue())
+        self.assertIn("1 near-duplicate pairs", out.getvalue())
+        self.assertFalse(PostFlag.objects.exists())
+
+    def test_new_post_view_flags_a_repost(self):
+        dedupe.index_post(make_post(self.seller, "Desk lamp", description=LAMP))
+        self.client.force_login(self.reseller)
+        self.client.post(reverse("newpost"), {
+            "title": "Desk lamp", "price": "12", "description": LAMP_REPOST, "category": "other",
+        })
+        repost = Post.objects.get(user=self.reseller)
+        self.assertTrue(PostFlag.objects.filter(post=repost, reason__startswith=dedupe.DUPLICATE_REASON).exists())
@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Post, Profile
+from messaging.models import Message, Thread
+
+from .utils import make_post, make_user
+
+
+class FragmentCacheTests(TestCase):
+    """
+    Rows are changed with ``update()``, which sends no signals: the same
+    thing a write handled by another worker looks like to this process.
+    """
+
+    def setUp(self):
+        self.viewer = make_user("viewer")
+        self.seller = make_user("seller", nickname="Sam")
+        self.post = make_post(self.seller, title="Desk lamp")
+        self.client.force_login(self.viewer)
+
+    def feed(self):
+        return self.client.get(reverse("dashboard"))
+
+    def test_edited_post_body_is_rendered_afresh(self):
+        self.assertContains(self.feed(), "Desk lamp")
+        Post.objects.filter(pk=self.post.pk).update(title="Floor lamp", updated_at=timezone.now())
+        response = self.feed()
+        self.assertContains(response, "Floor lamp")
+        self.assertNotContains(response, "Desk lamp")
+
+    def test_renamed_author_is_rendered_afresh(self):
+        self.assertContains(self.feed(), "Sam")
+        Profile.objects.filter(user=self.seller).update(nickname="Samantha", updated_at=timezone.now())
+        self.assertContains(self.feed(), "Samantha")
+
+    def test_renamed_sender_is_rendered_afresh(self):
+        thread, _ = Thread.for_users(self.viewer, self.seller)
+        Message.objects.create(thread=thread, sender=self.seller, text="Still available")
+        url = reverse("messaging:thread", args=[thread.pk])
+        self.assertContains(self.client.get(url), "Sam")
+        Profile.objects.filter(user=self.seller).update(nickname="Samantha", updated_at=timezone.now())
+        self.assertContains(self.client.get(url), "Samantha")
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from app import freshness
+from app.models import Post
+
+from .utils import make_post, make_user, use_shared_cache
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = make_user("viewer")
+        self.post = make_post(make_user("seller"))
+        self.client.force_login(self.user)
+
+    def get(self, name, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(reverse(name), headers=headers)
+
+    def test_unchanged_feed_answers_304(self):
+        etag = self.get("dashboard")["ETag"]
+        self.assertEqual(self.get("dashboard", etag).status_code, 304)
+
+    def test_write_seen_without_signals_changes_the_tag(self):
+        # As a write handled by another worker looks to this one's cache.
+        etag = self.get("dashboard")["ETag"]
+        Post.objects.filter(pk=self.post.pk).update(title="Lamp", updated_at=timezone.now())
+        self.assertEqual(self.get("dashboard", etag).status_code, 200)
+
+    def test_relative_times_move_the_my_posts_tag(self):
+        make_post(self.user)
+        with mock.patch("app.freshness.time.time", return_value=1_000_000):
+            etag = self.get("myposts")["ETag"]
+            self.assertEqual(self.get("myposts", etag).status_code, 304)
+        with mock.patch("app.freshness.time.time", return_value=1_000_060):
+            self.assertEqual(self.get("myposts", etag).status_code, 200)
+
+
+class VersionMemoTests(TestCase):
+    def test_versions_are_not_memoised_in_a_per_process_cache(self):
+        before = freshness.feed_version()
+        make_post(make_user("seller"))
+        Post.objects.update(updated_at=timezone.now())
+        self.assertNotEqual(freshness.feed_version(), before)
+
+    def test_versions_are_memoised_in_a_shared_cache_until_invalidated(self):
+        use_shared_cache(self)
+        seller = make_user("seller")
+        before = freshness.feed_version()
+        Post.objects.create(user=seller, title="x", price=1, description="")
+        Post.objects.update(updated_at=timezone.now())
+        freshness.invalidate_posts(seller.pk)
+        after = freshness.feed_version()
+        self.assertNotEqual(after, before)
+        Post.objects.update(updated_at=timezone.now())
+        self.assertEqual(freshness.feed_version(), after)
@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from app.archive import archive_expired
+from app.media import delete_in_batches, iter_storage
+from app.models import ArchivedPostImage, ClaimedUpload
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+DAY = 24 * 60 * 60
+
+
+class GcMediaTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("seller")
+
+    def age(self, name, seconds=2 * DAY):
+        when = time.time() - seconds
+        os.utime(default_storage.path(name), (when, when))
+
+    def stray(self, name, seconds=2 * DAY):
+        name = default_storage.save(name, ContentFile(b"left over"))
+        self.age(name, seconds)
+        return name
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command("gc_media", *args, stdout=out)
+        return out.getvalue()
+
+    def referenced(self):
+        """A live post's image, an archived post's image and an avatar, all past the grace period."""
+        post = make_post(self.user, images=[image_bytes()])
+        make_post(self.user, images=[image_bytes(color=(1, 2, 3))], expires_at=timezone.now())
+        archive_expired()
+        self.user.profile.avatar.save("me.png", ContentFile(image_bytes()))
+        names = [post.images.get().image.name, ArchivedPostImage.objects.get().image.name, self.user.profile.avatar.name]
+        for name in names:
+            self.age(name)
+        return names
+
+    def test_old_unreferenced_files_are_deleted(self):
+        kept = self.referenced()
+        orphan = self.stray("posts/orphan.jpg")
+        avatar_orphan = self.stray("avatars/orphan.png")
+        recent = self.stray("posts/recent.jpg", seconds=60)
+
+        output = self.gc()
+        self.assertIn("orphaned 2", output)
+        self.assertIn("Deleted 2.", output)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(default_storage.exists(avatar_orphan))
+        self.assertTrue(default_storage.exists(recent))
+        for name in kept:
+            self.assertTrue(default_storage.exists(name), name)
+        self.assertEqual(sum(1 for _ in iter_storage("posts/")), 3)
+
+    def test_dry_run_and_prefix(self):
+        orphan = self.stray("posts/orphan.jpg")
+        avatar_orphan = self.stray("avatars/orphan.png")
+
+        self.assertIn("Dry run: nothing deleted.", self.gc("--dry-run"))
+        self.assertTrue(default_storage.exists(orphan))
+
+        self.gc("--prefix", "avatars/")
+        self.assertTrue(default_storage.exists(orphan))
+        self.assertFalse(default_storage.exists(avatar_orphan))
+
+    def test_grace_period_is_configurable(self):
+        orphan = self.stray("posts/orphan.jpg", seconds=2 * 60 * 60)
+        self.gc()
+        self.assertTrue(default_storage.exists(orphan))
+        self.gc("--grace-hours", "1")
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_expired_upload_claims_are_pruned(self):
+        old = ClaimedUpload.objects.create(token_id="a" * 32)
+        ClaimedUpload.objects.filter(pk=old.pk).update(claimed_at=timezone.now() - timedelta(days=1))
+        fresh = ClaimedUpload.objects.create(token_id="b" * 32)
+
+        self.gc("--dry-run")
+        self.assertEqual(ClaimedUpload.objects.count(), 2)
+        self.assertIn("1 expired upload claims pruned", self.gc())
+        self.assertEqual(list(ClaimedUpload.objects.all()), [fresh])
+
+    def test_delete_in_batches_streams_any_number_of_names(self):
+        names = [default_storage.save(f"posts/n{n}.jpg", ContentFile(b"x")) for n in range(7)]
+        self.assertEqual(delete_in_batches(iter(names + ["posts/missing.jpg"]), batch_size=2, workers=2), (8, 0))
+        self.assertEqual(list(iter_storage("posts/")), [])
@@ -0,0 +1,169 @@
+import math
+import random
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from app import geo
+from app.models import Post
+
+from .utils import make_post, make_user
+
+ROTUNDA = geo.SPOTS["rotunda"][1:]
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode_matches_the_reference_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744), "u4pruydqq")
+        self.assertEqual(geo.encode(-25.382708, -49.265506, 6), "6gkzwg")
+
+    def test_prefixes_are_enclosing_cells(self):
+        full = geo.encode(*ROTUNDA)
+        for precision in range(1, geo.GEOHASH_PRECISION):
+            self.assertEqual(geo.encode(*ROTUNDA, precision), full[:precision])
+
+    def test_distance(self):
+        self.assertEqual(geo.distance_km(*ROTUNDA, *ROTUNDA), 0)
+        barracks = geo.SPOTS["barracks"][1:]
+        self.assertAlmostEqual(geo.distance_km(*ROTUNDA, *barracks), 1.8, delta=0.1)
+        self.assertAlmostEqual(geo.distance_km(0, 0, 0, 1), geo.KM_PER_DEGREE, places=6)
+
+    def test_search_cells_cover_the_whole_circle(self):
+        rng = random.Random(7)
+        for lat, lon, radius in [(*ROTUNDA, 0.5), (*ROTUNDA, 5), (69.9, 18.9, 2), (0.0, 179.999, 1), (-33.9, 151.2, 10)]:
+            cells = geo.search_cells(lat, lon, radius)
+            self.assertTrue(1 <= len(cells) <= 9)
+            for _ in range(300):
+                # A point on or inside the circle, in a random direction.
+                dlat = rng.uniform(-1, 1) * radius / geo.KM_PER_DEGREE
+                dlon = rng.uniform(-1, 1) * radius / geo.KM_PER_DEGREE / math.cos(math.radians(lat))
+                plat, plon = lat + dlat, (lon + dlon + 180) % 360 - 180
+                if geo.distance_km(lat, lon, plat, plon) > radius:
+                    continue
+                point = geo.encode(plat, plon)
+                self.assertTrue(any(point.startswith(cell) for cell in cells), (lat, lon, radius, plat, plon))
+
+    def test_cell_end_bumps_the_last_character(self):
+        self.assertEqual(geo.cell_end("dqb"), "dqc")
+        self.assertEqual(geo.cell_end("dq9"), "dqb")
+        self.assertEqual(geo.cell_end("dqz"), "dr")
+        self.assertEqual(geo.cell_end("zz"), "")
+
+    def test_huge_radius_searches_everything(self):
+        self.assertEqual(geo.search_cells(*ROTUNDA, 20000), [])
+
+    def test_parse_point_and_radius(self):
+        self.assertEqual(geo.parse_point("38.03", "-78.5"), (38.03, -78.5))
+        for lat, lon in [("", "1"), ("91", "0"), ("0", "-181"), ("nan", "0"), (None, None)]:
+            self.assertIsNone(geo.parse_point(lat, lon))
+        self.assertEqual(geo.parse_radius("2"), 2)
+        self.assertEqual(geo.parse_radius("0"), 0.1)
+        self.assertEqual(geo.parse_radius("1e9"), geo.MAX_RADIUS_KM)
+        self.assertEqual(geo.parse_radius("inf"), geo.DEFAULT_RADIUS_KM)
+        self.assertEqual(geo.parse_radius(None), geo.DEFAULT_RADIUS_KM)
+
+    def test_requested_point(self):
+        self.assertEqual(geo.requested_point(QueryDict("near=rotunda")), ROTUNDA)
+        self.assertEqual(geo.requested_point(QueryDict("near=here&lat=38.1&lon=-78.4")), (38.1, -78.4))
+        self.assertIsNone(geo.requested_point(QueryDict("near=here")))
+        self.assertIsNone(geo.requested_point(QueryDict("near=nowhere")))
+        self.assertIsNone(geo.requested_point(QueryDict("")))
+
+
+class NearbyTests(TestCase):
+    def setUp(self):
+        self.seller = make_user("seller")
+
+    def scatter(self, lat, lon, spread, count, seed):
+        rng = random.Random(seed)
+        posts = []
+        for n in range(count):
+            post = Post(user=self.seller, title=f"Item {n}", price=1, description="", category="other")
+            plat = max(-90.0, min(90.0, lat + rng.uniform(-spread, spread)))
+            geo.set_location(post, lat=plat, lon=(lon + rng.uniform(-spread, spread) + 180) % 360 - 180)
+            posts.append(post)
+        return Post.objects.bulk_create(posts)
+
+    def brute_force(self, lat, lon, radius):
+        rows = Post.objects.exclude(geohash="").values_list("pk", "latitude", "longitude")
+        found = sorted((geo.distance_km(lat, lon, plat, plon), pk) for pk, plat, plon in rows)
+        return [pk for d, pk in found if d <= radius]
+
+    def test_matches_brute_force(self):
+        self.scatter(*ROTUNDA, spread=0.08, count=150, seed=1)
+        self.scatter(0.0, 179.99, spread=0.05, count=50, seed=2)
+        self.scatter(69.9, 18.9, spread=0.1, count=50, seed=3)
+        for lat, lon in [ROTUNDA, geo.SPOTS["barracks"][1:], (0.0, 179.999), (0.0, -179.999), (69.9, 18.9)]:
+            for radius in (0.5, 1, 2, 5, 10, 50):
+                with self.subTest(lat=lat, lon=lon, radius=radius):
+                    expected = self.brute_force(lat, lon, radius)
+                    self.assertEqual(geo.nearby(Post.objects.all(), lat, lon, radius), expected)
+
+    def test_cell_ranges_hold_under_a_linguistic_collation(self):
+        """
+        Like en_US.UTF-8: punctuation is ignored on the first pass, so "dqb~"
+        sorts before "dqbx...". The cell bounds must not depend on byte order.
+        """
+        def linguistic(a, b):
+            ka = ("".join(c for c in a.lower() if c.isalnum()), a)
+            kb = ("".join(c for c in b.lower() if c.isalnum()), b)
+            return (ka > kb) - (ka < kb)
+
+        connection.ensure_connection()
+        connection.connection.create_collation("linguistic", linguistic)
+        posts = self.scatter(*ROTUNDA, spread=0.08, count=150, seed=4)
+
+        def in_range(low, high):
+            sql = f"SELECT id FROM {Post._meta.db_table} WHERE geohash >= %s COLLATE linguistic"
+            params = [low]
+            if high:
+                sql += " AND geohash < %s COLLATE linguistic"
+                params.append(high)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return sorted(pk for pk, in cursor.fetchall())
+
+        full = geo.encode(*ROTUNDA)
+        for cell in [full[:n] for n in range(1, 8)] + geo.search_cells(*ROTUNDA, 1) + ["zz"]:
+            with self.subTest(cell=cell):
+                expected = sorted(p.pk for p in posts if p.geohash.startswith(cell))
+                self.assertEqual(in_range(cell, geo.cell_end(cell)), expected)
+        self.assertEqual(in_range(full[:5], full[:5] + "~"), [])
+
+    def test_posts_without_a_location_are_left_out(self):
+        make_post(self.seller, "Anywhere")
+        here = make_post(self.seller, "Rotunda", pickup_spot="rotunda", latitude=ROTUNDA[0], longitude=ROTUNDA[1],
+                         geohash=geo.encode(*ROTUNDA))
+        self.assertEqual(geo.nearby(Post.objects.all(), *ROTUNDA, 1), [here.pk])
+
+    def test_set_location_prefers_a_named_spot(self):
+        post = Post()
+        geo.set_location(post, "corner", "1", "2")
+        self.assertEqual((post.pickup_spot, post.latitude, post.longitude), ("corner", *geo.SPOTS["corner"][1:]))
+        self.assertEqual(post.geohash, geo.encode(*geo.SPOTS["corner"][1:]))
+
+        geo.set_location(post, "bogus", "38.1", "-78.4")
+        self.assertEqual((post.pickup_spot, post.latitude, post.longitude), ("", 38.1, -78.4))
+
+        geo.set_location(post)
+        self.assertEqual((post.latitude, post.geohash), (None, ""))
+
+    def test_feed_lists_nearby_posts_nearest_first(self):
+        def at(spot, title):
+            post = Post(user=self.seller, title=title, price=1, description="", category="other")
+            geo.set_location(post, spot)
+            post.save()
+            return post
+
+        corner = at("corner", "Near the Corner")
+        rotunda = at("rotunda", "At the Rotunda")
+        barracks = at("barracks", "At Barracks")
+        make_post(self.seller, "No pickup spot")
+
+        self.client.force_login(make_user("buyer"))
+        response = self.client.get(reverse("dashboard"), {"near": "rotunda", "radius": "1"})
+        self.assertEqual(response.context["posts"], [rotunda, corner])
+        response = self.client.get(reverse("dashboard"), {"near": "rotunda", "radius": "5"})
+        self.assertEqual(response.context["posts"], [rotunda, corner, barracks])
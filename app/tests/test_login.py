@@ -0,0 +1,87 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from app.login import google_names, run_login_pipeline, split_full_name
+
+from .utils import make_user
+
+User = get_user_model()
+
+MODERATORS = frozenset({"mod@example.com"})
+
+
+@override_settings(MODERATOR_EMAILS=MODERATORS)
+class LoginPipelineTests(TestCase):
+    def login(self, user, path="/"):
+        run_login_pipeline(RequestFactory().get(path), user)
+        user.refresh_from_db()
+        user.profile.refresh_from_db()
+        return user
+
+    def test_staff_status_follows_moderator_emails(self):
+        mod = self.login(make_user("mod"))
+        self.assertTrue(mod.is_staff)
+
+        former = make_user("former")
+        User.objects.filter(pk=former.pk).update(is_staff=True)
+        self.assertFalse(self.login(former).is_staff)
+
+    def test_superusers_keep_staff(self):
+        root = User.objects.create_superuser("root", "root@example.com", "pw")
+        self.assertTrue(self.login(root).is_staff)
+
+    def test_admin_site_logins_leave_staff_alone(self):
+        admin = make_user("admin")
+        User.objects.filter(pk=admin.pk).update(is_staff=True)
+        response = self.client.post(reverse("admin:login"), {"username": "admin", "password": "pw"})
+        self.assertEqual(response.status_code, 302)
+        admin.refresh_from_db()
+        self.assertTrue(admin.is_staff)
+        self.assertIsNotNone(admin.last_login)
+
+    def test_google_names_fill_blank_names_only(self):
+        user = make_user("student")
+        SocialAccount.objects.create(
+            user=user, provider="google", uid="1", extra_data={"given_name": "Ada", "family_name": "Lovelace"},
+        )
+        self.login(user)
+        self.assertEqual((user.first_name, user.last_name), ("Ada", "Lovelace"))
+
+        User.objects.filter(pk=user.pk).update(first_name="Augusta")
+        self.login(user)
+        self.assertEqual((user.first_name, user.last_name), ("Augusta", "Lovelace"))
+
+    def test_organizer_role_needs_staff(self):
+        member = self.login(make_user("member"), "/?role=organizer")
+        self.assertEqual(member.profile.role, "member")
+        mod = self.login(make_user("mod"), "/?role=organizer")
+        self.assertEqual(mod.profile.role, "organizer")
+        self.assertEqual(self.login(mod).profile.role, "member")
+
+    def test_one_read_and_one_write_per_login(self):
+        user = make_user("student")
+        self.login(user)
+        with self.assertNumQueries(2):
+            run_login_pipeline(RequestFactory().get("/"), user)
+        self.assertIsNotNone(User.objects.get(pk=user.pk).last_login)
+
+    def test_site_login_runs_the_pipeline(self):
+        mod = make_user("mod")
+        self.client.force_login(mod)
+        mod.refresh_from_db()
+        self.assertTrue(mod.is_staff)
+        self.assertIsNotNone(mod.last_login)
+
+
+class NameTests(TestCase):
+    def test_split_full_name(self):
+        self.assertEqual(split_full_name("  Grace Brewster Hopper "), ("Grace", "Brewster Hopper"))
+        self.assertEqual(split_full_name("Cher"), ("Cher", ""))
+        self.assertEqual(split_full_name(None), ("", ""))
+
+    def test_google_names_fall_back_to_the_full_name(self):
+        self.assertEqual(google_names({"given_name": " Ada "}), ("Ada", ""))
+        self.assertEqual(google_names({"name": "Ada Lovelace"}), ("Ada", "Lovelace"))
+        self.assertEqual(google_names(None), ("", ""))
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.archive import archive_expired, restore
+from app.models import ArchivedPost, ArchivedPostImage, PostImages, Profile
+
+from .utils import TempMediaMixin, image_bytes, make_post, make_user
+
+
+class StoredUrlTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("seller")
+
+    def test_image_rows_store_their_url(self):
+        image = make_post(self.user, images=[image_bytes()]).images.get()
+        self.assertEqual(image.url, default_storage.url(image.image.name))
+        self.assertEqual(PostImages.objects.get().url, image.url)
+
+    def test_url_moves_with_archive_and_restore(self):
+        post = make_post(self.user, images=[image_bytes()], expires_at=timezone.now() - timedelta(days=1))
+        url = post.images.get().url
+        archive_expired()
+        self.assertEqual(ArchivedPostImage.objects.get().url, url)
+        self.assertEqual(restore(ArchivedPost.objects.get()).images.get().url, url)
+
+    def test_avatar_url_follows_the_avatar(self):
+        profile = self.user.profile
+        profile.avatar.save("me.png", ContentFile(image_bytes()))
+        self.assertEqual(Profile.objects.get(pk=profile.pk).avatar_url, default_storage.url(profile.avatar.name))
+
+        profile.avatar = None
+        profile.save()
+        self.assertEqual(Profile.objects.get(pk=profile.pk).avatar_url, "")
+        self.assertEqual(profile.avatar_src, "")
+
+    def test_rows_without_a_stored_url_ask_the_storage(self):
+        image = make_post(self.user, images=[image_bytes()]).images.get()
+        PostImages.objects.update(url="")
+        self.assertEqual(PostImages.objects.get().src, default_storage.url(image.image.name))
+
+    def test_pages_do_not_build_urls_through_the_storage(self):
+        self.user.profile.avatar.save("me.png", ContentFile(image_bytes()))
+        make_post(self.user, images=[image_bytes(), image_bytes(color=(0, 0, 255))])
+        self.client.force_login(make_user("buyer"))
+        with mock.patch.object(FileSystemStorage, "url", autospec=True, side_effect=FileSystemStorage.url) as url:
+            response = self.client.get(reverse("dashboard"), {"sort": "new"})
+        self.assertContains(response, PostImages.objects.first().url)
+        media_calls = [c for c in url.call_args_list if c.args[0] is default_storage._wrapped]
+        self.assertEqual(media_calls, [])
+
+    def test_refresh_rewrites_only_stale_urls(self):
+        make_post(self.user, images=[image_bytes()])
+        self.user.profile.avatar.save("me.png", ContentFile(image_bytes()))
+
+        with override_settings(MEDIA_URL="https://cdn.example.com/media/"):
+            out = StringIO()
+            call_command("refresh_media_urls", stdout=out)
+            self.assertIn("PostImages.url: 1 updated", out.getvalue())
+            self.assertIn("Profile.avatar_url: 1 updated", out.getvalue())
+            self.assertTrue(PostImages.objects.get().url.startswith("https://cdn.example.com/media/posts/"))
+
+            call_command("refresh_media_urls", stdout=out)
+            self.assertIn("PostImages.url: 0 updated", out.getvalue().split("Done")[1])
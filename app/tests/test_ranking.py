@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from app.ranking import get_ranked, rank_users
+
+from .utils import make_post, make_user, use_shared_cache
+
+
+class RankUsersTests(TestCase):
+    def test_interests_outrank_recency_ties_and_hidden_posts_are_dropped(self):
+        now = 1_000_000
+        candidates = [(1, "books", now), (2, "kitchen", now), (3, "kitchen", now - 10), (4, "books", now)]
+        rankings = rank_users([7], candidates, {7: ["food"]}, {}, {7: {4}}, now=now)
+        self.assertEqual(rankings[7][:2], [2, 3])
+        self.assertNotIn(4, rankings[7])
+
+
+class RankFeedsCommandTests(TestCase):
+    def test_refuses_to_run_with_a_per_process_cache(self):
+        with self.assertRaisesMessage(CommandError, "shared cache"):
+            call_command("rank_feeds", stdout=StringIO())
+
+    def test_rankings_reach_the_dashboard(self):
+        use_shared_cache(self)
+        viewer = make_user("viewer", sustainability_interests=["food"])
+        seller = make_user("seller")
+        lamp = make_post(seller, category="other")
+        pan = make_post(seller, title="Pan", category="kitchen")
+        self.client.force_login(viewer)
+
+        call_command("rank_feeds", stdout=StringIO())
+        self.assertEqual(get_ranked(viewer.pk)["ids"], [pan.pk, lamp.pk])
+        response = self.client.get(reverse("dashboard"))
+        self.assertTrue(response.context["ranked"])
+        self.assertEqual([p.pk for p in response.context["posts"]], [pan.pk, lamp.pk])
@@ -0,0 +1,163 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from app.ratelimit import Policy, client_ip, hit, parse_rate, rate_limit
+
+NOW = 1_700_000_000_000
+
+
+def ok(request):
+    return HttpResponse("ok")
+
+
+async def async_ok(request):
+    return HttpResponse("ok")
+
+
+class GcraTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.policy = Policy("test", "20/m", burst=10)
+
+    def take(self, count, now=NOW, ident="u1"):
+        return [hit(self.policy, ident, now_ms=now) for _ in range(count)]
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("20/m"), (20, 60))
+        self.assertEqual(parse_rate("100/5m"), (100, 300))
+        self.assertEqual(parse_rate("1/d"), (1, 86400))
+
+    def test_burst_then_refuse_with_retry_after(self):
+        self.assertEqual(self.take(10), [(True, 0)] * 10)
+        # One token every 3 s: the next one is 3 s away.
+        self.assertEqual(hit(self.policy, "u1", now_ms=NOW), (False, 3))
+        self.assertEqual(hit(self.policy, "u1", now_ms=NOW + 1000), (False, 2))
+
+    def test_refused_requests_do_not_spend_tokens(self):
+        self.take(10)
+        self.take(50)
+        self.assertEqual(hit(self.policy, "u1", now_ms=NOW + 3000), (True, 0))
+        self.assertFalse(hit(self.policy, "u1", now_ms=NOW + 3000)[0])
+
+    def test_idle_bucket_refills_to_burst_and_no_further(self):
+        self.take(10)
+        later = NOW + 60 * 60 * 1000
+        self.assertEqual(self.take(10, now=later), [(True, 0)] * 10)
+        self.assertFalse(hit(self.policy, "u1", now_ms=later)[0])
+
+    def test_concurrent_hits_after_idle_spend_one_token_each(self):
+        self.take(10)
+        later = NOW + 50 * 60 * 1000
+        real_get = cache.get
+        racing = []
+
+        def get_then_race(key, *args, **kwargs):
+            value = real_get(key, *args, **kwargs)
+            if not racing:
+                # A double-submitted form: the second request reads the
+                # bucket and writes before the first one gets to write.
+                racing.append(None)
+                racing[0] = hit(self.policy, "u1", now_ms=later)
+            return value
+
+        with mock.patch.object(cache, "get", side_effect=get_then_race):
+            self.assertEqual(hit(self.policy, "u1", now_ms=later), (True, 0))
+        self.assertEqual(racing, [(True, 0)])
+        self.assertEqual(self.take(8, now=later), [(True, 0)] * 8)
+        self.assertEqual(hit(self.policy, "u1", now_ms=later), (False, 3))
+
+    def test_contended_bucket_refuses_rather_than_overspends(self):
+        with mock.patch.object(cache, "add", return_value=False):
+            self.assertEqual(hit(self.policy, "u1", now_ms=NOW), (False, 1))
+        self.assertIsNone(cache.get("rl:test:u1"))
+
+    def test_buckets_are_per_identity(self):
+        self.take(10)
+        self.assertFalse(hit(self.policy, "u1", now_ms=NOW)[0])
+        self.assertTrue(hit(self.policy, "u2", now_ms=NOW)[0])
+
+    def test_settings_override_rate_and_burst(self):
+        with override_settings(RATE_LIMITS={"test": {"rate": "2/m", "burst": 2}}):
+            self.assertEqual(self.take(2), [(True, 0)] * 2)
+            self.assertEqual(hit(self.policy, "u1", now_ms=NOW), (False, 30))
+
+    def test_burst_defaults_to_rate_count(self):
+        self.policy = Policy("test", "3/m")
+        self.assertEqual([allowed for allowed, _ in self.take(4)], [True, True, True, False])
+
+
+class ClientIpTests(SimpleTestCase):
+    def request(self, forwarded=None):
+        extra = {"HTTP_X_FORWARDED_FOR": forwarded} if forwarded else {}
+        return RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", **extra)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        self.assertEqual(client_ip(self.request("1.2.3.4")), "10.0.0.1")
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=1)
+    def test_takes_the_hop_added_by_the_trusted_proxy(self):
+        self.assertEqual(client_ip(self.request("6.6.6.6, 1.2.3.4")), "1.2.3.4")
+        self.assertEqual(client_ip(self.request()), "10.0.0.1")
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=2)
+    def test_short_forwarded_chain_falls_back_to_remote_addr(self):
+        self.assertEqual(client_ip(self.request("1.2.3.4")), "10.0.0.1")
+
+
+class RateLimitDecoratorTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = RequestFactory()
+
+    def post(self, view, ip="10.0.0.1", user=None):
+        request = self.factory.post("/", REMOTE_ADDR=ip)
+        request.user = user or AnonymousUser()
+        return view(request)
+
+    def test_exhausted_bucket_answers_429_with_retry_after(self):
+        view = rate_limit("t", "2/h")(ok)
+        self.assertEqual([self.post(view).status_code for _ in range(2)], [200, 200])
+        response = self.post(view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1800")
+
+    def test_only_listed_methods_are_limited(self):
+        view = rate_limit("t", "1/h")(ok)
+        request = self.factory.get("/")
+        request.user = AnonymousUser()
+        self.assertEqual([view(request).status_code for _ in range(3)], [200] * 3)
+
+        view = rate_limit("t_all", "1/h", methods=None)(ok)
+        self.assertEqual([view(request).status_code for _ in range(2)], [200, 429])
+
+    def test_stacked_policies_share_one_check(self):
+        view = rate_limit("t_user", "5/h")(rate_limit("t_ip", "2/h", key="ip")(ok))
+        self.assertEqual(len(view.rate_limits), 2)
+        self.assertIs(view._rate_limited_view, ok)
+        self.assertEqual([self.post(view).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(self.post(view, ip="10.0.0.2").status_code, 200)
+
+    def test_anonymous_users_are_keyed_by_ip(self):
+        view = rate_limit("t", "1/h")(ok)
+        self.assertEqual(self.post(view, ip="10.0.0.1").status_code, 200)
+        self.assertEqual(self.post(view, ip="10.0.0.2").status_code, 200)
+        self.assertEqual(self.post(view, ip="10.0.0.1").status_code, 429)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_disabled_setting_lets_everything_through(self):
+        view = rate_limit("t", "1/h")(ok)
+        self.assertEqual([self.post(view).status_code for _ in range(3)], [200] * 3)
+
+    def test_async_views_are_limited_too(self):
+        view = rate_limit("t", "1/h")(async_ok)
+        request = self.factory.post("/")
+        request.user = AnonymousUser()
+        statuses = [async_to_sync(view)(request).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 429])
@@ -0,0 +1,156 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app import rollups
+from app.account_deletion import claim_next_job, process_job
+from app.archive import archive_expired
+from app.models import AccountDeletionJob, DailyActivity, Post, PostFlag, SiteCounter
+from messaging.archive import compact, compact_cutoff
+from messaging.models import Message, MessageFlag, Thread
+
+from .utils import TempMediaMixin, make_post, make_user
+
+
+class CounterTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+        self.thread, _ = Thread.for_users(self.seller, self.buyer)
+        rollups.reconcile()
+
+    def assertCountersExact(self):
+        self.assertEqual(rollups.read(), rollups.exact_counts())
+
+    def test_first_read_counts_from_scratch(self):
+        SiteCounter.objects.all().delete()
+        make_post(self.seller)
+        self.assertEqual(rollups.read()[rollups.POSTS], 1)
+        self.assertEqual(SiteCounter.objects.count(), len(rollups.COUNTERS))
+
+    def test_signals_keep_counters_exact(self):
+        post = make_post(self.seller)
+        message = Message.objects.create(thread=self.thread, sender=self.buyer, text="Still available?")
+        PostFlag.objects.create(post=post, flagged_by=self.buyer, reason="Spam")
+        MessageFlag.objects.create(message=message, flagged_by=self.seller, reason="Rude")
+        self.buyer.profile.status = rollups.SUSPENDED_STATUS
+        self.buyer.profile.save()
+        self.assertEqual(rollups.read(), {
+            rollups.USERS: 2, rollups.SUSPENDED: 1, rollups.POSTS: 1,
+            rollups.ARCHIVED_POSTS: 0, rollups.MESSAGES: 1, rollups.OPEN_FLAGS: 2,
+        })
+
+        self.buyer.profile.status = "Member"
+        self.buyer.profile.save()
+        message.delete()
+        post.delete()
+        self.assertCountersExact()
+
+    @override_settings(MODERATOR_EMAILS=frozenset({"moderator@example.com"}))
+    def test_resolving_flags_moves_the_counter(self):
+        post = make_post(self.seller)
+        PostFlag.objects.create(post=post, flagged_by=self.buyer, reason="Spam")
+        flag = PostFlag.objects.create(post=post, flagged_by=make_user("third"), reason="Spam")
+
+        self.client.force_login(make_user("moderator"))
+        self.client.get(reverse("admin_resolve_flag", args=[flag.pk]))
+        self.assertEqual(rollups.read()[rollups.OPEN_FLAGS], 0)
+        self.assertCountersExact()
+
+    def test_bulk_jobs_keep_counters_exact(self):
+        make_post(self.seller, expires_at=timezone.now() - timedelta(days=1))
+        make_post(self.seller)
+        cutoff = compact_cutoff(timedelta(days=180))
+        message = Message.objects.create(thread=self.thread, sender=self.buyer, text="Old news")
+        Message.objects.filter(pk=message.pk).update(created_at=cutoff - timedelta(days=1))
+
+        archive_expired()
+        compact(cutoff)
+        self.assertEqual(rollups.read()[rollups.MESSAGES], 1)
+        self.assertCountersExact()
+
+        AccountDeletionJob.objects.create(user_id=self.seller.pk)
+        self.assertTrue(process_job(claim_next_job()))
+        self.assertCountersExact()
+
+    def test_reconcile_repairs_drift(self):
+        make_post(self.seller)
+        SiteCounter.objects.filter(name=rollups.POSTS).update(value=99)
+        self.assertEqual(rollups.reconcile()[rollups.POSTS], 1)
+        self.assertCountersExact()
+
+    @override_settings(MODERATOR_EMAILS=frozenset({"moderator@example.com"}))
+    def test_admin_panel_shows_the_counters(self):
+        make_post(self.seller)
+        SiteCounter.objects.filter(name=rollups.POSTS).update(value=42)
+        self.client.force_login(make_user("moderator"))
+        response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.context["total_posts"], 42)
+
+
+class DailyActivityTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+        self.thread, _ = Thread.for_users(self.seller, self.buyer)
+
+    def at(self, days_ago, hour=12):
+        day = self.today - timedelta(days=days_ago)
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def message(self, when):
+        message = Message.objects.create(thread=self.thread, sender=self.buyer, text="Hi")
+        Message.objects.filter(pk=message.pk).update(created_at=when)
+
+    def post(self, when, **fields):
+        post = make_post(self.seller, **fields)
+        Post.objects.filter(pk=post.pk).update(created_at=when)
+
+    def test_rollup_counts_each_day_including_archived_rows(self):
+        self.post(self.at(3))
+        self.post(self.at(3), expires_at=self.at(1))
+        self.post(self.at(2))
+        self.message(self.at(2, hour=0))
+        self.message(self.at(2, hour=23))
+        archive_expired()
+        compact(timezone.now() + timedelta(days=1))
+        self.assertFalse(Message.objects.exists())
+
+        self.assertEqual(rollups.rollup_days(self.today - timedelta(days=3), self.today - timedelta(days=1)), 3)
+        rows = {
+            (self.today - row.day).days: (row.posts, row.messages)
+            for row in DailyActivity.objects.all()
+        }
+        self.assertEqual(rows, {3: (2, 0), 2: (1, 2), 1: (0, 0)})
+
+    def test_rerunning_a_day_overwrites_it(self):
+        day = self.today - timedelta(days=1)
+        self.message(self.at(1))
+        rollups.rollup_days(day, day)
+        self.message(self.at(1))
+        rollups.rollup_days(day, day)
+        self.assertEqual(DailyActivity.objects.get(day=day).messages, 2)
+
+    def test_trends_fill_missing_days_with_zero(self):
+        end = self.today - timedelta(days=1)
+        DailyActivity.objects.create(day=end, posts=3, messages=1)
+        DailyActivity.objects.create(day=end - timedelta(days=2), posts=2)
+        trends = {t["metric"]: t for t in rollups.trends(days=7)}
+        self.assertEqual(list(trends), list(rollups.METRICS))
+        self.assertEqual((trends["posts"]["total"], trends["posts"]["last"]), (5, 3))
+        self.assertEqual(trends["new_users"]["total"], 0)
+        self.assertEqual(len(trends["posts"]["points"].split()), 7)
+
+    def test_command_rolls_up_and_reconciles(self):
+        self.message(self.at(1))
+        out = StringIO()
+        call_command("rollup_activity", stdout=out)
+        self.assertEqual(DailyActivity.objects.get(day=self.today - timedelta(days=1)).messages, 1)
+        self.assertIn("messages=1", out.getvalue())
+        self.assertEqual(SiteCounter.objects.count(), len(rollups.COUNTERS))
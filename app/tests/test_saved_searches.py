@@ -0,0 +1,111 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from app import saved_searches
+from app.audiences import save_audience
+from app.models import Post, SavedSearch, SavedSearchMatch
+from app.saved_searches import SavedSearchError, find_matches, index_term, match_post, save_search, title_terms
+
+from .utils import make_post, make_user
+
+
+class IndexTermTests(SimpleTestCase):
+    def test_a_title_containing_the_query_produces_its_term(self):
+        rng = random.Random(5)
+        alphabet = "abcdeorst xyz-"
+        for _ in range(2000):
+            title = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            start = rng.randint(0, len(title))
+            query = title[start:start + rng.randint(1, 12)].strip()
+            self.assertIn(index_term(query), title_terms(title.upper()), (query, title))
+
+    def test_short_and_empty_queries(self):
+        self.assertEqual(index_term(""), "")
+        self.assertEqual(index_term("TV"), "tv")
+        self.assertEqual(title_terms("ab"), {"", "a", "b", "ab"})
+
+    def test_rare_trigram_is_preferred(self):
+        self.assertEqual(index_term("TI-84 calculator"), "-84")
+
+
+class SavedSearchTests(TestCase):
+    def setUp(self):
+        self.seller = make_user("seller")
+        self.buyer = make_user("buyer")
+
+    def test_save_validates_and_deduplicates(self):
+        search, created = save_search(self.buyer, "  Desk lamp ", "furniture")
+        self.assertTrue(created)
+        self.assertEqual((search.query, search.term), ("Desk lamp", index_term("Desk lamp")))
+        self.assertEqual(save_search(self.buyer, "Desk lamp", "furniture"), (search, False))
+
+        with self.assertRaisesMessage(SavedSearchError, "Unknown category."):
+            save_search(self.buyer, "lamp", "boats")
+        with self.assertRaisesMessage(SavedSearchError, "Search for something or pick a category first."):
+            save_search(self.buyer, "   ", "")
+
+    def test_per_user_limit(self):
+        for n in range(saved_searches.MAX_PER_USER):
+            save_search(self.buyer, f"item {n}", "")
+        with self.assertRaisesMessage(SavedSearchError, f"up to {saved_searches.MAX_PER_USER}"):
+            save_search(self.buyer, "one more", "")
+
+    def test_matches_equal_a_full_scan(self):
+        rng = random.Random(11)
+        words = ["desk", "lamp", "mini", "fridge", "calc", "ti-84", "chair", "bike", "tv", "a"]
+        categories = [""] + [key for key, _ in Post.CATEGORIES]
+        users = [make_user(f"user{n}") for n in range(5)]
+        for _ in range(120):
+            query = " ".join(rng.sample(words, rng.randint(0, 2)))
+            try:
+                save_search(rng.choice(users), query, rng.choice(categories))
+            except SavedSearchError:
+                pass  # Nothing to search for, or that user is at the limit.
+        searches = list(SavedSearch.objects.all())
+        for n in range(30):
+            post = make_post(rng.choice(users + [self.seller]), " ".join(rng.sample(words, 3)).title(),
+                             category=rng.choice(categories[1:]))
+            expected = sorted(
+                s.pk for s in searches
+                if s.user_id != post.user_id
+                and s.category in ("", post.category)
+                and s.query.lower() in post.title.lower()
+            )
+            self.assertEqual(sorted(find_matches(post)), expected, post.title)
+
+    def test_match_post_skips_the_author_and_hidden_users(self):
+        wanted = save_search(self.buyer, "lamp", "")[0]
+        save_search(self.seller, "lamp", "")
+        roommate = make_user("roommate")
+        save_search(roommate, "lamp", "")
+        post = make_post(self.seller, "Desk LAMP")
+        post.hidden_audiences.add(save_audience(self.seller, "Roommates", "roommate"))
+
+        self.assertEqual(match_post(post), 1)
+        self.assertEqual(list(SavedSearchMatch.objects.values_list("search_id", "post_id")), [(wanted.pk, post.pk)])
+
+    def test_new_post_shows_up_once_on_the_saved_searches_page(self):
+        self.client.force_login(self.buyer)
+        self.client.post(reverse("save_search"), {"q": "lamp", "category": ""})
+
+        self.client.force_login(self.seller)
+        self.client.post(reverse("newpost"), {"title": "Desk lamp", "price": "5", "description": "", "category": "other"})
+
+        self.client.force_login(self.buyer)
+        first = self.client.get(reverse("saved_searches"))
+        [search] = first.context["searches"]
+        self.assertEqual([m.post.title for m in search.new_matches], ["Desk lamp"])
+        second = self.client.get(reverse("saved_searches"))
+        self.assertEqual(second.context["searches"][0].new_matches, [])
+
+    def test_only_the_owner_can_delete(self):
+        search = save_search(self.buyer, "lamp", "")[0]
+        self.client.force_login(self.seller)
+        self.client.post(reverse("delete_saved_search", args=[search.pk]))
+        self.assertTrue(SavedSearch.objects.filter(pk=search.pk).exists())
+
+        self.client.force_login(self.buyer)
+        self.client.post(reverse("delete_saved_search", args=[search.pk]))
+        self.assertFalse(SavedSearch.objects.exists())
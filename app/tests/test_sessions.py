@@ -0,0 +1,55 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .utils import make_user
+
+
+def session_queries(captured):
+    return [q["sql"] for q in captured if "django_session" in q["sql"]]
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(make_user("buyer"))
+
+    def test_flash_messages_do_not_write_the_session(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("save_search"), {"q": "lamp", "category": ""})
+        self.assertIn("messages", response.cookies)
+        writes = [sql for sql in session_queries(captured) if not sql.startswith("SELECT")]
+        self.assertEqual(writes, [])
+
+        page = self.client.get(response["Location"])
+        self.assertEqual([str(m) for m in page.context["messages"]], ["Search saved. New posts that match will show up here."])
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+    def test_cached_sessions_skip_the_table_once_cached(self):
+        self.client.force_login(make_user("seller"))
+        self.client.get(reverse("myposts"))
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse("myposts"))
+        self.assertEqual(session_queries(captured), [])
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(reverse("myposts")).status_code, 200)
+        self.assertEqual(len(session_queries(captured)), 1)
+
+    def test_bench_reports_every_profile(self):
+        out = StringIO()
+        call_command("bench_sessions", "--iterations", "2", stdout=out)
+        rows = {}
+        for line in out.getvalue().splitlines()[1:]:
+            label, per_request, _, _ = line.rsplit(maxsplit=3)
+            rows[" ".join(label.split())] = float(per_request)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows["cached sessions, cookie messages page view"], 0)
+        self.assertEqual(rows["cached sessions, cookie messages flash message"], 0)
+        self.assertGreater(rows["db sessions, session messages flash message"], 1)
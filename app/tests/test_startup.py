@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from app.management.commands.profile_startup import DEFAULT_FORBIDDEN
+
+CHECK = f"""\
+import json, sys
+import app.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+{{after}}
+print(json.dumps([m for m in {DEFAULT_FORBIDDEN!r} if m in sys.modules]))
+"""
+
+# The dev settings keep media on the filesystem, so boto3 could never show up
+# there; boot with the storage and upload backend prod.py configures.
+PROD_STORAGE_SETTINGS = """\
+from app.settings.dev import *
+
+STORAGES = {
+    **STORAGES,
+    "default": {
+        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        "OPTIONS": {"bucket_name": "startup-check", "location": "media"},
+    },
+}
+UPLOAD_BACKEND = "app.uploads.S3UploadBackend"
+"""
+
+
+class ColdStartTests(SimpleTestCase):
+    """
+    Import the WSGI application and URLconf in a fresh interpreter, as a
+    worker boots. The time budget is checked by ``profile_startup --max-ms``,
+    outside the test suite.
+    """
+
+    def boot(self, after=""):
+        with tempfile.TemporaryDirectory() as path:
+            Path(path, "startup_settings.py").write_text(PROD_STORAGE_SETTINGS)
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "startup_settings",
+                "PYTHONPATH": os.pathsep.join([path, str(settings.BASE_DIR)]),
+            }
+            proc = subprocess.run(
+                [sys.executable, "-c", CHECK.format(after=after)],
+                capture_output=True,
+                text=True,
+                cwd=settings.BASE_DIR,
+                env=env,
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def test_heavy_modules_load_on_first_use(self):
+        self.assertEqual(self.boot(), [])
+
+    def test_first_use_of_the_media_storage_loads_boto3(self):
+        loaded = self.boot("from django.core.files.storage import default_storage; default_storage._setup()")
+        self.assertIn("boto3", loaded)
@@ -0,0 +1,105 @@
+import json
+import re
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from app.management.commands.asset_budget import asset_path, inline_bytes
+from app.middleware import HybridWhiteNoiseMiddleware
+from app.models import Post
+
+TEMPLATES = sorted((Path(settings.BASE_DIR) / "templates").rglob("*.html"))
+STATIC_RE = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+
+
+class TemplateAssetTests(SimpleTestCase):
+    def test_templates_link_bundles_instead_of_inlining(self):
+        for path in TEMPLATES:
+            self.assertEqual(inline_bytes(path.read_text()), 0, path)
+
+    def test_every_linked_asset_exists(self):
+        for path in TEMPLATES:
+            for name in STATIC_RE.findall(path.read_text()):
+                self.assertTrue(finders.find(name), f"{path}: {name}")
+
+    def test_inline_bytes_ignores_external_scripts(self):
+        source = '<style>a{}</style><script src="x.js"></script><script type="module">go()</script>'
+        self.assertEqual(inline_bytes(source), len("a{}go()"))
+
+
+class AssetBudgetTests(TestCase):
+    def budget(self, *args):
+        out = StringIO()
+        call_command("asset_budget", *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_rendered_pages_and_their_bundles(self):
+        with tempfile.TemporaryDirectory() as path:
+            report = Path(path, "pages.json")
+            output = self.budget("--save", str(report))
+            pages = json.loads(report.read_text())
+
+            self.assertIn("css/dashboard.css", pages["dashboard"]["linked"])
+            dashboard = pages["dashboard"]
+            self.assertEqual(dashboard["total"], dashboard["html"] + dashboard["assets"])
+            self.assertGreater(dashboard["html"], len((Path(settings.BASE_DIR) / "templates/dashboard.html").read_bytes()))
+            self.assertRegex(output, r"\ndashboard\s+%d\s" % dashboard["html"])
+            self.assertRegex(output, r"css/dashboard\.css\s+\d+\s+\d+")
+            self.assertFalse(Post.objects.exists())
+
+            self.assertRegex(self.budget("--compare", str(report)), r"\ndashboard .* %d\s+0\n" % dashboard["total"])
+
+    def test_fails_over_budget_or_on_a_missing_bundle(self):
+        with self.assertRaisesMessage(CommandError, "over the 100 byte budget"):
+            self.budget("--budget", "100")
+        def without_base_css(name):
+            return None if name == "css/base.css" else asset_path(name)
+
+        with mock.patch("app.management.commands.asset_budget.asset_path", side_effect=without_base_css):
+            with self.assertRaisesMessage(CommandError, "Linked static files not found: css/base.css"):
+                self.budget()
+
+
+class CollectedStaticTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root, ignore_errors=True)
+        collected = override_settings(STATIC_ROOT=cls.static_root, STORAGES={
+            **settings.STORAGES,
+            "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+        })
+        collected.enable()
+        cls.addClassCleanup(collected.disable)
+        call_command("collectstatic", "--noinput", verbosity=0)
+
+    def test_bundles_get_hashed_compressed_names(self):
+        url = staticfiles_storage.url("css/dashboard.css")
+        self.assertRegex(url, r"^/static/css/dashboard\.[0-9a-f]{12}\.css$")
+        self.assertTrue(Path(self.static_root, url.removeprefix("/static/") + ".gz").exists())
+
+    def test_async_middleware_serves_bundles_with_a_long_cache(self):
+        async def app(request):
+            return HttpResponse("page")
+
+        middleware = HybridWhiteNoiseMiddleware(app)
+        self.assertTrue(iscoroutinefunction(middleware))
+        serve = async_to_sync(middleware)
+
+        url = staticfiles_storage.url("css/dashboard.css")
+        response = serve(RequestFactory().get(url, HTTP_ACCEPT_ENCODING="gzip"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(serve(RequestFactory().get("/dashboard/")).content, b"page")
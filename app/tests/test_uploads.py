@@ -0,0 +1,100 @@
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from app.models import StoredBlob
+from app.uploads import UploadError, claim_post_blobs, claim_uploads, issue_upload, store_post_image
+
+from .utils import TempMediaMixin, image_bytes, make_user
+
+
+class DirectUploadTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("uploader")
+
+    def upload(self, body, purpose="avatar", content_type="image/png", **kwargs):
+        policy = issue_upload(self.user, purpose, content_type, len(body), **kwargs)
+        if "url" in policy:
+            response = self.client.generic("PUT", policy["url"], body, content_type=content_type)
+            self.assertEqual(response.status_code, 200, response.content)
+        return policy["token"]
+
+    def test_storage_name_extension_follows_content_type(self):
+        token = self.upload(image_bytes("JPEG"), content_type="image/jpeg")
+        [name] = claim_uploads(self.user, [token], "avatar")
+        self.assertRegex(name, r"^avatars/[0-9a-f]{32}\.jpg$")
+
+    def test_rejects_content_types_that_are_not_images(self):
+        with self.assertRaises(UploadError):
+            issue_upload(self.user, "avatar", "text/html", 100)
+
+    def test_bytes_that_are_not_the_declared_image_are_deleted_at_claim(self):
+        token = self.upload(b"<script>alert(1)</script>", content_type="image/png")
+        self.assertEqual(claim_uploads(self.user, [token], "avatar"), [])
+        self.assertEqual(default_storage.listdir("avatars")[1], [])
+
+    def test_image_of_another_type_than_declared_is_rejected(self):
+        token = self.upload(image_bytes("GIF"), content_type="image/png")
+        self.assertEqual(claim_uploads(self.user, [token], "avatar"), [])
+
+    def test_tokens_of_other_users_and_purposes_are_skipped(self):
+        token = self.upload(image_bytes())
+        other = make_user("other")
+        self.assertEqual(claim_uploads(other, [token], "avatar"), [])
+        self.assertEqual(claim_uploads(self.user, [token], "post"), [])
+        self.assertEqual(claim_uploads(self.user, ["forged"], "avatar"), [])
+
+    def test_tokens_are_single_use(self):
+        token = self.upload(image_bytes(), purpose="post")
+        [blob] = claim_post_blobs(self.user, [token])
+        self.assertEqual(claim_post_blobs(self.user, [token]), [])
+        self.assertEqual(claim_post_blobs(self.user, [token, token]), [])
+
+    def test_avatar_token_replay_is_rejected(self):
+        token = self.upload(image_bytes())
+        self.assertEqual(len(claim_uploads(self.user, [token], "avatar")), 1)
+        self.assertEqual(claim_uploads(self.user, [token], "avatar"), [])
+
+    def test_known_hash_without_the_bytes_gets_nothing(self):
+        body = image_bytes()
+        [blob] = claim_post_blobs(self.user, [self.upload(body, purpose="post")])
+        sha256 = hashlib.sha256(body).hexdigest()
+
+        thief = make_user("thief")
+        policy = issue_upload(thief, "post", "image/png", len(body), sha256=sha256)
+        self.assertIn("url", policy)
+        self.assertNotIn("existing", policy)
+        self.assertEqual(claim_post_blobs(thief, [policy["token"]]), [])
+        self.assertEqual(StoredBlob.objects.get().refcount, 0)
+
+    def test_uploading_known_content_reuses_the_blob(self):
+        body = image_bytes()
+        sha256 = hashlib.sha256(body).hexdigest()
+        [first] = claim_post_blobs(self.user, [self.upload(body, purpose="post", sha256=sha256)])
+        [second] = claim_post_blobs(self.user, [self.upload(body, purpose="post", sha256=sha256)])
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(default_storage.listdir("posts")[1], [first.name.rsplit("/", 1)[-1]])
+
+    def test_body_must_match_the_declared_hash(self):
+        policy = issue_upload(self.user, "post", "image/png", 100, sha256="0" * 64)
+        response = self.client.generic("PUT", policy["url"], image_bytes(), content_type="image/png")
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_upload_becomes_a_blob(self):
+        body = image_bytes()
+        token = self.upload(body, purpose="post")
+        [blob] = claim_post_blobs(self.user, [token])
+        self.assertEqual(blob.size, len(body))
+        self.assertTrue(default_storage.exists(blob.name))
+
+
+class MultipartUploadTests(TempMediaMixin, TestCase):
+    def test_extension_follows_decoded_format_not_filename(self):
+        blob = store_post_image(SimpleUploadedFile("photo.html", image_bytes("PNG"), "text/html"))
+        self.assertTrue(blob.name.endswith(".png"))
+
+    def test_non_images_are_not_stored(self):
+        self.assertIsNone(store_post_image(SimpleUploadedFile("x.png", b"<html></html>", "image/png")))
@@ -0,0 +1,81 @@
+"""Helpers shared by the app's test modules."""
+import importlib
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import clear_url_caches
+
+from app.blobs import add_images
+from app.imaging import pil_image
+from app.models import Post
+from app.uploads import store_post_image
+
+User = get_user_model()
+
+
+def image_bytes(fmt="PNG", color=(200, 30, 30), size=(8, 8)) -> bytes:
+    buf = BytesIO()
+    pil_image().new("RGB", size, color).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def make_user(username, **profile):
+    """A user whose profile has finished onboarding, plus any profile fields given."""
+    user = User.objects.create_user(username, f"{username}@example.com", "pw")
+    profile.setdefault("onboarding_complete", True)
+    for field, value in profile.items():
+        setattr(user.profile, field, value)
+    user.profile.save()
+    return user
+
+
+def make_post(user, title="Desk lamp", category="other", images=(), **fields):
+    """A post by ``user``; ``images`` are image bytes stored as its blobs."""
+    fields.setdefault("price", 10)
+    fields.setdefault("description", "")
+    post = Post.objects.create(user=user, title=title, category=category, **fields)
+    add_images(post, [store_post_image(SimpleUploadedFile("photo.png", body)) for body in images])
+    return post
+
+
+def use_shared_cache(test):
+    """Give ``test`` a file-based cache, which counts as shared between processes."""
+    location = tempfile.TemporaryDirectory()
+    test.addCleanup(location.cleanup)
+    shared = override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location.name},
+    })
+    shared.enable()
+    test.addCleanup(shared.disable)
+
+
+class TempMediaMixin:
+    """Point MEDIA_ROOT at a fresh directory for each test."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+def serve_async_views(test):
+    """Route the hot views to their ``ASYNC_VIEWS`` versions until ``test`` ends."""
+    import app.urls
+    import messaging.urls
+
+    def route(enabled):
+        with override_settings(ASYNC_VIEWS=enabled):
+            importlib.reload(messaging.urls)
+            importlib.reload(app.urls)
+        clear_url_caches()
+
+    route(True)
+    test.addCleanup(route, settings.ASYNC_VIEWS)
@@ -0,0 +1,331 @@
+"""
+Direct-to-storage uploads for post images and avatars.
+
+The browser asks ``upload_policy`` for a presigned target, PUTs the file
+straight to storage and then submits only the signed upload token with the
+form. Views turn those tokens back into storage names with ``claim_uploads``,
+so image bytes never pass through the web worker.
+"""
+import base64
+import uuid
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .blobs import hash_chunks, hash_stored, is_sha256, register, store_file
+from .imaging import pil_image
+from .models import ClaimedUpload, StoredBlob
+
+UPLOAD_PREFIXES = {
+    "post": "posts/",
+    "avatar": "avatars/",
+}
+
+# Allowed content types, with the Pillow format the bytes must decode as and
+# the extension the stored object gets. The client's filename plays no part:
+# storage and CDNs pick the served type from the extension.
+IMAGE_TYPES = {
+    "image/jpeg": ("JPEG", ".jpg"),
+    "image/png": ("PNG", ".png"),
+    "image/gif": ("GIF", ".gif"),
+    "image/webp": ("WEBP", ".webp"),
+    "image/avif": ("AVIF", ".avif"),
+    "image/heic": ("HEIF", ".heic"),
+    "image/heif": ("HEIF", ".heif"),
+}
+ALLOWED_CONTENT_TYPES = set(IMAGE_TYPES)
+FORMAT_EXTENSIONS = {fmt: ext for fmt, ext in IMAGE_TYPES.values()}
+# Phone cameras write multi-picture JPEGs, which Pillow reports separately.
+FORMAT_ALIASES = {"MPO": "JPEG"}
+
+TOKEN_SALT = "app.uploads"
+
+
+class UploadError(Exception):
+    """Raised when an upload request or token is not acceptable."""
+
+
+def max_upload_bytes() -> int:
+    return getattr(settings, "UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+
+
+def token_max_age() -> int:
+    return getattr(settings, "UPLOAD_TOKEN_MAX_AGE", 60 * 60)
+
+
+def _extension(content_type: str) -> str:
+    return IMAGE_TYPES[content_type][1]
+
+
+def new_storage_name(purpose: str, content_type: str) -> str:
+    return f"{UPLOAD_PREFIXES[purpose]}{uuid.uuid4().hex}{_extension(content_type)}"
+
+
+def image_format(fh) -> str | None:
+    """
+    The Pillow format of the image in ``fh`` ("JPEG", "PNG", ...), or None
+    if its bytes are not an image of an allowed type. Only the allowed
+    formats' decoders are tried.
+    """
+    Image = pil_image()
+    Image.init()
+    # Formats without a decoder here (HEIF without pillow-heif) can't match.
+    formats = sorted(fmt for fmt in {*FORMAT_EXTENSIONS, *FORMAT_ALIASES} if fmt in Image.OPEN)
+    try:
+        with Image.open(fh, formats=formats) as img:
+            fmt = img.format
+            img.verify()
+    except Exception:
+        return None
+    return FORMAT_ALIASES.get(fmt, fmt)
+
+
+class UploadBackend:
+    """
+    Issues upload targets. Subclasses return the URL, HTTP method and the
+    headers the client must send with the file body.
+    """
+
+    def target(self, name: str, token: str, content_type: str, size: int, sha256=None) -> dict:
+        raise NotImplementedError
+
+
+class LocalUploadBackend(UploadBackend):
+    """
+    Filesystem stand-in for the S3 flow: the "presigned URL" is our own
+    ``upload_local`` endpoint, authorised by the signed token in the path.
+    """
+
+    def target(self, name, token, content_type, size, sha256=None):
+        return {
+            "url": reverse("upload_local", args=[token]),
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+
+class S3UploadBackend(UploadBackend):
+    """
+    Presigned PUT straight into the bucket behind the default S3 storage.
+    boto3 is only touched through the storage's own client. With a content
+    hash, S3 itself rejects a body that does not match it.
+    """
+
+    def target(self, name, token, content_type, size, sha256=None):
+        from storages.utils import clean_name, safe_join
+
+        storage = default_storage
+        params = {
+            "Bucket": storage.bucket_name,
+            "Key": safe_join(storage.location, clean_name(name)),
+            "ContentType": content_type,
+        }
+        headers = {"Content-Type": content_type}
+
+        if sha256:
+            checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+            params["ChecksumSHA256"] = checksum
+            headers["x-amz-checksum-sha256"] = checksum
+
+        acl = getattr(storage, "default_acl", None)
+        if acl:
+            params["ACL"] = acl
+            headers["x-amz-acl"] = acl
+
+        cache_control = (getattr(storage, "object_parameters", None) or {}).get("CacheControl")
+        if cache_control:
+            params["CacheControl"] = cache_control
+            headers["Cache-Control"] = cache_control
+
+        url = storage.bucket.meta.client.generate_presigned_url(
+            "put_object",
+            Params=params,
+            ExpiresIn=token_max_age(),
+        )
+        return {"url": url, "method": "PUT", "headers": headers}
+
+
+@lru_cache(maxsize=1)
+def get_upload_backend() -> UploadBackend:
+    path = getattr(settings, "UPLOAD_BACKEND", "app.uploads.LocalUploadBackend")
+    return import_string(path)()
+
+
+def issue_upload(user, purpose: str, content_type: str, size, sha256=None) -> dict:
+    """
+    Validate an upload request and return the token plus the upload target.
+
+    Every upload sends its bytes, even when the content is already stored:
+    a hash alone proves nothing, since stored images' hashes are public.
+    A SHA-256 sent with a post image makes storage reject a body that does
+    not match it; the duplicate is dropped when the upload is claimed.
+    """
+    if purpose not in UPLOAD_PREFIXES:
+        raise UploadError("Unknown upload purpose.")
+
+    content_type = (content_type or "").lower()
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise UploadError("Only image uploads are allowed.")
+
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("File size is required.")
+    if size <= 0 or size > max_upload_bytes():
+        raise UploadError("File is too large.")
+
+    sha256 = (sha256 or "").lower()
+    if purpose != "post" or not is_sha256(sha256):
+        sha256 = None
+
+    name = new_storage_name(purpose, content_type)
+    data = {"i": uuid.uuid4().hex, "n": name, "u": user.id, "p": purpose, "t": content_type, "s": size}
+    if sha256:
+        data["h"] = sha256
+    token = signing.dumps(data, salt=TOKEN_SALT)
+
+    target = get_upload_backend().target(name, token, content_type, size, sha256=sha256)
+    return {"token": token, **target}
+
+
+def store_post_image(uploaded_file) -> StoredBlob | None:
+    """
+    Content-addressed store for a post image that came through the form
+    (the multipart fallback, e.g. HEIC files the browser cannot upload).
+    The extension follows the decoded format; None if it is not an image.
+    """
+    fmt = image_format(uploaded_file)
+    if fmt not in FORMAT_EXTENSIONS:
+        return None
+    uploaded_file.seek(0)
+    return store_file(uploaded_file, FORMAT_EXTENSIONS[fmt])
+
+
+def read_token(token: str) -> dict:
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=token_max_age())
+    except signing.BadSignature:
+        raise UploadError("Invalid or expired upload token.")
+
+
+def _stored_image_matches(name: str, content_type: str) -> bool:
+    with default_storage.open(name, "rb") as fh:
+        return image_format(fh) == IMAGE_TYPES[content_type][0]
+
+
+def _claimable(user, tokens, purpose: str):
+    """
+    Yield ``(token data, stored size)`` for tokens that belong to ``user`` and
+    ``purpose`` and whose object arrived in storage within the size limit and
+    decodes as the declared image type. Each token is claimed once; anything
+    else that arrived is deleted.
+    """
+    for token in tokens:
+        try:
+            data = read_token(token)
+        except UploadError:
+            continue
+
+        if data.get("u") != user.id or data.get("p") != purpose:
+            continue
+
+        name = data["n"]
+        try:
+            size = default_storage.size(name)
+        except Exception:
+            continue
+
+        if size > max_upload_bytes() or not _stored_image_matches(name, data["t"]):
+            default_storage.delete(name)
+            continue
+
+        if not _mark_claimed(data.get("i")):
+            continue
+
+        yield data, size
+
+
+def _mark_claimed(token_id) -> bool:
+    """Record a token as used; False if it already was (a replay)."""
+    if not token_id:
+        return False
+    try:
+        with transaction.atomic():
+            ClaimedUpload.objects.create(token_id=token_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def claim_uploads(user, tokens, purpose: str) -> list:
+    """
+    Turn submitted upload tokens into storage names that can be assigned
+    to an ImageField. Tokens for another user or purpose, expired or already
+    claimed tokens, objects that never arrived in storage and objects that
+    are not the declared image type are skipped.
+    """
+    return [data["n"] for data, _ in _claimable(user, tokens, purpose)]
+
+
+def claim_post_blobs(user, tokens) -> list:
+    """
+    Like ``claim_uploads`` for post images, but returns ``StoredBlob`` rows
+    ready for ``blobs.add_images``. Each upload is hashed from storage; when
+    that content is already stored, the new copy is deleted and the
+    existing blob used.
+    """
+    result = []
+    for data, _ in _claimable(user, tokens, "post"):
+        sha256, size = hash_stored(data["n"])
+        result.append(register(sha256, data["n"], size))
+    return result
+
+
+def store_local_upload(token: str, stream, content_type: str) -> str:
+    """
+    Receive the PUT body for ``LocalUploadBackend``. Mirrors what S3 enforces
+    on a presigned PUT: valid signature, matching content type, declared size
+    and, for content-addressed uploads, the declared SHA-256.
+    """
+    data = read_token(token)
+    name = data["n"]
+    sha256 = data.get("h")
+
+    if (content_type or "").split(";")[0].strip().lower() != data["t"]:
+        raise UploadError("Content type does not match the upload policy.")
+    if default_storage.exists(name):
+        raise UploadError("This upload has already been used.")
+
+    limit = data["s"]
+    received = 0
+
+    def chunks():
+        nonlocal received
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                return
+            received += len(chunk)
+            if received > limit:
+                raise UploadError("File is larger than declared.")
+            tmp.write(chunk)
+            yield chunk
+
+    with SpooledTemporaryFile(max_size=1024 * 1024) as tmp:
+        digest, _ = hash_chunks(chunks())
+        if sha256 and digest != sha256:
+            raise UploadError("Content does not match the declared SHA-256.")
+        tmp.seek(0)
+        saved = default_storage.save(name, File(tmp, name=name))
+
+    if saved != name:
+        default_storage.delete(saved)
+        raise UploadError("Could not store the upload.")
+    return name
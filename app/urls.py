@@ -8,6 +8,11 @@ from app import views as app_views
 
 from . import views   
 
+if settings.ASYNC_VIEWS:
+    from . import async_views as hot_views
+else:
+    hot_views = views
+
 
 def root(request):
     if request.user.is_authenticated:
@@ -40,15 +45,23 @@ urlpatterns = [
 
     path("accounts/", include("allauth.urls")),
 
-    path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/", hot_views.dashboard, name="dashboard"),
     path("setup/", views.onboarding, name="onboarding"),
     path("myaccount/", views.profile, name="profile"),
     path("user/<int:user_id>/", views.user_profile, name="user_profile"),
     path("messages/", include(("messaging.urls", "messaging"), namespace="messaging")),
     path("newpost/", views.new_post, name="newpost"),
+    path("uploads/policy/", views.upload_policy, name="upload_policy"),
+    path("uploads/local/<str:token>/", views.upload_local, name="upload_local"),
     path("delete-account/", views.delete_account, name="delete_account"),
     path("myposts/", views.my_posts, name="myposts"),
+    path("saved-searches/", views.saved_search_list, name="saved_searches"),
+    path("saved-searches/new/", views.save_search, name="save_search"),
+    path("saved-searches/<int:search_id>/delete/", views.delete_saved_search, name="delete_saved_search"),
+    path("audiences/", views.audience_list, name="audiences"),
+    path("audiences/<int:audience_id>/delete/", views.delete_audience, name="delete_audience"),
     path("deletepost/", views.delete_post, name="delete_post"),
+    path("renewpost/", views.renew_post, name="renew_post"),
     path("flagpost/<int:post_id>/", views.flag_post, name="flag_post"),
     path("admin/messages/<int:message_id>/edit/", app_views.admin_edit_message, name="admin_edit_message"),
     path("admin/messages/<int:message_id>/delete/", app_views.admin_delete_message, name="admin_delete_message"),
@@ -82,6 +95,8 @@ urlpatterns = [
     path("after-login/", views.post_login_redirect, name="post_login_redirect"),
 
     path("suspended/", views.suspended_page_view, name="suspended_page"),
+
+    path("api/v1/", include("app.api_urls", namespace="api")),
 ]
 
 if settings.DEBUG:
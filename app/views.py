@@ -1,24 +1,46 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import auth
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
-from django.views.decorators.http import require_POST
+from django.http import HttpResponseForbidden, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_http_methods
 from django.core.files.base import ContentFile
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from pathlib import Path
 from io import BytesIO
-from PIL import Image
-from allauth.account.models import EmailAddress
-from allauth.socialaccount.models import SocialAccount
+from datetime import datetime, timezone as dt_timezone
 from django.contrib import messages
 
-try:
-    from pillow_heif import register_heif_opener
-    register_heif_opener()
-except Exception:
-    pass
-
-from .models import Profile, Post, PostImages, PostFlag
+from .freshness import dashboard_etag, my_posts_etag, revalidate, user_profile_etag
+from .models import (
+    AccountDeletionJob,
+    ArchivedPost,
+    Audience,
+    Profile,
+    Post,
+    PostFlag,
+    SavedSearch,
+    SavedSearchMatch,
+    listing_expiry,
+)
+from .ranking import get_ranked, record_engagement
+from .blobs import add_images
+from . import archive, audiences, counters, geo, rollups, saved_searches
+from .db_routing import replica_reads
+from .imaging import pil_image
+from .ratelimit import rate_limit
+from .uploads import (
+    UploadError,
+    claim_post_blobs,
+    claim_uploads,
+    issue_upload,
+    store_local_upload,
+    store_post_image,
+)
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from messaging.models import Message, MessageFlag
@@ -31,29 +53,6 @@ def admin_only(view_func):
     return staff_member_required(view_func)
 
 
-def is_moderator_email(email: str) -> bool:
-    """
-    Check whether an email is in the MODERATOR_EMAILS from settings.
-
-    Handles both:
-    - MODERATOR_EMAILS = "a@x.com, b@y.com"   (string)
-    - MODERATOR_EMAILS = ["a@x.com", "b@y.com"] (list/tuple)
-    """
-    if not email:
-        return False
-
-    raw = getattr(settings, "MODERATOR_EMAILS", [])
-
-    if isinstance(raw, str):
-        allowed = [e.strip().lower() for e in raw.split(",") if e.strip()]
-    else:
-        allowed = [str(e).strip().lower() for e in raw]
-
-    print("DEBUG MODERATOR_EMAILS:", allowed, "| checking:", email)
-
-    return email.strip().lower() in allowed
-
-
 SUSTAINABILITY_CHOICES = [
     ("zero_waste", "Zero-waste & circular economy"),
     ("food", "Sustainable food & agriculture"),
@@ -63,6 +62,8 @@ SUSTAINABILITY_CHOICES = [
     ("advocacy", "Advocacy, education & policy"),
 ]
 
+FEED_PAGE_SIZE = 20
+
 
 @login_required
 def onboarding(request):
@@ -126,6 +127,8 @@ def onboarding(request):
 
 
 @login_required
+@replica_reads
+@revalidate(dashboard_etag)
 def dashboard(request):
     profile, _ = Profile.objects.get_or_create(user=request.user)
     role = getattr(profile, "status", "Member")
@@ -134,25 +137,59 @@ def dashboard(request):
         return redirect("onboarding")
 
     posts = Post.objects.all().order_by('-created_at')
-    posts = posts.exclude(hidden_from=request.user)
+    posts = audiences.visible(posts, request.user)
 
     categories = Post._meta.get_field('category').choices
 
     selected_category = request.GET.get('category') or None
     search_query = (request.GET.get('q') or "").strip()
+    newest_first = request.GET.get('sort') == "new"
+    point = geo.requested_point(request.GET)
+    radius = geo.parse_radius(request.GET.get('radius'))
 
     if selected_category:
         posts = posts.filter(category=selected_category)
+        record_engagement(request.user, selected_category, views=1)
 
     if search_query:
         posts = posts.filter(title__icontains=search_query)
 
+    ranked = None
+    if not (selected_category or search_query or newest_first or point):
+        ranked = get_ranked(request.user.id)
+
+    if point:
+        # Nearest first.
+        page_obj = Paginator(geo.nearby(posts, *point, radius), FEED_PAGE_SIZE).get_page(request.GET.get('page'))
+        by_id = posts.in_bulk(list(page_obj.object_list))
+        page_posts = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+    elif ranked:
+        # Posts created since the last ranking run go on top, newest first.
+        computed_at = datetime.fromtimestamp(ranked["computed_at"], tz=dt_timezone.utc)
+        fresh = list(posts.filter(created_at__gt=computed_at).values_list("id", flat=True))
+        seen = set(fresh)
+        ids = fresh + [pk for pk in ranked["ids"] if pk not in seen]
+        page_obj = Paginator(ids, FEED_PAGE_SIZE).get_page(request.GET.get('page'))
+        by_id = posts.in_bulk(list(page_obj.object_list))
+        page_posts = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+    else:
+        page_obj = Paginator(posts, FEED_PAGE_SIZE).get_page(request.GET.get('page'))
+        page_posts = page_obj.object_list
+
+    counters.record_views([p.id for p in page_posts if p.user_id != request.user.id])
+
     context = {
         "profile": profile,
-        "posts": posts,
+        "posts": page_posts,
+        "page_obj": page_obj,
+        "ranked": bool(ranked),
         "selected_category": selected_category,
         "categories": categories,
         "search_query": search_query,
+        "pickup_spots": geo.SPOT_CHOICES,
+        "radius_choices": geo.RADIUS_CHOICES,
+        "near": request.GET.get('near') or "",
+        "radius": radius,
     }
 
     if str(role).lower() == "organizer":
@@ -173,6 +210,14 @@ def profile(request):
     profile_obj, _ = Profile.objects.get_or_create(user=request.user)
 
     if request.method == "POST":
+        upload_token = request.POST.get("upload_token")
+        if upload_token:
+            names = claim_uploads(request.user, [upload_token], "avatar")
+            if names:
+                profile_obj.avatar = names[0]
+                profile_obj.save(update_fields=["avatar", "updated_at"])
+            return redirect("profile")
+
         if "image" in request.FILES:
             uploaded = request.FILES["image"]
             name = getattr(uploaded, "name", "avatar")
@@ -181,7 +226,7 @@ def profile(request):
 
             if ext in {"heic", "heif"} or content_type in {"image/heic", "image/heif"}:
                 try:
-                    img = Image.open(uploaded)
+                    img = pil_image().open(uploaded)
                     if img.mode not in ("RGB", "L"):
                         img = img.convert("RGB")
                     buf = BytesIO()
@@ -191,10 +236,10 @@ def profile(request):
                     profile_obj.avatar.save(new_name, ContentFile(buf.read()), save=True)
                 except Exception:
                     profile_obj.avatar = uploaded
-                    profile_obj.save(update_fields=["avatar"])
+                    profile_obj.save(update_fields=["avatar", "updated_at"])
             else:
                 profile_obj.avatar = uploaded
-                profile_obj.save(update_fields=["avatar"])
+                profile_obj.save(update_fields=["avatar", "updated_at"])
             return redirect("profile")
 
         action = (request.POST.get("action") or "").strip()
@@ -205,18 +250,18 @@ def profile(request):
             if nickname:
                 nickname = nickname[:max_len]
             profile_obj.nickname = nickname
-            profile_obj.save(update_fields=["nickname"])
+            profile_obj.save(update_fields=["nickname", "updated_at"])
             return redirect("profile")
 
         elif action == "update_bio":
             profile_obj.bio = request.POST.get("bio") or ""
-            profile_obj.save(update_fields=["bio"])
+            profile_obj.save(update_fields=["bio", "updated_at"])
             return redirect("profile")
 
         elif action == "update_interests":
             interests = request.POST.getlist("interests")
             profile_obj.sustainability_interests = interests
-            profile_obj.save(update_fields=["sustainability_interests"])
+            profile_obj.save(update_fields=["sustainability_interests", "updated_at"])
             return redirect("profile")
 
     return render(
@@ -231,6 +276,8 @@ def profile(request):
 
 
 @login_required
+@rate_limit("new_post", "10/h", burst=5)
+@rate_limit("new_post_ip", "30/h", burst=10, key="ip")
 def new_post(request):
     if request.method == "POST":
         post_title = request.POST.get("title")
@@ -239,44 +286,206 @@ def new_post(request):
         post_category = request.POST.get("category")
         post_images = request.FILES.getlist("images")
 
-        hidden_from_ids = request.POST.getlist("hidden_from")
+        audience_ids = request.POST.getlist("hidden_audiences")
 
-        new_post_obj = Post.objects.create(
+        new_post_obj = Post(
             user=request.user,
             title=post_title,
             price=post_price,
             description=post_description,
             category=post_category,
         )
+        geo.set_location(
+            new_post_obj,
+            request.POST.get("pickup_spot") or "",
+            request.POST.get("latitude"),
+            request.POST.get("longitude"),
+        )
+        new_post_obj.save()
+
+        if audience_ids:
+            new_post_obj.hidden_audiences.set(
+                Audience.objects.filter(owner=request.user, id__in=[i for i in audience_ids if i.isdigit()])
+            )
+
+        blobs = [blob for blob in map(store_post_image, post_images) if blob]
+        blobs += claim_post_blobs(request.user, request.POST.getlist("upload_tokens"))
+        add_images(new_post_obj, blobs)
 
-        if hidden_from_ids:
-            users_to_hide = User.objects.filter(id__in=hidden_from_ids)
-            new_post_obj.hidden_from.set(users_to_hide)
+        # Deferred: dedupe pulls in numpy, which most requests never need.
+        from .dedupe import index_post
 
-        for image in post_images:
-            PostImages.objects.create(post=new_post_obj, image=image)
+        index_post(new_post_obj, flag=True)
+        saved_searches.match_post(new_post_obj)
 
         return redirect("dashboard")
 
-    users = User.objects.exclude(id=request.user.id)
-    return render(request, 'post/new_post.html', {"users": users})
+    user_audiences = Audience.objects.filter(owner=request.user).order_by("name")
+    return render(request, 'post/new_post.html', {"audiences": user_audiences, "pickup_spots": geo.SPOT_CHOICES})
+
+
+@login_required
+@require_POST
+def upload_policy(request):
+    """
+    Issue a presigned upload target for one image.
+    The browser PUTs the file to `url` and then submits `token` with its form.
+    """
+    try:
+        policy = issue_upload(
+            request.user,
+            purpose=request.POST.get("purpose"),
+            content_type=request.POST.get("content_type"),
+            size=request.POST.get("size"),
+            sha256=request.POST.get("sha256"),
+        )
+    except UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(policy)
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_local(request, token):
+    """
+    Local stand-in for the storage bucket's presigned PUT endpoint.
+    Authorised by the signed token, like a presigned S3 URL.
+    """
+    try:
+        store_local_upload(token, request, request.content_type)
+    except UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"ok": True})
 
 
 @login_required
 @require_POST
 def delete_account(request):
+    """
+    Deactivate and log out right away; the rows and media are removed by the
+    account deletion worker (see app/account_deletion.py).
+    """
     user = request.user
-    EmailAddress.objects.filter(user=user).delete()
-    SocialAccount.objects.filter(user=user).delete()
-    user.delete()
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+    AccountDeletionJob.objects.create(user_id=user.pk)
+    auth.logout(request)
     messages.success(request, "Your account has been deleted.")
     return redirect("account_login")
 
 
 @login_required
+@revalidate(my_posts_etag)
 def my_posts(request):
-    posts = Post.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, "post/my_posts.html", {"posts": posts})
+    posts = (
+        Post.objects.filter(user=request.user)
+        .annotate(
+            total_views=Coalesce(Sum("daily_stats__views"), 0),
+            total_inquiries=Coalesce(Sum("daily_stats__inquiries"), 0),
+        )
+        .order_by('-created_at')
+    )
+    archived = (
+        ArchivedPost.objects.filter(user=request.user)
+        .prefetch_related("images")
+        .order_by("-archived_at")
+    )
+    return render(request, "post/my_posts.html", {"posts": posts, "archived": archived})
+
+
+@login_required
+@require_POST
+def renew_post(request):
+    """Extend a listing's lifetime; an archived listing is relisted."""
+    post_id = request.POST.get("post_id") or ""
+    if not post_id.isdigit():
+        return redirect("myposts")
+    post = Post.objects.filter(pk=post_id, user=request.user).first()
+    if post:
+        post.expires_at = listing_expiry()
+        post.save(update_fields=["expires_at", "updated_at"])
+    else:
+        archive.restore(get_object_or_404(ArchivedPost, pk=post_id, user=request.user))
+    return redirect("myposts")
+
+
+@login_required
+@require_POST
+def save_search(request):
+    query = request.POST.get("q", "")
+    category = request.POST.get("category", "")
+    try:
+        _, created = saved_searches.save_search(request.user, query, category)
+    except saved_searches.SavedSearchError as exc:
+        messages.error(request, str(exc))
+    else:
+        if created:
+            messages.success(request, "Search saved. New posts that match will show up here.")
+        else:
+            messages.info(request, "You already saved this search.")
+    return redirect("saved_searches")
+
+
+@login_required
+def saved_search_list(request):
+    """Saved searches with the posts that matched since the last visit, which marks them seen."""
+    unseen = (
+        SavedSearchMatch.objects
+        .filter(seen_at__isnull=True)
+        .exclude(post_id__in=audiences.excluded_posts(request.user.pk))
+        .select_related("post", "post__user__profile")
+        .order_by("-created_at")
+    )
+    searches = list(
+        SavedSearch.objects
+        .filter(user=request.user)
+        .prefetch_related(Prefetch("matches", queryset=unseen, to_attr="new_matches"))
+        .order_by("-created_at")
+    )
+    SavedSearchMatch.objects.filter(search__user=request.user, seen_at__isnull=True).update(seen_at=timezone.now())
+    return render(request, "post/saved_searches.html", {"searches": searches, "title": "Saved searches"})
+
+
+@login_required
+@require_POST
+def delete_saved_search(request, search_id):
+    SavedSearch.objects.filter(pk=search_id, user=request.user).delete()
+    return redirect("saved_searches")
+
+
+@login_required
+def audience_list(request):
+    """
+    GET: the user's audiences, each with its members
+    POST: create an audience, or update the one named by ``audience_id``
+    """
+    if request.method == "POST":
+        audience_id = request.POST.get("audience_id") or ""
+        audience = None
+        if audience_id.isdigit():
+            audience = get_object_or_404(Audience, pk=audience_id, owner=request.user)
+        try:
+            audiences.save_audience(request.user, request.POST.get("name"), request.POST.get("members", ""), audience)
+        except audiences.AudienceError as exc:
+            messages.error(request, str(exc))
+        else:
+            messages.success(request, "Audience saved.")
+        return redirect("audiences")
+
+    user_audiences = (
+        Audience.objects
+        .filter(owner=request.user)
+        .prefetch_related(Prefetch("members", queryset=User.objects.only("username").order_by("username")))
+        .order_by("name")
+    )
+    return render(request, "post/audiences.html", {"audiences": user_audiences, "title": "Audiences"})
+
+
+@login_required
+@require_POST
+def delete_audience(request, audience_id):
+    Audience.objects.filter(pk=audience_id, owner=request.user).delete()
+    return redirect("audiences")
 
 
 @login_required
@@ -304,27 +513,15 @@ def delete_post(request):
 @login_required
 def post_login_redirect(request):
     """
-    After any successful login:
-
-    - If the user's email is in MODERATOR_EMAILS, mark them as staff (admin).
-    - If not, and they are staff (but not superuser), demote them back.
-    - Then send everyone to the regular dashboard.
-    Admin powers are controlled purely by user.is_staff.
+    After any successful login, send everyone to the regular dashboard.
+    Staff status, names and role were already synced by the login pipeline
+    (app/login.py); admin powers are controlled purely by user.is_staff.
     """
-    user = request.user
-    is_mod = is_moderator_email(user.email)
-
-    if is_mod and not user.is_staff:
-        user.is_staff = True
-        user.save(update_fields=["is_staff"])
-    elif not is_mod and user.is_staff and not user.is_superuser:
-        user.is_staff = False
-        user.save(update_fields=["is_staff"])
-
     return redirect("dashboard")
 
 
 @login_required
+@rate_limit("flag", "10/h", burst=5, methods=None)
 def flag_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
 
@@ -391,15 +588,19 @@ def admin_edit_post(request, post_id):
         else:
             post.title = title
             post.description = description
-            post.save(update_fields=["title", "description"])
+            post.save(update_fields=["title", "description", "updated_at"])
+            from .dedupe import index_post
+
+            index_post(post)
             delete_ids = request.POST.getlist('delete_images')
             if delete_ids:
                 post.images.filter(id__in=delete_ids).delete()
 
             
             files = request.FILES.getlist('new_images') 
-            for f in files:
-                PostImages.objects.create(post=post, image=f)
+            blobs = [blob for blob in map(store_post_image, files) if blob]
+            blobs += claim_post_blobs(request.user, request.POST.getlist("upload_tokens"))
+            add_images(post, blobs)
 
             messages.success(request, "Post updated successfully.")
             return redirect("admin_dashboard")
@@ -417,7 +618,8 @@ def admin_resolve_flag(request, flag_id):
     (Called with any single flag_id from that post.)
     """
     flag = get_object_or_404(PostFlag, id=flag_id)
-    PostFlag.objects.filter(post=flag.post, resolved=False).update(resolved=True)
+    resolved = PostFlag.objects.filter(post=flag.post, resolved=False).update(resolved=True)
+    rollups.add(rollups.OPEN_FLAGS, -resolved)
     messages.success(request, "All flags for this post have been marked as resolved.")
     return redirect("admin_dashboard")
 
@@ -450,7 +652,7 @@ def admin_edit_message(request, message_id):
             messages.error(request, "Message text cannot be empty.")
         else:
             message.text = text
-            message.save(update_fields=["text"])
+            message.save(update_fields=["text", "updated_at"])
             messages.success(request, "Message updated successfully.")
             return redirect("admin_dashboard")
 
@@ -472,7 +674,8 @@ def admin_resolve_message_flag(request, flag_id):
     Mark all unresolved flags for the same message as resolved.
     """
     flag = get_object_or_404(MessageFlag, id=flag_id)
-    MessageFlag.objects.filter(message=flag.message, resolved=False).update(resolved=True)
+    resolved = MessageFlag.objects.filter(message=flag.message, resolved=False).update(resolved=True)
+    rollups.add(rollups.OPEN_FLAGS, -resolved)
     messages.success(request, "All flags for this message have been marked as resolved.")
     return redirect("admin_dashboard")
 
@@ -481,6 +684,7 @@ def is_admin(user):
 
 
 @admin_only
+@replica_reads
 def admin_dashboard(request):
     posts = Post.objects.all().order_by("-created_at")
 
@@ -496,10 +700,13 @@ def admin_dashboard(request):
     for flag in unresolved_flags_qs:
         post = flag.post
 
-        display = (
-            getattr(getattr(flag.flagged_by, "profile", None), "display_name", None)
-            or flag.flagged_by.username
-        )
+        if flag.flagged_by is None:
+            display = "Duplicate detector"
+        else:
+            display = (
+                getattr(getattr(flag.flagged_by, "profile", None), "display_name", None)
+                or flag.flagged_by.username
+            )
 
         if post.id not in flagged_posts_by_id:
             flagged_posts_by_id[post.id] = {
@@ -563,24 +770,30 @@ def admin_dashboard(request):
 
     message_flags_list = list(message_flags_by_message.values())
 
-    total_users = User.objects.count()
-    suspended_users = User.objects.filter(profile__status="Suspended").count()
-    total_posts = Post.objects.count()
+    # Totals come from the live counters in one query (see app/rollups.py).
+    totals = rollups.read()
     flagged_posts_count = len(flagged_posts_list)
     flagged_message_count = len(message_flags_list)
 
-    suspended_user_list = User.objects.filter(profile__status="Suspended")
+    suspended_user_list = (
+        User.objects.filter(profile__status="Suspended").select_related("profile")
+        if totals[rollups.SUSPENDED] else []
+    )
 
     return render(request, "admin/admin_dashboard.html", {
         "posts": posts,
         "flagged_posts_list": flagged_posts_list,
         "message_flags_list": message_flags_list,
-        "total_users": total_users,
-        "suspended_users": suspended_users,
-        "total_posts": total_posts,
+        "total_users": totals[rollups.USERS],
+        "suspended_users": totals[rollups.SUSPENDED],
+        "total_posts": totals[rollups.POSTS],
+        "archived_posts": totals[rollups.ARCHIVED_POSTS],
+        "total_messages": totals[rollups.MESSAGES],
+        "open_flags": totals[rollups.OPEN_FLAGS],
         "flagged_posts": flagged_posts_count,
         "flagged_message_count": flagged_message_count,
         "suspended_user_list": suspended_user_list,
+        "trends": rollups.trends(),
     })
 
 
@@ -595,6 +808,8 @@ def suspended_page_view(request):
 
 
 @login_required
+@replica_reads
+@revalidate(user_profile_etag)
 def user_profile(request, user_id):
     """
     Display another user's profile page (read-only).
@@ -604,7 +819,7 @@ def user_profile(request, user_id):
     viewed_profile = get_object_or_404(Profile, user=viewed_user)
     
     # Get user's posts, excluding those hidden from current user
-    user_posts = Post.objects.filter(user=viewed_user).exclude(hidden_from=request.user).order_by('-created_at')
+    user_posts = audiences.visible(Post.objects.filter(user=viewed_user), request.user).order_by('-created_at')
     
     context = {
         "viewed_user": viewed_user,
@@ -0,0 +1,237 @@
+"""
+Cold storage for old message history.
+
+``compact`` (run by ``manage.py compact_messages``) packs every message
+older than the cutoff into one ``MessageArchiveBlock`` per thread and month:
+a zlib-compressed JSON list of ``[id, sender_id, text, created, edited]``
+rows, ``created`` in microseconds since the epoch and ``edited`` the
+microseconds from there to ``updated_at`` (nearly always 0). Only whole
+months before the cutoff are packed, one block per transaction, and the
+originals are removed with a plain DELETE.
+Messages with flags stay live, resolved or not, so moderation keeps
+working on them and the flag history stays attached.
+
+Reads go through ``thread_page``, which pages a thread newest first across
+live and archived messages by id, decompressing only the blocks a page
+reaches. Archived rows come back as unsaved ``Message`` instances with
+``archived = True``. Flagging one moves it back to the live table first
+(``restore_message``).
+"""
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from operator import attrgetter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from app.bulk import raw_delete
+
+from .models import Message, MessageArchiveBlock
+
+User = get_user_model()
+
+PAGE_SIZE = 50
+DEFAULT_BATCH_SIZE = 100
+COMPRESSION_LEVEL = 9
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode(rows) -> bytes:
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+
+def decode(data) -> list:
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def _micros(value) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _row(pk, sender_id, text, created_at, updated_at) -> list:
+    created = _micros(created_at)
+    return [pk, sender_id, text, created, _micros(updated_at) - created]
+
+
+def _month_bounds(month):
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def compact_cutoff(older_than, now=None):
+    """Start of the month containing ``now - older_than``: only earlier months are packed."""
+    edge = (now or timezone.now()) - older_than
+    return datetime(edge.year, edge.month, 1, tzinfo=dt_timezone.utc)
+
+
+def compactable(cutoff):
+    return Message.objects.filter(created_at__lt=cutoff, flags__isnull=True)
+
+
+def _save_block(block, thread_id, month, rows) -> None:
+    """Write ``rows`` to ``block`` (or a new one); an empty list removes it."""
+    if not rows:
+        if block:
+            raw_delete(MessageArchiveBlock, [block.pk])
+        return
+    block = block or MessageArchiveBlock(thread_id=thread_id, month=month)
+    block.first_message_id = rows[0][0]
+    block.last_message_id = rows[-1][0]
+    block.message_count = len(rows)
+    block.data = encode(rows)
+    block.compacted_at = timezone.now()
+    block.save()
+
+
+def compact_month(thread_id, month, cutoff) -> int:
+    """Pack one thread's messages from one month; returns how many moved."""
+    start, end = _month_bounds(month)
+    with transaction.atomic():
+        live = list(
+            compactable(cutoff).select_for_update()
+            .filter(thread_id=thread_id, created_at__gte=start, created_at__lt=end)
+            .values_list("pk", "sender_id", "text", "created_at", "updated_at")
+        )
+        if not live:
+            return 0
+        block = MessageArchiveBlock.objects.select_for_update().filter(thread_id=thread_id, month=month).first()
+        rows = decode(block.data) if block else []
+        rows.extend(_row(*values) for values in live)
+        rows.sort(key=lambda r: r[0])
+        _save_block(block, thread_id, month, rows)
+        raw_delete(Message, [values[0] for values in live])
+    return len(live)
+
+
+def compact(cutoff, batch_size=DEFAULT_BATCH_SIZE, report=None) -> int:
+    """Pack all live messages from months before ``cutoff``, ``batch_size`` blocks at a time."""
+    total = 0
+    while True:
+        groups = list(
+            compactable(cutoff)
+            .annotate(month=TruncMonth("created_at", tzinfo=dt_timezone.utc))
+            .values_list("thread_id", "month")
+            .distinct()
+            .order_by("thread_id", "month")[:batch_size]
+        )
+        if not groups:
+            return total
+        for thread_id, month in groups:
+            total += compact_month(thread_id, month.date(), cutoff)
+        if report:
+            report(total)
+
+
+def _message(thread_id, row) -> Message:
+    pk, sender_id, text, created, edited = row
+    message = Message(
+        pk=pk,
+        thread_id=thread_id,
+        sender_id=sender_id,
+        text=text,
+        created_at=EPOCH + timedelta(microseconds=created),
+        updated_at=EPOCH + timedelta(microseconds=created + edited),
+    )
+    message.archived = True
+    return message
+
+
+def _attach_senders(messages) -> None:
+    """Set ``sender`` (with profile) on archived messages in one query."""
+    users = User.objects.select_related("profile").in_bulk({m.sender_id for m in messages if m.sender_id})
+    for m in messages:
+        # A sender deleted since compaction shows as "user not found".
+        m.sender = users.get(m.sender_id)
+
+
+def archived_messages(thread_id, before=None, limit=PAGE_SIZE, floor=0) -> list:
+    """
+    Up to ``limit`` of the newest archived messages in a thread with ids
+    below ``before`` (and above ``floor``), newest first.
+    """
+    blocks = MessageArchiveBlock.objects.filter(thread_id=thread_id, last_message_id__gt=floor)
+    if before:
+        blocks = blocks.filter(first_message_id__lt=before)
+    found = []
+    for pk, last_id in blocks.order_by("-last_message_id").values_list("pk", "last_message_id"):
+        if len(found) >= limit and last_id < found[limit - 1].pk:
+            break
+        data = MessageArchiveBlock.objects.values_list("data", flat=True).get(pk=pk)
+        found.extend(
+            _message(thread_id, row) for row in decode(data)
+            if (not before or row[0] < before) and row[0] > floor
+        )
+        found.sort(key=attrgetter("pk"), reverse=True)
+    found = found[:limit]
+    _attach_senders(found)
+    return found
+
+
+def thread_page(thread_id, before=None, limit=PAGE_SIZE):
+    """
+    ``(messages, older)``: the ``limit`` newest messages of a thread below id
+    ``before``, live and archived, oldest first, and the ``before`` cursor of
+    the page preceding it (None when this page reaches the beginning).
+    """
+    live = Message.objects.filter(thread_id=thread_id).select_related("sender", "sender__profile")
+    if before:
+        live = live.filter(pk__lt=before)
+    live = list(live.order_by("-pk")[:limit + 1])
+    # With a full page of live messages, only archived ones newer than the
+    # oldest of them can make it onto the page.
+    floor = live[-1].pk if len(live) > limit else 0
+    merged = sorted(live + archived_messages(thread_id, before, limit + 1, floor), key=attrgetter("pk"), reverse=True)
+    page = merged[:limit][::-1]
+    older = page[0].pk if len(merged) > limit else None
+    return page, older
+
+
+def archived_message(message_id, participant):
+    """An archived message from one of ``participant``'s threads, or None."""
+    blocks = MessageArchiveBlock.objects.filter(
+        thread__participants=participant,
+        first_message_id__lte=message_id,
+        last_message_id__gte=message_id,
+    )
+    for thread_id, data in blocks.values_list("thread_id", "data"):
+        for row in decode(data):
+            if row[0] == message_id:
+                return _message(thread_id, row)
+    return None
+
+
+def restore_message(message) -> Message:
+    """Move an archived message back to the live table, keeping its id and timestamps."""
+    month = message.created_at.astimezone(dt_timezone.utc).date().replace(day=1)
+    with transaction.atomic():
+        block = MessageArchiveBlock.objects.select_for_update().get(thread_id=message.thread_id, month=month)
+        rows = decode(block.data)
+        _save_block(block, message.thread_id, month, [r for r in rows if r[0] != message.pk])
+        Message.objects.bulk_create([Message(
+            pk=message.pk, thread_id=message.thread_id, sender_id=message.sender_id, text=message.text,
+        )])
+        # created_at/updated_at are auto fields; put the originals back.
+        Message.objects.filter(pk=message.pk).update(created_at=message.created_at, updated_at=message.updated_at)
+    return Message.objects.select_related("thread", "sender").get(pk=message.pk)
+
+
+def scrub_sender(user_id, thread_ids) -> int:
+    """Blank a deleted user as sender in archived messages; returns blocks rewritten."""
+    changed = 0
+    for pk in MessageArchiveBlock.objects.filter(thread_id__in=thread_ids).values_list("pk", flat=True):
+        with transaction.atomic():
+            block = MessageArchiveBlock.objects.select_for_update().get(pk=pk)
+            rows = decode(block.data)
+            if not any(r[1] == user_id for r in rows):
+                continue
+            for r in rows:
+                if r[1] == user_id:
+                    r[1] = None
+            block.data = encode(rows)
+            block.save(update_fields=["data"])
+            changed += 1
+    return changed
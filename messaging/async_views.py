@@ -0,0 +1,134 @@
+"""
+Async versions of the inbox, thread and user list views (``ASYNC_VIEWS``).
+See app/async_views.py for how they are served.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils import timezone
+
+from app.db_routing import replica_reads
+from app.freshness import revalidate, thread_etag
+from app.ratelimit import rate_limit
+
+from .archive import thread_page
+from .forms import MessageForm
+from .models import Message, Thread, ThreadRead
+from .views import _cursor, _display_name
+
+User = get_user_model()
+
+
+async def _none():
+    return None
+
+
+async def _thread_page(thread_id, before):
+    return await sync_to_async(thread_page)(thread_id, before)
+
+
+@login_required
+@replica_reads
+async def inbox(request):
+    user = await request.auser()
+    threads = [
+        t async for t in (
+            Thread.objects
+            .filter(participants=user)
+            .prefetch_related(
+                'participants__profile',
+                'participants',
+                'messages__sender__profile',
+                'messages__sender',
+                'messages',
+            )
+        )
+    ]
+
+    last_read = await sync_to_async(ThreadRead.last_read_map)(user, threads)
+    unread_counts = await asyncio.gather(*(
+        t.messages.exclude(sender=user).filter(created_at__gt=last_read[t.id]).acount()
+        for t in threads
+    ))
+
+    rows = []
+    for t, unread_count in zip(threads, unread_counts):
+        other = next((p for p in t.participants.all() if p.id != user.id), None)
+        rows.append({'thread': t, 'other': other, 'unread_count': unread_count})
+
+    return await sync_to_async(render)(request, 'messaging/inbox.html', {'rows': rows, 'title': 'Messages'})
+
+
+@login_required
+async def user_list(request):
+    user = await request.auser()
+    q = request.GET.get("q", "").strip()
+    users = (
+        User.objects
+        .exclude(pk=user.pk)
+        .select_related("profile")
+        .order_by("username")
+    )
+    if q:
+        users = users.filter(username__icontains=q)
+    users = [u async for u in users]
+    return await sync_to_async(render)(request, "messaging/_user_list.html", {"users": users})
+
+
+@login_required
+@rate_limit("send_message", "20/m", burst=10)
+@rate_limit("send_message_ip", "60/m", burst=20, key="ip")
+@revalidate(thread_etag)
+async def thread_detail(request, thread_id):
+    user = await request.auser()
+    before = _cursor(request)
+    thread, is_member, other, page = await asyncio.gather(
+        aget_object_or_404(Thread, pk=thread_id),
+        Thread.participants.through.objects.filter(thread_id=thread_id, user_id=user.pk).aexists(),
+        User.objects.select_related('profile').filter(threads=thread_id).exclude(pk=user.pk).afirst(),
+        _thread_page(thread_id, before) if request.method != 'POST' else _none(),
+    )
+    if not is_member:
+        raise Http404()
+
+    if request.method == 'POST':
+        form = MessageForm(request.POST)
+        if form.is_valid():
+            await Message.objects.acreate(
+                thread=thread,
+                sender=user,
+                text=form.cleaned_data['text']
+            )
+            return redirect('messaging:thread', thread_id=thread.id)
+    else:
+        form = MessageForm()
+
+    if page is None:
+        page = await _thread_page(thread_id, before)
+    messages_list, older = page
+
+    if other and not thread.is_group:
+        display = _display_name(other)
+        page_title = f"Chat with {display}"
+    else:
+        page_title = thread.name or "Conversation"
+
+    if messages_list:
+        await ThreadRead.objects.aupdate_or_create(
+            thread=thread,
+            user=user,
+            defaults={'last_read_at': timezone.now()},
+        )
+
+    return await sync_to_async(render)(request, 'messaging/thread.html', {
+        'thread': thread,
+        'messages': messages_list,
+        'older': older,
+        'form': form,
+        'other': other,
+        'title': page_title,
+    })
@@ -10,8 +10,7 @@ def messaging_badge(request):
         threads = (Thread.objects
                    .filter(participants=u)
                    .prefetch_related('messages', 'messages__sender'))
-        from django.utils import timezone
+        last_read = ThreadRead.last_read_map(u, threads)
         for t in threads:
-            tr, _ = ThreadRead.objects.get_or_create(thread=t, user=u)
-            total += t.messages.exclude(sender=u).filter(created_at__gt=tr.last_read_at).count()
+            total += t.messages.exclude(sender=u).filter(created_at__gt=last_read[t.id]).count()
     return {"messages_unread_total": total}
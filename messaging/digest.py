@@ -0,0 +1,135 @@
+"""
+Unread-message digest emails (``manage.py send_message_digests``).
+
+One grouped query over thread memberships, their messages and
+``ThreadRead`` finds every (user, thread) pair with unread messages from
+someone else. Users are skipped while a digest sent within ``INTERVAL`` is
+still recent (throttle), and only messages newer than the last one a digest
+covered count (``DigestState.last_message_id``, a high-water mark), so the
+same message is never announced twice. Digests are rendered in bulk and
+sent over a single mail connection; state is saved per batch only after the
+batch went out.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DigestState, Message, Thread, ThreadRead, epoch_aware
+from .views import _display_name
+
+User = get_user_model()
+
+INTERVAL = timedelta(hours=6)
+# Unread messages older than this are not worth an email.
+MAX_AGE = timedelta(days=7)
+BATCH_SIZE = 200
+
+
+def unread_rows(now, interval=INTERVAL, max_age=MAX_AGE):
+    """
+    ``{user_id, thread_id, unread, latest_id}`` for every thread with
+    messages its participant has not read, sent by someone else, newer than
+    both ``max_age`` and that user's high-water mark.
+    """
+    Participant = Thread.participants.through
+    last_read = ThreadRead.objects.filter(
+        thread_id=OuterRef("thread_id"), user_id=OuterRef("user_id"),
+    ).values("last_read_at")[:1]
+    unread = (
+        Q(thread__messages__created_at__gt=Coalesce(Subquery(last_read), Value(epoch_aware())))
+        & Q(thread__messages__id__gt=Coalesce(F("user__digest_state__last_message_id"), Value(0)))
+        & (Q(thread__messages__sender__isnull=True) | ~Q(thread__messages__sender=F("user_id")))
+    )
+    return (
+        Participant.objects
+        .filter(user__is_active=True, thread__messages__created_at__gte=now - max_age)
+        .exclude(user__email="")
+        .exclude(user__digest_state__last_sent_at__gt=now - interval)
+        # As an expression, the sender test stays on the same message row
+        # (a plain exclude() would become a subquery over all messages).
+        .alias(is_unread=ExpressionWrapper(unread, output_field=BooleanField()))
+        .filter(is_unread=True)
+        .values("user_id", "thread_id")
+        .annotate(unread=Count("thread__messages"), latest_id=Max("thread__messages__id"))
+        .order_by("user_id", "-latest_id")
+    )
+
+
+def build_digests(rows):
+    """
+    ``[(user, [thread entries], latest_id)]`` for a batch of rows, loading
+    users, threads and latest messages in one query each.
+    """
+    by_user = defaultdict(list)
+    for row in rows:
+        by_user[row["user_id"]].append(row)
+
+    users = User.objects.select_related("profile").in_bulk(list(by_user))
+    threads = Thread.objects.prefetch_related("participants__profile").in_bulk({r["thread_id"] for r in rows})
+    latest = Message.objects.in_bulk([r["latest_id"] for r in rows])
+
+    digests = []
+    for user_id, user_rows in by_user.items():
+        user = users[user_id]
+        entries = []
+        for row in user_rows:
+            thread = threads[row["thread_id"]]
+            message = latest[row["latest_id"]]
+            if thread.is_group:
+                name = thread.name or "Group conversation"
+            else:
+                other = next((p for p in thread.participants.all() if p.pk != user_id), None)
+                name = _display_name(other) if other else "Conversation"
+            entries.append({
+                "name": name,
+                "unread": row["unread"],
+                "preview": message.text,
+                "url": settings.SITE_URL + reverse("messaging:thread", args=[thread.pk]),
+            })
+        digests.append((user, entries, max(r["latest_id"] for r in user_rows)))
+    return digests
+
+
+def render_digest(user, entries) -> EmailMessage:
+    context = {
+        "name": _display_name(user),
+        "entries": entries,
+        "total": sum(e["unread"] for e in entries),
+        "inbox_url": settings.SITE_URL + reverse("messaging:inbox"),
+    }
+    subject = render_to_string("messaging/email/digest_subject.txt", context).strip()
+    body = render_to_string("messaging/email/digest.txt", context)
+    return EmailMessage(subject, body, to=[user.email])
+
+
+def send_digests(now=None, interval=INTERVAL, max_age=MAX_AGE, batch_size=BATCH_SIZE, dry_run=False) -> int:
+    now = now or timezone.now()
+    rows = list(unread_rows(now, interval, max_age))
+    user_ids = list(dict.fromkeys(r["user_id"] for r in rows))
+    sent = 0
+    backend = "django.core.mail.backends.dummy.EmailBackend" if dry_run else None
+    with get_connection(backend) as connection:
+        for start in range(0, len(user_ids), batch_size):
+            batch = set(user_ids[start:start + batch_size])
+            digests = build_digests([r for r in rows if r["user_id"] in batch])
+            sent += connection.send_messages([render_digest(user, entries) for user, entries, _ in digests]) or 0
+            if dry_run:
+                continue
+            DigestState.objects.bulk_create(
+                [
+                    DigestState(user_id=user.pk, last_sent_at=now, last_message_id=latest_id)
+                    for user, _, latest_id in digests
+                ],
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["last_sent_at", "last_message_id"],
+            )
+    return sent
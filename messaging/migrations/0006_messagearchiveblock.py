@@ -0,0 +1,29 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_digeststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageArchiveBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('first_message_id', models.BigIntegerField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('compacted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_blocks', to='messaging.thread')),
+            ],
+            options={
+                'unique_together': {('thread', 'month')},
+            },
+        ),
+    ]
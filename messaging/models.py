@@ -101,6 +101,7 @@ class Message(models.Model):
     sender = models.ForeignKey(User, related_name='messages_sent', on_delete=models.SET_NULL, null=True)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['created_at']  
@@ -139,5 +140,53 @@ class ThreadRead(models.Model):
     class Meta:
         unique_together = ('thread', 'user')
 
+    @classmethod
+    def last_read_map(cls, user, threads):
+        """
+        {thread_id: last_read_at} for ``user``. Threads never opened map to
+        the epoch; nothing is written, so this is safe on a read replica.
+        """
+        thread_ids = [t.pk for t in threads]
+        found = dict(
+            cls.objects.filter(user=user, thread_id__in=thread_ids)
+            .values_list('thread_id', 'last_read_at')
+        )
+        return {pk: found.get(pk) or epoch_aware() for pk in thread_ids}
+
     def __str__(self):
         return f"ThreadRead(thread={self.thread_id}, user={self.user_id}, last_read_at={self.last_read_at})"
+
+
+class DigestState(models.Model):
+    """
+    Where a user's unread-message digests left off (see messaging/digest.py):
+    when the last one went out, and the newest message it covered.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='digest_state')
+    last_sent_at = models.DateTimeField()
+    last_message_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"DigestState(user={self.user_id}, last_sent_at={self.last_sent_at}, last_message_id={self.last_message_id})"
+
+
+class MessageArchiveBlock(models.Model):
+    """
+    One month of a thread's messages, compacted by ``manage.py
+    compact_messages`` (see messaging/archive.py) into a zlib-compressed JSON
+    list of rows. Message ids are kept, so a thread's history still sorts by
+    id across live and archived messages.
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='archive_blocks')
+    month = models.DateField()
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    message_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    compacted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('thread', 'month')
+
+    def __str__(self):
+        return f"Archive of thread {self.thread_id} for {self.month:%Y-%m} ({self.message_count} messages)"
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from app import rollups
+
+from .models import Message, MessageFlag
+
+
+@receiver(post_save, sender=Message, dispatch_uid="messaging_message_counter_save")
+def count_message(sender, instance, created, **kwargs):
+    if created:
+        rollups.add(rollups.MESSAGES, 1)
+
+
+@receiver(post_delete, sender=Message, dispatch_uid="messaging_message_counter_delete")
+def count_deleted_message(sender, instance, **kwargs):
+    rollups.add(rollups.MESSAGES, -1)
+
+
+@receiver(post_save, sender=MessageFlag, dispatch_uid="messaging_flag_counter_save")
+def count_open_flag(sender, instance, created, **kwargs):
+    if created and not instance.resolved:
+        rollups.add(rollups.OPEN_FLAGS, 1)
+
+
+@receiver(post_delete, sender=MessageFlag, dispatch_uid="messaging_flag_counter_delete")
+def count_deleted_flag(sender, instance, **kwargs):
+    if not instance.resolved:
+        rollups.add(rollups.OPEN_FLAGS, -1)
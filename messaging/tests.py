@@ -1,3 +1,266 @@
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import iscoroutinefunction
+from django.core import mail
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from app.tests.utils import make_user, serve_async_views
+
+from .archive import compact, compact_cutoff, decode, scrub_sender, thread_page
+from .digest import send_digests
+from .models import DigestState, Message, MessageArchiveBlock, MessageFlag, Thread, ThreadRead
+
+
+class DigestTests(TestCase):
+    def setUp(self):
+        self.alice = make_user("alice", nickname="Alice")
+        self.bob = make_user("bob", nickname="Bob")
+        self.thread, _ = Thread.for_users(self.alice, self.bob)
+
+    def say(self, sender, text, ago=timedelta(0)):
+        message = Message.objects.create(thread=self.thread, sender=sender, text=text)
+        if ago:
+            Message.objects.filter(pk=message.pk).update(created_at=timezone.now() - ago)
+        return message
+
+    def test_unread_messages_from_others_are_sent_once(self):
+        self.say(self.alice, "Is the lamp still available?")
+        latest = self.say(self.alice, "I can pick it up today")
+
+        self.assertEqual(send_digests(), 1)
+        [email] = mail.outbox
+        self.assertEqual(email.to, ["bob@example.com"])
+        self.assertEqual(email.subject, "You have 2 new messages on Hoos Market")
+        self.assertIn("Alice: 2 new messages", email.body)
+        self.assertIn("I can pick it up today", email.body)
+        state = DigestState.objects.get(user=self.bob)
+        self.assertEqual(state.last_message_id, latest.pk)
+
+    def test_recent_digest_throttles_the_next_one(self):
+        self.say(self.alice, "Hello")
+        send_digests()
+        self.say(self.alice, "Still there?")
+        self.assertEqual(send_digests(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_high_water_mark_skips_messages_already_announced(self):
+        self.say(self.alice, "Hello")
+        send_digests()
+        later = timezone.now() + timedelta(hours=7)
+        self.assertEqual(send_digests(now=later), 0)
+
+        self.say(self.alice, "Still there?")
+        self.assertEqual(send_digests(now=later), 1)
+        self.assertIn("Alice: 1 new message\n", mail.outbox[-1].body)
+        self.assertNotIn("Hello", mail.outbox[-1].body)
+
+    def test_read_threads_are_not_announced(self):
+        self.say(self.alice, "Hello")
+        ThreadRead.objects.create(thread=self.thread, user=self.bob, last_read_at=timezone.now())
+        self.assertEqual(send_digests(), 0)
+
+        self.say(self.alice, "One more thing")
+        self.assertEqual(send_digests(), 1)
+        self.assertIn("1 new message", mail.outbox[0].body)
+
+    def test_old_messages_and_unreachable_users_are_skipped(self):
+        self.say(self.alice, "Last month", ago=timedelta(days=8))
+        self.assertEqual(send_digests(), 0)
+
+        self.say(self.alice, "Hello")
+        self.bob.email = ""
+        self.bob.save()
+        self.assertEqual(send_digests(), 0)
+
+        self.bob.email = "bob@example.com"
+        self.bob.is_active = False
+        self.bob.save()
+        self.assertEqual(send_digests(), 0)
+
+    def test_groups_are_listed_by_name_once_per_recipient(self):
+        carol = make_user("carol")
+        group = Thread.create_group("Move-out sale", self.alice, [self.bob, carol])
+        Message.objects.create(thread=group, sender=self.alice, text="Everything must go")
+        self.say(self.alice, "Hello")
+
+        self.assertEqual(send_digests(), 2)
+        bodies = {email.to[0]: email.body for email in mail.outbox}
+        self.assertIn("Move-out sale: 1 new message", bodies["bob@example.com"])
+        self.assertIn("Alice: 1 new message", bodies["bob@example.com"])
+        self.assertIn("Move-out sale: 1 new message", bodies["carol@example.com"])
+        self.assertNotIn("alice@example.com", bodies)
+
+    def test_dry_run_records_nothing(self):
+        self.say(self.alice, "Hello")
+        out = StringIO()
+        call_command("send_message_digests", "--dry-run", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Would send 1 digest(s).")
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(DigestState.objects.exists())
+
+        call_command("send_message_digests", stdout=out)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(DigestState.objects.filter(user=self.bob).exists())
+
+
+class CompactionTests(TestCase):
+    def setUp(self):
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+        self.thread, _ = Thread.for_users(self.alice, self.bob)
+        self.cutoff = compact_cutoff(timedelta(days=180))
+
+    def say(self, sender, text, at=None):
+        message = Message.objects.create(thread=self.thread, sender=sender, text=text)
+        if at:
+            Message.objects.filter(pk=message.pk).update(created_at=at, updated_at=at)
+            message.refresh_from_db()
+        return message
+
+    def history(self):
+        """Three messages from two months before the cutoff, then two recent ones."""
+        earlier = (self.cutoff - timedelta(days=40)).replace(day=1)
+        return [
+            self.say(self.alice, "Is the desk free?", at=earlier + timedelta(days=1)),
+            self.say(self.bob, "Yes, come by", at=earlier + timedelta(days=2)),
+            self.say(self.alice, "Still have the chair?", at=self.cutoff - timedelta(days=10)),
+            self.say(self.bob, "Sold, sorry"),
+            self.say(self.alice, "No worries"),
+        ]
+
+    def test_old_months_are_packed_per_thread_and_month(self):
+        old_1, old_2, old_3, new_1, new_2 = self.history()
+        self.assertEqual(compact(self.cutoff), 3)
+
+        self.assertEqual(list(Message.objects.order_by("pk")), [new_1, new_2])
+        blocks = list(MessageArchiveBlock.objects.order_by("month"))
+        self.assertEqual([b.message_count for b in blocks], [2, 1])
+        self.assertEqual((blocks[0].first_message_id, blocks[0].last_message_id), (old_1.pk, old_2.pk))
+        self.assertEqual([row[2] for row in decode(blocks[0].data)], ["Is the desk free?", "Yes, come by"])
+        self.assertEqual(compact(self.cutoff), 0)
+
+    def test_flagged_messages_stay_live(self):
+        old = self.say(self.bob, "Rude reply", at=self.cutoff - timedelta(days=2))
+        self.say(self.bob, "Another", at=self.cutoff - timedelta(days=1))
+        MessageFlag.objects.create(message=old, flagged_by=self.alice, reason="Rude", resolved=True)
+        self.assertEqual(compact(self.cutoff), 1)
+        self.assertTrue(Message.objects.filter(pk=old.pk).exists())
+
+    def test_pages_merge_live_and_archived_messages_by_id(self):
+        sent = self.history()
+        compact(self.cutoff)
+
+        page, older = thread_page(self.thread.pk, limit=2)
+        self.assertEqual([m.pk for m in page], [m.pk for m in sent[3:]])
+        self.assertEqual(older, sent[3].pk)
+
+        page, older = thread_page(self.thread.pk, before=older, limit=2)
+        self.assertEqual([m.pk for m in page], [sent[1].pk, sent[2].pk])
+        self.assertTrue(all(m.archived for m in page))
+        self.assertEqual([m.sender for m in page], [self.bob, self.alice])
+        self.assertEqual([m.created_at for m in page], [sent[1].created_at, sent[2].created_at])
+        self.assertEqual(older, sent[1].pk)
+
+        page, older = thread_page(self.thread.pk, before=older, limit=2)
+        self.assertEqual([m.text for m in page], ["Is the desk free?"])
+        self.assertIsNone(older)
+
+    def test_thread_view_pages_into_the_archive(self):
+        sent = self.history()
+        compact(self.cutoff)
+        self.client.force_login(self.bob)
+        url = reverse("messaging:thread", args=[self.thread.pk])
+        response = self.client.get(url, {"before": sent[3].pk})
+        self.assertEqual([m.pk for m in response.context["messages"]], [m.pk for m in sent[:3]])
+        self.assertContains(response, "Still have the chair?")
+
+    def test_flagging_an_archived_message_restores_it(self):
+        old = self.say(self.bob, "Rude reply", at=self.cutoff - timedelta(days=2))
+        kept = self.say(self.bob, "Another", at=self.cutoff - timedelta(days=1))
+        compact(self.cutoff)
+
+        self.client.force_login(self.alice)
+        self.client.post(reverse("messaging:flag_message", args=[old.pk]), {"reason": "Rude"})
+        restored = Message.objects.get(pk=old.pk)
+        self.assertEqual((restored.text, restored.created_at), (old.text, old.created_at))
+        self.assertTrue(MessageFlag.objects.filter(message=restored, flagged_by=self.alice).exists())
+        block = MessageArchiveBlock.objects.get()
+        self.assertEqual([row[0] for row in decode(block.data)], [kept.pk])
+        self.assertEqual((block.message_count, block.first_message_id), (1, kept.pk))
+
+    def test_outsiders_cannot_flag_archived_messages(self):
+        old = self.say(self.bob, "Hello", at=self.cutoff - timedelta(days=2))
+        compact(self.cutoff)
+        self.client.force_login(make_user("mallory"))
+        response = self.client.post(reverse("messaging:flag_message", args=[old.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Message.objects.exists())
+
+    def test_scrub_sender_blanks_a_deleted_user(self):
+        self.history()
+        compact(self.cutoff)
+        self.assertEqual(scrub_sender(self.alice.pk, [self.thread.pk]), 2)
+        senders = {row[1] for block in MessageArchiveBlock.objects.all() for row in decode(block.data)}
+        self.assertEqual(senders, {None, self.bob.pk})
+
+
+class AsyncViewTests(TestCase):
+    """The ``ASYNC_VIEWS`` inbox, thread and user list serve the same pages as the sync ones."""
+
+    def setUp(self):
+        self.alice = make_user("alice", nickname="Alice")
+        self.bob = make_user("bob")
+        self.carol = make_user("carol")
+        self.thread, _ = Thread.for_users(self.alice, self.bob)
+        self.quiet, _ = Thread.for_users(self.carol, self.bob)
+        cutoff = compact_cutoff(timedelta(days=180))
+        old = Message.objects.create(thread=self.thread, sender=self.alice, text="Is the desk free?")
+        Message.objects.filter(pk=old.pk).update(created_at=cutoff - timedelta(days=5))
+        compact(cutoff)
+        Message.objects.create(thread=self.thread, sender=self.alice, text="Still there?")
+        Message.objects.create(thread=self.thread, sender=self.alice, text="Hello?")
+        self.client.force_login(self.bob)
+
+    def pages(self):
+        inbox = self.client.get(reverse("messaging:inbox"))
+        thread = self.client.get(reverse("messaging:thread", args=[self.thread.pk]))
+        users = self.client.get(reverse("messaging:user_list"), {"q": "ca"})
+        ThreadRead.objects.all().delete()
+        return (
+            sorted((r["thread"].pk, r["other"].pk, r["unread_count"]) for r in inbox.context["rows"]),
+            [m.text for m in thread.context["messages"]],
+            thread.context["title"],
+            [u.username for u in users.context["users"]],
+        )
+
+    def test_pages_match_the_sync_views(self):
+        expected = self.pages()
+        self.assertEqual(expected[0], [(self.thread.pk, self.alice.pk, 2), (self.quiet.pk, self.carol.pk, 0)])
+        self.assertEqual(expected[1:], (["Is the desk free?", "Still there?", "Hello?"], "Chat with Alice", ["carol"]))
+
+        serve_async_views(self)
+        self.assertTrue(iscoroutinefunction(resolve(reverse("messaging:inbox")).func))
+        self.assertEqual(self.pages(), expected)
+
+    def test_thread_marks_read_and_posts(self):
+        serve_async_views(self)
+        url = reverse("messaging:thread", args=[self.thread.pk])
+        self.client.get(url)
+        self.assertTrue(ThreadRead.objects.filter(thread=self.thread, user=self.bob).exists())
+
+        response = self.client.post(url, {"text": "Yes, come by"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(self.thread.messages.latest("pk").sender, self.bob)
+        self.assertEqual(self.client.post(url, {"text": ""}).status_code, 200)
 
-# Create your tests here.
+    def test_outsiders_get_404(self):
+        serve_async_views(self)
+        self.client.force_login(self.carol)
+        url = reverse("messaging:thread", args=[self.thread.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url, {"text": "Hi"}).status_code, 404)
+        self.assertEqual(self.thread.messages.count(), 2)
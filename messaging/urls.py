@@ -1,13 +1,19 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views as hot_views
+else:
+    hot_views = views
+
 app_name = "messaging"
 
 urlpatterns = [
-    path("", views.inbox, name="inbox"),
+    path("", hot_views.inbox, name="inbox"),
     path("compose/<int:user_id>/", views.compose, name="compose"),
-    path("t/<int:thread_id>/", views.thread_detail, name="thread"),
-    path("users/", views.user_list, name="user_list"),
+    path("t/<int:thread_id>/", hot_views.thread_detail, name="thread"),
+    path("users/", hot_views.user_list, name="user_list"),
     path("groups/new/", views.group_new, name="group_new"),
 
     path("m/<int:message_id>/flag/", views.flag_message, name="flag_message"),
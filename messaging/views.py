@@ -10,7 +10,13 @@ from django.contrib import messages as django_messages
 from .models import Thread, Message, ThreadRead
 from .models import MessageFlag
 from .forms import MessageForm, GroupCreateForm  
-from app.models import Profile
+from .archive import archived_message, restore_message, thread_page
+from app import counters, rollups
+from app.db_routing import replica_reads
+from app.freshness import revalidate, thread_etag
+from app.ratelimit import rate_limit
+from app.models import Post, Profile
+from app.ranking import record_engagement
 
 User = get_user_model()
 
@@ -33,7 +39,14 @@ def _display_name(user):
     return user.username
 
 
+def _cursor(request):
+    """The ``?before=`` message id of an older page of a thread, if any."""
+    before = request.GET.get('before', '')
+    return int(before) if before.isdigit() else None
+
+
 @login_required
+@replica_reads
 def inbox(request):
     threads = (
         Thread.objects
@@ -47,14 +60,15 @@ def inbox(request):
         )
     )
 
+    last_read = ThreadRead.last_read_map(request.user, threads)
+
     rows = []
     for t in threads:
         other = next((p for p in t.participants.all() if p.id != request.user.id), None)
 
-        tr, _ = ThreadRead.objects.get_or_create(thread=t, user=request.user)
         unread_count = (
             t.messages.exclude(sender=request.user)
-            .filter(created_at__gt=tr.last_read_at)
+            .filter(created_at__gt=last_read[t.id])
             .count()
         )
 
@@ -82,6 +96,8 @@ def user_list(request):
 
 
 @login_required
+@rate_limit("send_message", "20/m", burst=10)
+@rate_limit("send_message_ip", "60/m", burst=20, key="ip")
 def compose(request, user_id):
     """
     Show a compose page for DM to `other`. If a thread already exists, show it.
@@ -104,22 +120,31 @@ def compose(request, user_id):
                 sender=request.user,
                 text=form.cleaned_data['text']
             )
+            # The form posts back to this URL, ``?post=`` included. Only a
+            # sent message counts as an inquiry, not opening the page.
+            post_id = request.GET.get('post')
+            if post_id and post_id.isdigit():
+                category = (
+                    Post.objects.filter(pk=post_id, user=other)
+                    .values_list('category', flat=True)
+                    .first()
+                )
+                if category:
+                    record_engagement(request.user, category, contacts=1)
+                    counters.record_inquiry(int(post_id))
             return redirect('messaging:thread', thread_id=thread.id)
     else:
         form = MessageForm()
 
-    messages_qs = (
-        thread.messages
-        .select_related('sender', 'sender__profile')
-        if thread else []
-    )
+    messages_list, older = thread_page(thread.pk) if thread else ([], None)
 
     display = _display_name(other)
     title = f"Chat with {display}"
 
     return render(request, 'messaging/thread.html', {
         'thread': thread,
-        'messages': messages_qs,
+        'messages': messages_list,
+        'older': older,
         'form': form,
         'other': other,
         'title': title,
@@ -157,6 +182,9 @@ def start_with(request):
 
 
 @login_required
+@rate_limit("send_message", "20/m", burst=10)
+@rate_limit("send_message_ip", "60/m", burst=20, key="ip")
+@revalidate(thread_etag)
 def thread_detail(request, thread_id):
     thread = get_object_or_404(Thread, pk=thread_id)
     if not thread.participants.filter(pk=request.user.pk).exists():
@@ -175,7 +203,7 @@ def thread_detail(request, thread_id):
     else:
         form = MessageForm()
 
-    messages_qs = thread.messages.select_related('sender', 'sender__profile')
+    messages_list, older = thread_page(thread.pk, before=_cursor(request))
 
     if other and not thread.is_group:
         display = _display_name(other)
@@ -183,14 +211,15 @@ def thread_detail(request, thread_id):
     else:
         page_title = thread.name or "Conversation"
 
-    if messages_qs.exists():
+    if messages_list:
         tr, _ = ThreadRead.objects.get_or_create(thread=thread, user=request.user)
         tr.last_read_at = timezone.now()
         tr.save(update_fields=['last_read_at'])
 
     return render(request, 'messaging/thread.html', {
         'thread': thread,
-        'messages': messages_qs,
+        'messages': messages_list,
+        'older': older,
         'form': form,
         'other': other,
         'title': page_title,
@@ -198,14 +227,18 @@ def thread_detail(request, thread_id):
 
 @login_required
 @require_POST
+@rate_limit("flag", "10/h", burst=5)
 def flag_message(request, message_id):
     """
     Regular users (participants in the thread) can flag a specific message.
+    An archived message is moved back to the live table to be flagged.
     """
-    message = get_object_or_404(
-        Message.objects.select_related("thread", "sender"),
-        pk=message_id,
-    )
+    message = Message.objects.select_related("thread", "sender").filter(pk=message_id).first()
+    archived = None
+    if message is None:
+        message = archived = archived_message(message_id, request.user)
+        if message is None:
+            raise Http404()
 
     # Only participants in the thread can flag
     if not message.thread.participants.filter(pk=request.user.pk).exists():
@@ -223,6 +256,9 @@ def flag_message(request, message_id):
     if existing.exists():
         return redirect("messaging:thread", thread_id=message.thread_id)
 
+    if archived:
+        message = restore_message(archived)
+
     reason = (request.POST.get("reason") or "User flagged this message").strip()
     MessageFlag.objects.create(
         message=message,
@@ -248,7 +284,7 @@ def admin_edit_message(request, message_id):
             django_messages.error(request, "Message text cannot be empty.")
         else:
             message.text = new_text
-            message.save(update_fields=["text"])
+            message.save(update_fields=["text", "updated_at"])
             django_messages.success(request, "Message updated successfully.")
             return redirect("admin_dashboard")
 
@@ -272,7 +308,8 @@ def admin_resolve_message_flag(request, flag_id):
     Mark a MessageFlag as resolved.
     """
     flag = get_object_or_404(MessageFlag, pk=flag_id)
-    flag.resolved = True
-    flag.save(update_fields=["resolved"])
+    # update() so a repeated click can't count the flag as resolved twice.
+    resolved = MessageFlag.objects.filter(pk=flag.pk, resolved=False).update(resolved=True)
+    rollups.add(rollups.OPEN_FLAGS, -resolved)
     django_messages.success(request, "Message flag marked as resolved.")
     return redirect("admin_dashboard")
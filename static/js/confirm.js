@@ -0,0 +1,7 @@
+function confirmFlag() {
+    return confirm("Confirm that you want to flag this post");
+}
+
+function confirmDelete() {
+    return confirm("Confirm that you want to delete this post");
+}
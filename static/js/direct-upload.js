@@ -0,0 +1,78 @@
+/*
+ * Direct-to-storage uploads.
+ * For each file, ask the server for a presigned target, PUT the file there
+ * and hand back the signed token the form submits instead of the bytes.
+ * The SHA-256 goes with the request so storage rejects a body that got
+ * corrupted on the way.
+ */
+(function () {
+  function isHeic(file) {
+    return /image\/hei[cf]/i.test(file.type) || /\.hei[cf]$/i.test(file.name);
+  }
+
+  function canUpload(files) {
+    return files.every((file) => file.type && !isHeic(file));
+  }
+
+  async function sha256Hex(file) {
+    if (!window.crypto || !window.crypto.subtle) {
+      return "";
+    }
+    const digest = await window.crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+
+  async function uploadOne(file, purpose, policyUrl, csrfToken) {
+    const body = new FormData();
+    body.append("purpose", purpose);
+    body.append("content_type", file.type);
+    body.append("size", file.size);
+    if (purpose === "post") {
+      body.append("sha256", await sha256Hex(file));
+    }
+
+    const res = await fetch(policyUrl, {
+      method: "POST",
+      body: body,
+      headers: { "X-CSRFToken": csrfToken },
+      credentials: "same-origin",
+    });
+    if (!res.ok) {
+      throw new Error("Upload policy refused for " + file.name);
+    }
+    const policy = await res.json();
+
+    const put = await fetch(policy.url, {
+      method: policy.method,
+      headers: policy.headers,
+      body: file,
+    });
+    if (!put.ok) {
+      throw new Error("Upload failed for " + file.name);
+    }
+    return policy.token;
+  }
+
+  function uploadAll(form, files, purpose) {
+    const csrfToken = form.querySelector("[name=csrfmiddlewaretoken]").value;
+    const policyUrl = form.dataset.uploadPolicyUrl;
+    return Promise.all(files.map((file) => uploadOne(file, purpose, policyUrl, csrfToken)));
+  }
+
+  function addTokens(form, fieldName, tokens) {
+    tokens.forEach((token) => {
+      const input = document.createElement("input");
+      input.type = "hidden";
+      input.name = fieldName;
+      input.value = token;
+      form.appendChild(input);
+    });
+  }
+
+  window.DirectUpload = {
+    isHeic: isHeic,
+    canUpload: canUpload,
+    uploadAll: uploadAll,
+    addTokens: addTokens,
+  };
+})();
@@ -0,0 +1,65 @@
+const imageInput = document.getElementById('new_images');
+
+imageInput.addEventListener('change', async function (event) {
+    // Collect files from the input
+    const files = Array.from(imageInput.files);
+
+    // We will store the final list of "clean" files here
+    const dataTransfer = new DataTransfer();
+
+    const processedFiles = await Promise.all(
+        files.map(async (file) => {
+            // Check if it is HEIC
+            if (file.type === "image/heic" || file.name.toLowerCase().endsWith(".heic")) {
+                try {
+                    // Convert to JPEG
+                    const convertedBlob = await heic2any({
+                        blob: file,
+                        toType: "image/jpeg",
+                        quality: 0.8
+                    });
+
+                    // Swap the extension for the name
+                    const newName = file.name.replace(/\.heic$/i, ".jpg");
+
+                    // Return the new JPEG file
+                    return new File([convertedBlob], newName, { type: "image/jpeg" });
+
+                } catch (err) {
+                    console.error("HEIC conversion failed:", err);
+                    alert(`Could not convert ${file.name}. Please upload a PNG or JPG instead.`);
+                    return null; // Return null so we can filter this out
+                }
+            }
+            // If it's not HEIC, keep it
+            return file;
+        })
+    );
+
+    // Add valid files to our new list
+    processedFiles.forEach(file => {
+        if (file) dataTransfer.items.add(file);
+    });
+
+    // Update the input with the new cleaned list
+    imageInput.files = dataTransfer.files;
+});
+
+imageInput.form.addEventListener('submit', async (event) => {
+    const form = event.target;
+    const files = Array.from(imageInput.files);
+    if (!files.length || !DirectUpload.canUpload(files)) {
+        return;
+    }
+
+    // Send the images straight to storage; the form only carries tokens
+    event.preventDefault();
+    try {
+        const tokens = await DirectUpload.uploadAll(form, files, "post");
+        DirectUpload.addTokens(form, "upload_tokens", tokens);
+        imageInput.value = "";
+    } catch (err) {
+        console.error("Direct upload failed, sending files with the form:", err);
+    }
+    form.submit();
+});
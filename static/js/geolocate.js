@@ -0,0 +1,29 @@
+// Selects marked data-geolocate fill the hidden latitude/longitude inputs
+// next to them with the browser's position when "here" is picked.
+document.querySelectorAll("select[data-geolocate]").forEach((select) => {
+  const [lat, lon] = select.parentElement.querySelectorAll('input[type="hidden"]');
+
+  select.addEventListener("change", () => {
+    if (select.value !== "here") {
+      lat.value = "";
+      lon.value = "";
+      return;
+    }
+    if (!navigator.geolocation) {
+      alert("Your browser can't share its location.");
+      select.value = "";
+      return;
+    }
+    navigator.geolocation.getCurrentPosition(
+      (pos) => {
+        lat.value = pos.coords.latitude.toFixed(6);
+        lon.value = pos.coords.longitude.toFixed(6);
+      },
+      () => {
+        alert("Couldn't get your location.");
+        select.value = "";
+      },
+      { maximumAge: 300000, timeout: 10000 }
+    );
+  });
+});
@@ -0,0 +1,44 @@
+const modal = document.getElementById('user-modal');
+const resultsEl = document.getElementById('user-results');
+const openBtn = document.getElementById('open-user-picker');
+const closeBtn = document.getElementById('close-user-picker');
+const inputEl = document.getElementById('user-search-input');
+const formEl = document.getElementById('user-search-form');
+const buttonEl = document.getElementById('user-search-button');
+
+function openModal() {
+  modal.style.display = 'flex';
+  loadUsers('');
+  setTimeout(() => inputEl.focus(), 0);
+}
+function closeModal() {
+  modal.style.display = 'none';
+}
+
+async function loadUsers(q) {
+  const url = new URL(modal.dataset.userListUrl, window.location.origin);
+  if (q) url.searchParams.set('q', q);
+  const res = await fetch(url, { credentials: 'same-origin' });
+  const html = await res.text();
+  resultsEl.innerHTML = html;
+}
+
+openBtn.addEventListener('click', (e) => {
+  e.preventDefault(); 
+  openModal();
+});
+closeBtn.addEventListener('click', closeModal);
+modal.addEventListener('click', (e) => {
+  if (e.target === modal) closeModal(); 
+});
+
+formEl.addEventListener('submit', (e) => {
+  e.preventDefault();
+  loadUsers(inputEl.value.trim());
+  inputEl.focus();
+});
+
+buttonEl.addEventListener('click', () => {
+  loadUsers(inputEl.value.trim());
+  inputEl.focus();
+});
@@ -0,0 +1,110 @@
+const imageInput = document.getElementById('image');  
+const previewContainer = document.getElementById('image-preview');
+let allFiles = [];
+
+imageInput.addEventListener('change', async function () {
+  const newFiles = await Promise.all(
+      Array.from(this.files).map(async (file) => {
+          if (file.type === "image/heic" || file.name.toLowerCase().endsWith(".heic")) {
+              try {
+                  const converted = await heic2any({
+                      blob: file,
+                      toType: "image/jpeg",
+                      quality: 0.9
+                  });
+
+                  return new File(
+                      [converted],
+                      file.name.replace(/\.heic/i, ".jpg"),
+                      { type: "image/jpeg" }
+                  );
+              } catch (err) {
+                  console.error("HEIC conversion failed:", err);
+                  alert("Failed to convert HEIC. Please use PNG/JPG.");
+                  return null;
+              }
+          }
+          return file;
+      })
+  );
+
+  allFiles = allFiles.concat(newFiles.filter(f => f !== null));
+  renderPreviews();
+});
+
+function renderPreviews() {
+  previewContainer.innerHTML = '';
+
+  if (allFiles.length === 0) {
+    previewContainer.innerHTML = '<p style="color:#666;">No images selected.</p>';
+    return;
+  }
+
+  allFiles.forEach((file, index) => {
+    const reader = new FileReader();
+    reader.onload = function(e) {
+      const wrapper = document.createElement('div');
+      wrapper.style.position = 'relative';
+      wrapper.style.display = 'inline-block';
+
+      const img = document.createElement('img');
+      img.src = e.target.result;
+      img.style.width = '100px';
+      img.style.height = '100px';
+      img.style.objectFit = 'cover';
+      img.style.border = '1px solid #ccc';
+      img.style.borderRadius = '4px';
+      img.style.marginRight = '10px';
+      img.style.marginBottom = '10px';
+
+      const deleteBtn = document.createElement('button');
+      deleteBtn.innerHTML = '×';
+      deleteBtn.style.position = 'absolute';
+      deleteBtn.style.top = '0';
+      deleteBtn.style.right = '0';
+      deleteBtn.style.background = 'rgba(0,0,0,0.6)';
+      deleteBtn.style.color = 'white';
+      deleteBtn.style.border = 'none';
+      deleteBtn.style.borderRadius = '0 4px 0 4px';
+      deleteBtn.style.cursor = 'pointer';
+      deleteBtn.style.fontSize = '16px';
+      deleteBtn.style.lineHeight = '1';
+      deleteBtn.style.width = '22px';
+      deleteBtn.style.height = '22px';
+      deleteBtn.style.padding = '0';
+      deleteBtn.title = 'Remove this image';
+
+      deleteBtn.addEventListener('click', () => {
+        allFiles.splice(index, 1);
+        renderPreviews();
+      });
+
+      wrapper.appendChild(img);
+      wrapper.appendChild(deleteBtn);
+      previewContainer.appendChild(wrapper);
+    };
+    reader.readAsDataURL(file);
+  });
+}
+
+document.querySelector('form').addEventListener('submit', async (e) => {
+  const form = e.target;
+  e.preventDefault();
+
+  if (allFiles.length && DirectUpload.canUpload(allFiles)) {
+    try {
+      const tokens = await DirectUpload.uploadAll(form, allFiles, "post");
+      DirectUpload.addTokens(form, "upload_tokens", tokens);
+      imageInput.value = "";
+      form.submit();
+      return;
+    } catch (err) {
+      console.error("Direct upload failed, sending files with the form:", err);
+    }
+  }
+
+  const dataTransfer = new DataTransfer();
+  allFiles.forEach(file => dataTransfer.items.add(file));
+  imageInput.files = dataTransfer.files;
+  form.submit();
+});
@@ -0,0 +1,85 @@
+const avatarForm=document.getElementById('avatar-form');
+const avatarInput=document.getElementById('avatar-input');
+avatarInput.addEventListener('change', async ()=>{
+  const files=Array.from(avatarInput.files);
+  if(!files.length) return;
+  // HEIC goes through the server so it can be converted to JPEG
+  if(DirectUpload.canUpload(files)){
+    try{
+      const tokens=await DirectUpload.uploadAll(avatarForm, files, "avatar");
+      DirectUpload.addTokens(avatarForm, "upload_token", tokens);
+      avatarInput.value="";
+    }catch(err){
+      console.error("Direct upload failed, sending the file with the form:", err);
+    }
+  }
+  avatarForm.submit();
+});
+
+function showModal(el){
+  document.getElementById('modal-backdrop').style.display='block';
+  el.style.display='flex';
+}
+function hideModal(el){
+  document.getElementById('modal-backdrop').style.display='none';
+  el.style.display='none';
+}
+
+function autoResizeTextarea(el){
+  if(!el) return;
+  el.style.height = 'auto';
+  el.style.height = (el.scrollHeight + 2) + 'px';
+}
+
+const nameRow=document.getElementById('name-edit-row');
+const nameToggle=document.getElementById('name-edit-toggle');
+const nameInput=document.getElementById('name-input');
+const nameSave=document.getElementById('name-save');
+const nameCancel=document.getElementById('name-cancel');
+
+const bioRow=document.getElementById('bio-edit-row');
+const bioToggle=document.getElementById('bio-edit-toggle');
+const bioInput=document.getElementById('bio-input');
+const bioSave=document.getElementById('bio-save');
+const bioCancel=document.getElementById('bio-cancel');
+
+const form=document.getElementById('profile-form');
+const actionFld=document.getElementById('action-field');
+const nicknameFld=document.getElementById('nickname-field');
+const bioFld=document.getElementById('bio-field');
+
+nameToggle.onclick=e=>{ e.preventDefault(); showModal(nameRow); };
+nameCancel.onclick=()=>hideModal(nameRow);
+nameSave.onclick=e=>{
+  e.preventDefault();
+  actionFld.value='update_nickname';
+  nicknameFld.value = nameInput.value.trim().slice(0, 64);
+  form.submit();
+};
+
+bioToggle.onclick=e=>{ e.preventDefault(); showModal(bioRow); };
+bioCancel.onclick=()=>hideModal(bioRow);
+bioSave.onclick=e=>{
+  e.preventDefault();
+  actionFld.value='update_bio';
+  bioFld.value=bioInput.value.trim();
+  form.submit();
+};
+
+bioInput.addEventListener('input', ()=>autoResizeTextarea(bioInput));
+const originalShowModal = showModal;
+showModal = function(el){
+  originalShowModal(el);
+  if(el === bioRow){
+    autoResizeTextarea(bioInput);
+    setTimeout(()=> bioInput.focus(), 50);
+  }
+  if(el === nameRow){
+    setTimeout(()=> nameInput.focus(), 50);
+  }
+};
+
+document.getElementById('modal-backdrop').onclick = function(){
+  document.querySelectorAll('.edit-row').forEach(r=>r.style.display='none');
+  this.style.display='none';
+};
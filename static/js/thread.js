@@ -0,0 +1,2 @@
+const box = document.querySelector('.messages');
+if (box) { box.scrollTop = box.scrollHeight; }